@@ -0,0 +1,81 @@
+"""
+Benchmark for the big-M tightening from the flow bound propagation.
+
+Every case study is solved with the same solver with the default alpha values, with the tightened alpha values of
+SuperstructureProblem.tighten_big_m_parameters and with the tightened alpha values plus the flow bounds as variable
+bounds. The tightened alpha values, the objective and the solve times are printed, so the effect of the tightening
+can be compared.
+
+Usage
+-----
+    python benchmarks/benchmark_big_m.py [--solver highs] [--repeats N] [case.pkl ...]
+
+If no case is given all pickled superstructures in Classroom/exercises are used.
+"""
+
+import argparse
+import glob
+import os
+import time
+
+from pyomo.environ import value
+
+from benchmark_model_build import REPO_PATH, load_case
+
+from outdoor.outdoor_core.main.superstructure_problem import SuperstructureProblem
+from outdoor.outdoor_core.model.optimization_model import SuperstructureModel
+from outdoor.outdoor_core.optimizers.main_optimizer import SingleOptimizer
+
+
+def solve_case(superstructure, dataFile, solver, variant):
+    model = SuperstructureModel(superstructure)
+    model.create_ModelEquations()
+    if variant != 'default':
+        dataFile = SuperstructureProblem().tighten_big_m_parameters(dataFile, model,
+                                                                    setFlowBounds=variant == 'bounds',
+                                                                    printReport=False)
+    instance = model.populateModel(dataFile)
+
+    optimizer = SingleOptimizer(solver, 'local')
+    start = time.perf_counter()
+    # VSS_EVPI_mode returns 'infeasible' instead of raising, so infeasible cases are reported as well
+    output = optimizer.run_optimization(instance, tee=False, keepfiles=False, printTimer=False, VSS_EVPI_mode=True)
+    objective = float('nan') if output == 'infeasible' else value(instance.Objective)
+    return time.perf_counter() - start, objective, instance
+
+
+def benchmark_case(path, solver='highs', repeats=1):
+    superstructure = load_case(path)
+    dataFile = superstructure.create_DataFile()
+
+    print('\n{}'.format(os.path.basename(path)))
+    for variant in ('default', 'alpha', 'bounds'):
+        times = []
+        for _ in range(repeats):
+            solveTime, objective, instance = solve_case(superstructure, dataFile, solver, variant)
+            times.append(solveTime)
+
+        print('  {:<9} objective {:>14.6g}, solve time best {:.3f} s, mean {:.3f} s over {} runs'.format(
+            variant, objective, min(times), sum(times) / len(times), repeats))
+
+        if variant == 'alpha':
+            tight = {u: value(instance.alpha[u]) for u in instance.U if value(instance.alpha[u]) < 100000}
+            print('  tightened alpha for {} of {} units:'.format(len(tight), len(instance.U)))
+            for u, alpha in sorted(tight.items(), key=lambda item: item[1]):
+                print('    {:<40} {:>12.4g}'.format(instance.Names[u], alpha))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the big-M tightening of the superstructure model.')
+    parser.add_argument('cases', nargs='*', help='pickled superstructure files')
+    parser.add_argument('--solver', default='highs')
+    parser.add_argument('--repeats', type=int, default=1)
+    args = parser.parse_args()
+
+    cases = args.cases or sorted(glob.glob(os.path.join(REPO_PATH, 'Classroom', 'exercises', '*', '*.pkl')))
+    for path in cases:
+        benchmark_case(path, solver=args.solver, repeats=args.repeats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark for the size of the heat integration of the superstructure model.
+
+The heat cascade (ENERGY_DEMAND_HEAT/COOL, HeatBalance_1..6, 14, 15) is only built for the units and heat
+intervals with a nonzero beta. The number of heat intervals grows with the temperature grid, so the script can
+refine the grid of every case by adding temperatures every --grid-step K between the lowest and the highest
+temperature of the case, and merge the temperatures of the grid with --merge-tolerance K
+(Superstructure.set_temperatureMergeTolerance). The number of heat intervals, the size of the heat cascade, the size
+of the model and the population time are printed, run the script on two revisions of the code to compare them.
+
+Usage
+-----
+    python benchmarks/benchmark_heat_integration.py [--grid-step K] [--merge-tolerance K] [--repeats N] [case.pkl ...]
+
+If no case is given all pickled superstructures in Classroom/exercises are used.
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+from pyomo.environ import Constraint, Var
+
+from benchmark_model_build import REPO_PATH, load_case
+
+from outdoor.outdoor_core.model.optimization_model import SuperstructureModel
+
+HEAT_CASCADE = ('ENERGY_DEMAND_HEAT', 'ENERGY_DEMAND_COOL', 'HeatBalance_1', 'HeatBalance_2', 'HeatBalance_3',
+                'HeatBalance_4')
+
+
+def refine_temperature_grid(superstructure, step):
+    """
+    Adds temperatures every step K to the temperature grid of the superstructure. The grid is only complete after
+    the process temperatures are collected in create_DataFile, so the refinement is hooked in after that step.
+    """
+    setProcessTemperatures = superstructure._Superstructure__set_processTemperatures
+
+    def set_refined_temperatures():
+        setProcessTemperatures()
+        temperatures = superstructure.Heat_Temperatures
+        grid = np.arange(min(temperatures), max(temperatures), step)
+        superstructure.Heat_Temperatures = sorted(set(temperatures) | {float(t) for t in grid})
+
+    superstructure._Superstructure__set_processTemperatures = set_refined_temperatures
+
+
+def benchmark_case(path, gridStep=None, mergeTolerance=0, repeats=1):
+    superstructure = load_case(path)
+    if gridStep:
+        refine_temperature_grid(superstructure, gridStep)
+    superstructure.set_temperatureMergeTolerance(mergeTolerance)
+    dataFile = superstructure.create_DataFile()
+
+    model = SuperstructureModel(superstructure)
+    model.create_ModelEquations()
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        instance = model.populateModel(dataFile)
+        times.append(time.perf_counter() - start)
+
+    nVariables = sum(1 for _ in instance.component_data_objects(Var))
+    nConstraints = sum(1 for _ in instance.component_data_objects(Constraint))
+
+    print('\n{}'.format(os.path.basename(path)))
+    print('  heat intervals {}, units {}'.format(len(instance.HI), len(instance.U)))
+    for name in HEAT_CASCADE:
+        print('  {:<20} {:>8}'.format(name, len(instance.component(name))))
+    print('  variables {}, constraints {}'.format(nVariables, nConstraints))
+    print('  populate time best {:.3f} s, mean {:.3f} s over {} runs'.format(min(times), sum(times) / len(times),
+                                                                              repeats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the size of the heat integration of the model.')
+    parser.add_argument('cases', nargs='*', help='pickled superstructure files')
+    parser.add_argument('--grid-step', type=float, default=None, help='refine the temperature grid to this step')
+    parser.add_argument('--merge-tolerance', type=float, default=0, help='merge temperatures closer than this (K)')
+    parser.add_argument('--repeats', type=int, default=1)
+    args = parser.parse_args()
+
+    cases = args.cases or sorted(glob.glob(os.path.join(REPO_PATH, 'Classroom', 'exercises', '*', '*.pkl')))
+    for path in cases:
+        benchmark_case(path, gridStep=args.grid_step, mergeTolerance=args.merge_tolerance,
+                       repeats=args.repeats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark for the construction time of the superstructure model.
+
+The script loads the case studies of the Classroom folder, creates the data file and times the population of the
+SuperstructureModel. Pyomo's construction timer is used to report the time spent in the individual components, so
+the cost of the (sparse) mass balance families can be compared between two revisions of the code.
+
+With --compare-builders the declaration plus population time of the abstract path (SuperstructureModel.populateModel)
+is compared to the direct construction with ConcreteSuperstructureModel.
+
+Usage
+-----
+    python benchmarks/benchmark_model_build.py [--repeats N] [--top N] [--compare-builders] [case.pkl ...]
+
+If no case is given all pickled superstructures in Classroom/exercises are used.
+"""
+
+import argparse
+import gc
+import glob
+import io
+import os
+import pickle
+import re
+import sys
+import time
+
+from pyomo.common.timing import report_timing
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_PATH, 'src'))
+
+from outdoor.outdoor_core.model.optimization_model import ConcreteSuperstructureModel, SuperstructureModel
+
+MASS_BALANCE_FAMILIES = ('MassBalance_1', 'MassBalance_6', 'MassBalance_7', 'MassBalance_8', 'MassBalance_9',
+                         'MassBalance_16', 'Distribution_Equations')
+
+
+def load_case(path):
+    """
+    Loads a pickled superstructure object. Pickles saved with older versions of the interface miss the
+    upperFlowLimitUnit attribute of the cost units, which is set to the model default here.
+    """
+    with open(path, 'rb') as file:
+        superstructure = pickle.load(file)
+
+    for unit in superstructure.UnitsList:
+        if hasattr(unit, 'CAPEX_factors') and not hasattr(unit, 'upperFlowLimitUnit'):
+            unit.upperFlowLimitUnit = {'upperFlowLimitUnit': {unit.Number: 1e12}}
+
+    return superstructure
+
+
+def time_component_construction(abstractModel, dataFile):
+    """
+    Populates the abstract model and returns the instance, the total time and the construction time per component.
+    """
+    stream = io.StringIO()
+    start = time.perf_counter()
+    with report_timing(stream):
+        instance = abstractModel.populateModel(dataFile)
+    totalTime = time.perf_counter() - start
+
+    componentTimes = {}
+    for line in stream.getvalue().splitlines():
+        match = re.match(r'\s*([\d.e+-]+) seconds to construct \w+ (\w+);', line)
+        if match:
+            componentTimes[match.group(2)] = float(match.group(1))
+
+    return instance, totalTime, componentTimes
+
+
+def benchmark_case(path, repeats=3, top=10):
+    superstructure = load_case(path)
+    dataFile = superstructure.create_DataFile()
+
+    populateTimes = []
+    componentTimes = {}
+    for _ in range(repeats):
+        abstractModel = SuperstructureModel(superstructure)
+        abstractModel.create_ModelEquations()
+        instance, totalTime, componentTimes = time_component_construction(abstractModel, dataFile)
+        populateTimes.append(totalTime)
+
+    nUnits = len(instance.U)
+    nComponents = len(instance.I)
+    print('\n{} ({} units, {} components, {} connections)'.format(os.path.basename(path), nUnits, nComponents,
+                                                                     len(instance.U_CONNECTORS)))
+    print('  populate time: best {:.3f} s, mean {:.3f} s over {} runs'.format(
+        min(populateTimes), sum(populateTimes) / len(populateTimes), repeats))
+    print('  dense U x UU x I rule calls per connection family: {}'.format(nUnits * len(instance.UU) * nComponents))
+
+    print('  mass balance families:')
+    for name in MASS_BALANCE_FAMILIES:
+        component = instance.find_component(name)
+        print('    {:<24} {:>8} constraints {:>8.3f} s'.format(name, len(component), componentTimes.get(name, 0.0)))
+
+    print('  slowest components:')
+    for name, seconds in sorted(componentTimes.items(), key=lambda item: -item[1])[:top]:
+        print('    {:<24} {:>8.3f} s'.format(name, seconds))
+
+
+def compare_builders(path, repeats=5):
+    """
+    Times declaration plus population of the model for the abstract path and the direct builder. Both paths start
+    from the same data file, the runs are interleaved and garbage is collected before each run to keep the timings
+    comparable.
+    """
+    superstructure = load_case(path)
+    dataFile = superstructure.create_DataFile()
+
+    times = {'abstract': [], 'direct': []}
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        abstractModel = SuperstructureModel(superstructure)
+        abstractModel.create_ModelEquations()
+        instance = abstractModel.populateModel(dataFile)
+        times['abstract'].append(time.perf_counter() - start)
+        del abstractModel, instance
+
+        gc.collect()
+        start = time.perf_counter()
+        instance = ConcreteSuperstructureModel(superstructure, dataFile)
+        times['direct'].append(time.perf_counter() - start)
+        del instance
+
+    print('\n{}'.format(os.path.basename(path)))
+    for builder, builderTimes in times.items():
+        print('  {:<9} best {:.3f} s, mean {:.3f} s over {} runs'.format(
+            builder, min(builderTimes), sum(builderTimes) / len(builderTimes), repeats))
+    print('  speedup (best): {:.2f}x'.format(min(times['abstract']) / min(times['direct'])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the build time of the superstructure model.')
+    parser.add_argument('cases', nargs='*', help='pickled superstructure files')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10, help='number of slowest components to print')
+    parser.add_argument('--compare-builders', action='store_true',
+                        help='compare populateModel with the direct ConcreteSuperstructureModel')
+    args = parser.parse_args()
+
+    cases = args.cases or sorted(glob.glob(os.path.join(REPO_PATH, 'Classroom', 'exercises', '*', '*.pkl')))
+    for path in cases:
+        if args.compare_builders:
+            compare_builders(path, repeats=args.repeats)
+        else:
+            benchmark_case(path, repeats=args.repeats, top=args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of the parallel pareto points (MultiObjectiveOptimizer with workers > 1).
+
+The pareto front between two objectives of the case study (default: GWP100 bounded, NPC optimised, as in
+Classroom/run_multi_objective_optimization.py) is solved with
+--points epsilon-constraint points, one after another and with the given numbers of worker processes. The wall time
+and the largest difference of the objective to the serial run are reported. With --adaptive the front is refined
+adaptively (at most --points solves) instead of the uniform grid, and the number of flowsheets found is reported too.
+
+Usage
+-----
+    python benchmarks/benchmark_parallel_pareto.py [--points N] [--workers 1 2 4] [--solver-threads N]
+                                                   [--objectives OBJ1 OBJ2] [--time-limit S] [--adaptive]
+                                                   [case.pkl]
+
+The default case is Classroom/exercises/Potato/Case_study_PPW_2_superstructure.pkl.
+"""
+
+import argparse
+import os
+import time
+
+from benchmark_model_build import load_case
+from benchmark_parallel_sensitivity import DEFAULT_CASE
+
+from outdoor.outdoor_core.main.superstructure_problem import SuperstructureProblem
+from outdoor.outdoor_core.optimizers.customs.custom_optimizer import MultiObjectiveOptimizer
+
+
+def run_front(path, multiData, workers, solverThreads, timeLimit):
+    superstructure = load_case(path)
+    options = {'TimeLimit': timeLimit} if timeLimit else None
+
+    start = time.perf_counter()
+    model_instance = SuperstructureProblem().setup_model_instance(superstructure, 'multi-objective', printTimer=False)
+    optimizer = MultiObjectiveOptimizer('highs', 'local', options, dict(multiData), superstructure=superstructure,
+                                        workers=workers, solver_threads=solverThreads)
+    output = optimizer.run_optimization(model_instance)
+    wallTime = time.perf_counter() - start
+
+    objective2 = multiData['objective2']
+    objectives = {key: result._data[objective2] for key, result in output._results_data.items()}
+    flowsheets = {optimizer.chosen_units(result) for result in output._results_data.values()}
+    return wallTime, objectives, len(flowsheets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the parallel pareto points.')
+    parser.add_argument('case', nargs='?', default=DEFAULT_CASE, help='pickled superstructure file')
+    parser.add_argument('--points', type=int, default=10, help='number of pareto points')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--solver-threads', type=int, default=1, help='solver threads per worker')
+    parser.add_argument('--objectives', nargs=2, default=['global warming potential (GWP100)', 'NPC'],
+                        help='bounded objective and optimised objective')
+    parser.add_argument('--time-limit', type=float, default=None, help='time limit of every solve in s')
+    parser.add_argument('--adaptive', action='store_true', help='adaptive refinement with at most --points solves')
+    args = parser.parse_args()
+
+    multiData = {'objective1': args.objectives[0], 'objective2': args.objectives[1], 'paretoPoints': args.points,
+                 'bounds_objective1': [None, None], 'adaptive_refinement': args.adaptive}
+    print('{}: {} pareto points, {} CPUs'.format(os.path.basename(args.case), args.points, os.cpu_count()))
+
+    results = {}
+    for workers in args.workers:
+        results[workers] = run_front(args.case, multiData, workers, args.solver_threads, args.time_limit)
+
+    serialTime, serialObjectives, _ = results[args.workers[0]]
+    print('\n{:>8} {:>12} {:>9} {:>8} {:>11} {:>22}'.format('workers', 'wall time', 'speedup', 'points',
+                                                           'flowsheets', 'max objective change'))
+    for workers, (wallTime, objectives, flowsheets) in results.items():
+        # the adaptive points of different worker numbers are not the same, only the uniform ones are compared
+        change = max((abs(objectives[key] - value) / max(abs(value), 1e-9)
+                      for key, value in serialObjectives.items() if key in objectives), default=0.0)
+        print('{:>8} {:>10.1f} s {:>8.2f}x {:>8} {:>11} {:>21.2e}'.format(
+            workers, wallTime, serialTime / wallTime, len(objectives), flowsheets, change))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark of the parallel sensitivity runs (SensitivityOptimizer with workers > 1).
+
+Five parameters of the case study are varied in --steps steps each (product price, electricity price, chilling
+price, material costs of the first source and O&M factor of the first process unit, each between 50 and 150 % of
+the base value). With --two-way the grid of the first two parameters (--steps x --steps points) is solved with the
+TwoWaySensitivityOptimizer instead. The study is solved one point after another and with the given numbers of worker processes, the
+wall time and the largest difference of the objective to the serial run are reported.
+
+Usage
+-----
+    python benchmarks/benchmark_parallel_sensitivity.py [--steps N] [--workers 1 2 4] [--solver-threads N]
+                                                        [--time-limit S] [--two-way] [case.pkl]
+
+The default case is Classroom/exercises/Potato/Case_study_PPW_2_superstructure.pkl.
+"""
+
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from benchmark_model_build import REPO_PATH, load_case
+
+from outdoor.outdoor_core.main.superstructure_problem import SuperstructureProblem
+from outdoor.outdoor_core.optimizers.customs.custom_optimizer import SensitivityOptimizer, TwoWaySensitivityOptimizer
+
+DEFAULT_CASE = os.path.join(REPO_PATH, 'Classroom', 'exercises', 'Potato', 'Case_study_PPW_2_superstructure.pkl')
+
+
+def sensitive_parameter(parameterType, unitNumber, baseValue, steps):
+    return pd.Series({'Parameter_Type': parameterType, 'Unit_Number': unitNumber, 'Component': None,
+                      'Reaction_Number': None, 'Target_Unit': None, 'Lower_Bound': 0.5 * baseValue,
+                      'Upper_Bound': 1.5 * baseValue, 'Number_of_steps': steps})
+
+
+def make_study(superstructure, steps):
+    data = superstructure.create_DataFile()[None]
+    product, price = next(iter(data['ProductPrice'].items()))
+    source, costs = next((unit, value) for unit, value in data['materialcosts'].items() if value > 0)
+    process, factor = next(iter(data['K_OM'].items()))
+
+    return [sensitive_parameter('Price (ProductPrice)', product, price, steps),
+            sensitive_parameter('Electricity price (delta_ut)', None, data['delta_ut']['Electricity'], steps),
+            sensitive_parameter('Chilling price (delta_ut)', None, data['delta_ut']['Chilling'], steps),
+            sensitive_parameter('Costs (materialcosts)', source, costs, steps),
+            sensitive_parameter('Operating and maintenance (K_OM)', process, factor, steps)]
+
+
+def run_study(path, steps, workers, solverThreads, timeLimit, twoWay=False):
+    superstructure = load_case(path)
+    superstructure.sensitive_parameters = make_study(superstructure, steps)
+    options = {'TimeLimit': timeLimit} if timeLimit else None
+
+    start = time.perf_counter()
+    if twoWay:
+        superstructure.sensitive_parameters = superstructure.sensitive_parameters[:2]
+        model_instance = SuperstructureProblem().setup_model_instance(superstructure, 'cross-parameter sensitivity',
+                                                                      printTimer=False)
+        optimizer = TwoWaySensitivityOptimizer('highs', 'local', options,
+                                               two_way_data=superstructure.sensitive_parameters,
+                                               superstructure=superstructure, workers=workers,
+                                               solver_threads=solverThreads)
+    else:
+        model_instance = SuperstructureProblem().setup_model_instance(superstructure, 'sensitivity', printTimer=False)
+        optimizer = SensitivityOptimizer('highs', 'local', options, sensi_data=superstructure.sensitive_parameters,
+                                         superstructure=superstructure, workers=workers, solver_threads=solverThreads)
+    output = optimizer.run_optimization(model_instance)
+    wallTime = time.perf_counter() - start
+
+    objectives = {key: result._data[result._data['ObjectiveFunctionName']]
+                  for key, result in output._results_data.items()}
+    return wallTime, objectives
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the parallel sensitivity runs.')
+    parser.add_argument('case', nargs='?', default=DEFAULT_CASE, help='pickled superstructure file')
+    parser.add_argument('--steps', type=int, default=10, help='steps per parameter')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--solver-threads', type=int, default=1, help='solver threads per worker')
+    parser.add_argument('--time-limit', type=float, default=None, help='time limit of every solve in s')
+    parser.add_argument('--two-way', action='store_true', help='solve the grid of the first two parameters')
+    args = parser.parse_args()
+
+    study = '{0} x {0} grid'.format(args.steps) if args.two_way else '5 parameters x {} steps'.format(args.steps)
+    print('{}: {}, {} CPUs'.format(os.path.basename(args.case), study, os.cpu_count()))
+
+    results = {}
+    for workers in args.workers:
+        results[workers] = run_study(args.case, args.steps, workers, args.solver_threads, args.time_limit,
+                                     args.two_way)
+
+    serialTime, serialObjectives = results[args.workers[0]]
+    print('\n{:>8} {:>12} {:>9} {:>22}'.format('workers', 'wall time', 'speedup', 'max objective change'))
+    for workers, (wallTime, objectives) in results.items():
+        change = max(abs(objectives[key] - value) / max(abs(value), 1e-9)
+                     for key, value in serialObjectives.items())
+        print('{:>8} {:>10.1f} s {:>8.2f}x {:>21.2e}'.format(workers, wallTime, serialTime / wallTime, change))
+
+
+if __name__ == '__main__':
+    main()
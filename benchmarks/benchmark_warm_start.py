@@ -0,0 +1,66 @@
+"""
+Benchmark of the MIP starts of the multi-run optimizers (warm_start of the SensitivityOptimizer).
+
+The sensitivity study of benchmark_parallel_sensitivity.py (five parameters in --steps steps each) is solved one point
+after another, once with cold starts and once with every point started from the flowsheet of the nearest solved
+point. The solve time of every point, the total wall time and the largest difference of the objective are reported.
+
+Usage
+-----
+    python benchmarks/benchmark_warm_start.py [--steps N] [--time-limit S] [case.pkl]
+
+The default case is Classroom/exercises/Potato/Case_study_PPW_2_superstructure.pkl.
+"""
+
+import argparse
+import os
+import time
+
+from benchmark_model_build import load_case
+from benchmark_parallel_sensitivity import DEFAULT_CASE, make_study
+
+from outdoor.outdoor_core.main.superstructure_problem import SuperstructureProblem
+from outdoor.outdoor_core.optimizers.customs.custom_optimizer import SensitivityOptimizer
+
+
+def run_study(path, steps, warmStart, timeLimit):
+    superstructure = load_case(path)
+    superstructure.sensitive_parameters = make_study(superstructure, steps)
+    options = {'TimeLimit': timeLimit, 'Threads': 1} if timeLimit else {'Threads': 1}
+
+    model_instance = SuperstructureProblem().setup_model_instance(superstructure, 'sensitivity', printTimer=False)
+    optimizer = SensitivityOptimizer('highs', 'local', options, sensi_data=superstructure.sensitive_parameters,
+                                     superstructure=superstructure, warm_start=warmStart)
+    start = time.perf_counter()
+    output = optimizer.run_optimization(model_instance)
+    wallTime = time.perf_counter() - start
+
+    results = {key: (result._data[result._data['ObjectiveFunctionName']], result._run_time)
+               for key, result in output._results_data.items()}
+    return wallTime, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the MIP starts of the sensitivity runs.')
+    parser.add_argument('case', nargs='?', default=DEFAULT_CASE, help='pickled superstructure file')
+    parser.add_argument('--steps', type=int, default=5, help='steps per parameter')
+    parser.add_argument('--time-limit', type=float, default=None, help='time limit of every solve in s')
+    args = parser.parse_args()
+
+    print('{}: 5 parameters x {} steps'.format(os.path.basename(args.case), args.steps))
+
+    coldTime, cold = run_study(args.case, args.steps, False, args.time_limit)
+    warmTime, warm = run_study(args.case, args.steps, True, args.time_limit)
+
+    print('\n{:<40} {:>10} {:>10} {:>12} {:>12}'.format('point', 'cold', 'warm', 'objective', 'warm obj.'))
+    for key, (objective, runTime) in cold.items():
+        print('{:<40} {:>8.1f} s {:>8.1f} s {:>12.4f} {:>12.4f}'.format('{} {:.4g}'.format(*key)[:40], runTime,
+                                                                        warm[key][1], objective, warm[key][0]))
+
+    change = max(abs(warm[key][0] - objective) / max(abs(objective), 1e-9) for key, (objective, _) in cold.items())
+    print('\nwall time cold {:.1f} s, warm {:.1f} s ({:.0f} % saved), max objective change {:.2e}'.format(
+        coldTime, warmTime, 100 * (1 - warmTime / coldTime), change))
+
+
+if __name__ == '__main__':
+    main()
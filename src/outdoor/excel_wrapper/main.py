@@ -27,7 +27,11 @@ def get_DataFromExcel(path=None,
                       stochastic_mode=None,
                       scenario_size=None,
                       seed=66,
-                      scenarioDataFiles=None,):
+                      scenarioDataFiles=None,
+                      scenario_chunk_size=None,
+                      sampling_method=None,
+                      reduced_scenarios=None,
+                      reduction_method='fast forward'):
 
     """
     Description
@@ -53,6 +57,12 @@ def get_DataFromExcel(path=None,
     seed : int, optional, seed for the random number generator default is 66
     scenario_size : int, optional, number of scenarios for the stochastic optimization
     dataFilesScenarios : Dict, optional, Dict of data files for the scenarios in the stochastic optimization
+    scenario_chunk_size : int, optional, generate the scenarios of wait and see and here and now in chunks of this
+        size while they are solved (for very large samples), instead of all at once
+    sampling_method : String, optional, overrides the sampling method of the scenarios defined in the Excel file
+        ('LHS', 'Sobol', 'Halton' or 'Combinatorial')
+    reduced_scenarios : int, optional, reduce the scenarios to this number of weighted scenarios before they are solved
+    reduction_method : String, optional, method of the scenario reduction ('fast forward' or 'k-medoids')
 
     Returns
     -------
@@ -142,9 +152,16 @@ def get_DataFromExcel(path=None,
         Superstructure_Object_duplicate = copy.deepcopy(Superstructure_Object)
         Superstructure_Object.parameters_single_optimization = Superstructure_Object_duplicate
 
+        if scenario_chunk_size is not None:
+            raise ValueError('The scenarios of the 2-stage-recourse optimization can not be generated in chunks, '
+                             'scenario_chunk_size is only used for wait and see and here and now')
+
         # set the uncertainty data in the object
         df_stochastic = dataframe['Uncertainty']
-        uncertaintyObject = wrapp_stochastic_data(df_stochastic, seed, scenario_size)
+        uncertaintyObject = wrapp_stochastic_data(df_stochastic, seed, scenario_size,
+                                                  sampling_method=sampling_method,
+                                                  reduced_scenarios=reduced_scenarios,
+                                                  reduction_method=reduction_method)
 
         # add an if statement to check what kind of uncertainty model we're dealing with
         if stochastic_mode is None:
@@ -171,10 +188,18 @@ def get_DataFromExcel(path=None,
 
         # set the uncertainty data in the object
         df_stochastic = dataframe['Uncertainty']
-        uncertaintyObject = wrapp_stochastic_data(df_stochastic, seed, scenario_size)
+        uncertaintyObject = wrapp_stochastic_data(df_stochastic, seed, scenario_size,
+                                                  makeScenarios=scenario_chunk_size is None,
+                                                  sampling_method=sampling_method,
+                                                  reduced_scenarios=reduced_scenarios,
+                                                  reduction_method=reduction_method)
 
         # create the uncertainty data for the Superstructure_Object
-        Superstructure_Object.set_uncertainty_data_mpisspy(uncertaintyObject=uncertaintyObject)
+        if scenario_chunk_size is None:
+            Superstructure_Object.set_uncertainty_data_mpisspy(uncertaintyObject=uncertaintyObject)
+        else:
+            Superstructure_Object.set_uncertainty_stream_mpisspy(uncertaintyObject=uncertaintyObject,
+                                                                 chunkSize=scenario_chunk_size, seed=seed)
         Superstructure_Object.uncertaintyDict = uncertaintyObject.LableDict
 
     elif _optimization_mode == 'here and now':
@@ -184,9 +209,17 @@ def get_DataFromExcel(path=None,
 
         # set the uncertainty data in the object
         df_stochastic = dataframe['Uncertainty']
-        uncertaintyObject = wrapp_stochastic_data(df_stochastic, seed, scenario_size)
+        uncertaintyObject = wrapp_stochastic_data(df_stochastic, seed, scenario_size,
+                                                  makeScenarios=scenario_chunk_size is None,
+                                                  sampling_method=sampling_method,
+                                                  reduced_scenarios=reduced_scenarios,
+                                                  reduction_method=reduction_method)
 
-        Superstructure_Object.set_uncertainty_data_mpisspy(uncertaintyObject=uncertaintyObject)
+        if scenario_chunk_size is None:
+            Superstructure_Object.set_uncertainty_data_mpisspy(uncertaintyObject=uncertaintyObject)
+        else:
+            Superstructure_Object.set_uncertainty_stream_mpisspy(uncertaintyObject=uncertaintyObject,
+                                                                 chunkSize=scenario_chunk_size, seed=seed)
         Superstructure_Object.uncertaintyDict = uncertaintyObject.LableDict
 
         if scenarioDataFiles is not None:
@@ -13,7 +13,8 @@ from . import wrapping_functions as WF
 from ..outdoor_core.input_classes.stochastic import StochasticObject
 
 
-def wrapp_stochastic_data(dfi, seed=66, scenario_size=None):
+def wrapp_stochastic_data(dfi, seed=66, scenario_size=None, makeScenarios=True, sampling_method=None,
+                          reduced_scenarios=None, reduction_method='fast forward'):
     # make the initial stochastic object
     obj = StochasticObject()
 
@@ -32,6 +33,14 @@ def wrapp_stochastic_data(dfi, seed=66, scenario_size=None):
     # set the general data
     obj.set_general_data(generalDataFrame, customLevelDataFrame, scenario_size)
 
+    # overwrite the sampling method of the Excel file (e.g., 'Sobol' or 'Halton' instead of LHS)
+    if sampling_method is not None:
+        obj.set_sampling_method(sampling_method)
+        if sampling_method != 'Combinatorial' and getattr(obj, 'SampleSize', None) is None:
+            if scenario_size is None:
+                raise ValueError('The sampling method {} needs a sample size (scenario_size)'.format(sampling_method))
+            obj.SampleSize = scenario_size
+
     # extract the uncertain parameters from the dataframe
     UncertainParametersRange = WF.convert_total('B', 25, 'K', 52)
     UncertainParametersDataFrame = dfi.iloc[UncertainParametersRange]
@@ -43,18 +52,32 @@ def wrapp_stochastic_data(dfi, seed=66, scenario_size=None):
     obj.set_phi_exclusion_list(phiExclusionDF)
 
    # make the scenario dataframe, depending on the sampling mode
+    # (if makeScenarios is False the scenarios are generated later on in chunks, see StochasticObject.iter_scenario_chunks)
     if obj.SamplingMode == 'Combinatorial':
         # set the grouped parameters (i.e., those with the correlated uncertainty)
         obj.set_group_dict()
-        obj.make_scenario_dataframe_combinatorial()
+        if makeScenarios:
+            obj.make_scenario_dataframe_combinatorial()
 
     elif obj.SamplingMode == 'LHS':
         #obj.set_group_dict()
-        obj.make_scenario_dataframe_LHS(seed=seed)
+        if makeScenarios:
+            obj.make_scenario_dataframe_LHS(seed=seed)
+
+    elif obj.SamplingMode in ('Sobol', 'Halton'):
+        if makeScenarios:
+            obj.make_scenario_dataframe_QMC(seed=seed)
 
     else:
         raise ValueError('Sampling mode not recognized')
 
+    # reduce the scenarios to a smaller set of weighted scenarios
+    if reduced_scenarios is not None:
+        if not makeScenarios:
+            raise ValueError('The scenarios can only be reduced if they are all made at once, '
+                             'not if they are generated in chunks')
+        obj.reduce_scenarios(reduced_scenarios, method=reduction_method, seed=seed)
+
     return obj
 
 def wrapp_sensitivity_data(obj, dfi, cross_sensitivity_params):
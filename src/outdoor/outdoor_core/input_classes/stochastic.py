@@ -17,11 +17,18 @@ Class description
 
 import ast
 import itertools
+import warnings
 
 import pandas as pd
-from numpy import isnan, random, zeros
+from numpy import array, isnan, random
 from pyDOE import lhs
-from scipy.stats import norm, uniform
+from scipy.stats import norm, qmc, uniform
+
+from ..utils.scenario_reduction import reduce_scenarios
+
+# sampling methods for the sampled (not combinatorial) scenarios, Sobol and Halton are scrambled quasi-Monte Carlo
+# sequences which cover the parameter space more evenly than LHS, so fewer scenarios are needed for the same accuracy
+SAMPLING_METHODS = ('LHS', 'Sobol', 'Halton')
 
 
 # from itertools import product
@@ -89,7 +96,11 @@ class StochasticObject():
             self.CombinatorialProbabilitySetting = GeneralDataFrame.Probality_of_occurance
 
         elif GeneralDataFrame.Combinatorial == "False" and GeneralDataFrame.LHS_Sampling == "True":  # if the switch LHS Sampling is True
+            # the sampling method is LHS, unless a quasi-Monte Carlo method is given (optional field Sampling_Method)
             self.SamplingMode = "LHS"
+            samplingMethod = GeneralDataFrame.get('Sampling_Method')
+            if isinstance(samplingMethod, str):
+                self.set_sampling_method(samplingMethod)
             # overwrite the sample size if it is given in the script
             if sampleSize is not None:
                 self.SampleSize = sampleSize
@@ -99,6 +110,18 @@ class StochasticObject():
             raise Exception("On the Sheet Uncertainty, make sure one switch for the sampling settings is selected "
                             "(i.e., one True and the other False")
 
+    def set_sampling_method(self, method):
+        """
+        Sets the method to sample the scenarios, instead of the one on the Excel sheet
+        :param method: (str) 'LHS', 'Sobol' or 'Halton' (scrambled quasi-Monte Carlo), or 'Combinatorial'
+        :return:
+        """
+        if method not in SAMPLING_METHODS + ('Combinatorial',):
+            raise ValueError("The sampling method {} is not supported, "
+                             "choose from {}".format(method, SAMPLING_METHODS + ('Combinatorial',)))
+
+        self.SamplingMode = method
+
     def set_phi_exclusion_list(self, phiExclusionDataFrame):
         """
         This function makes a list of tuples which contain the unit number and the components of the excluded elements
@@ -301,60 +324,119 @@ class StochasticObject():
         """
         # print in bold green 'make_scenario_dataframe_LHS, this might take a while'
         print('\033[1;32;40m make_scenario_dataframe_LHS, this might take a while \033[m')
+        self._make_sampled_dataframe('LHS', seed)
+        print('\033[1;32;40m LHS, DONE \033[m')
+
+    def make_scenario_dataframe_QMC(self, seed=66):
+        """
+        Same as make_scenario_dataframe_LHS, but the values are sampled with the scrambled Sobol or Halton sequence
+        (self.SamplingMode). For Sobol the sample size should be a power of 2.
+
+        :return: self.UncertaintyMatrix (dataframe)
+        """
+        if self.SamplingMode not in ('Sobol', 'Halton'):
+            raise ValueError("The sampling mode {} is not a quasi-Monte Carlo method".format(self.SamplingMode))
+
+        self._make_sampled_dataframe(self.SamplingMode, seed)
+        print('\033[1;32;40m {}, DONE \033[m'.format(self.SamplingMode))
+
+    def _make_sampled_dataframe(self, method, seed):
+        # all scenarios in one chunk
+        scenarioNames, scenarioProbabilities, sampled_values = next(self._iter_sample_chunks(None, seed, method))
+
+        self.ScenarioNames = scenarioNames
+        # we assume that the probability of each scenario happening is equal
+        self.ScenarioProbabilities = scenarioProbabilities
+        self.UncertaintyMatrix = sampled_values
+
+    def _unit_sample(self, method, num_params, num_samples, seed):
+        """
+        Draws the sample of the unit hypercube (num_samples x num_params)
+        :param method: (str) 'LHS', 'Sobol' or 'Halton'
+        :return: (array)
+        """
+        if method == 'LHS':
+            # Set the seed for reproducibility
+            random.seed(seed)
+            return lhs(num_params, samples=num_samples)
+
+        if method == 'Sobol':
+            sampler = qmc.Sobol(num_params, scramble=True, seed=seed)
+            if num_samples & (num_samples - 1):
+                print('--INFO:-- The Sobol sequence is balanced for sample sizes which are a power of 2, '
+                      '{} scenarios are sampled'.format(num_samples))
+        elif method == 'Halton':
+            sampler = qmc.Halton(num_params, scramble=True, seed=seed)
+        else:
+            raise ValueError("The sampling method {} is not supported, choose from {}".format(method,
+                                                                                            SAMPLING_METHODS))
+
+        with warnings.catch_warnings():
+            # the warning on the balance of the Sobol sequence is printed above
+            warnings.simplefilter('ignore', UserWarning)
+            return sampler.random(num_samples)
+
+    def _inverse_cdf(self, sample):
+        """
+        Converts a sample of the unit hypercube to the distributions of the uncertain parameters (one column per
+        parameter in GeneralDict), all columns of the same distribution at once.
+        :param sample: (array) sample of the unit hypercube
+        :return: (array) relative change of the parameters
+        """
+        distributions = [stats['Distribution_Function'] for stats in self.GeneralDict.values()]
+        variations = array([stats['(%)'] for stats in self.GeneralDict.values()], dtype=float)
+        for distribution_type in distributions:
+            if distribution_type not in ('Normal', 'Uniform'):
+                raise ValueError(f"Unsupported distribution type: {distribution_type}")
 
+        normal = array([distribution_type == 'Normal' for distribution_type in distributions], dtype=bool)
+        sampled_values = sample.astype(float, copy=True)
 
-        # Set the seed for reproducibility
-        random.seed(seed)
+        # normal distribution with a mean of 1 and the variation as standard deviation
+        sampled_values[:, normal] = norm.ppf(sample[:, normal], loc=1, scale=variations[normal])
+        # uniform distribution between 1 - variation and 1 + variation
+        lower = 1 - variations[~normal]
+        upper = 1 + variations[~normal]
+        sampled_values[:, ~normal] = uniform.ppf(sample[:, ~normal], loc=lower, scale=upper - lower)
 
+        # the values are changes relative to the base case
+        return sampled_values - 1
+
+    def _iter_sample_chunks(self, chunkSize, seed=66, method='LHS'):
+        """
+        Generator of the sampled scenarios in chunks of chunkSize scenarios (all scenarios if chunkSize is None).
+        The sample of the unit hypercube is drawn once for all scenarios (the strata and sequences span all
+        scenarios), the values of the parameters are calculated chunk by chunk.
+
+        :param chunkSize: (int) number of scenarios per chunk
+        :param seed: (int) seed of the random number generator
+        :param method: (str) 'LHS', 'Sobol' or 'Halton'
+        :return: generator of (scenario names, scenario probabilities, uncertainty matrix of the chunk)
+        """
         # Get the GeneralDict
         GeneralDict = self.GeneralDict
 
         # Define number of parameters and number of samples
         num_params = len(GeneralDict)
         num_samples = self.SampleSize
+        if chunkSize is None:
+            chunkSize = max(num_samples, 1)
 
-        # Generate LHS sample
-        lhs_sample = lhs(num_params, samples=num_samples)
-        #print(lhs_sample)
-
-        # Prepare to store sampled values
-        sampled_values = zeros((num_samples, num_params))
-        prob_densities = zeros((num_samples, num_params))
-        # Convert LHS samples to match the specified distributions
-        for i, (param, stats) in enumerate(GeneralDict.items()):
-            distribution_type = stats['Distribution_Function']
-            if distribution_type == 'Normal':
-                mean = 1
-                std_dev = stats['(%)']
-                # Convert uniform sample (lhs_sample) to normal distribution
-                sampled_values[:, i] = norm.ppf(lhs_sample[:, i], loc=mean, scale=std_dev)
-                #prob_densities[:, i] = self.calculate_probability_in_interval(sampled_values[:, i], stats)
-
-            elif distribution_type == 'Uniform':
-                lower = 1 - stats['(%)']
-                upper = 1 + stats['(%)']
-                # Scale LHS sample to the range of the uniform distribution
-                sampled_values[:, i] = uniform.ppf(lhs_sample[:, i], loc=lower, scale=upper - lower)
-                #prob_densities[:, i] = self.calculate_probability_in_interval(sampled_values[:, i], stats)
-                #prob_densities[:, i] = uniform.pdf(sampled_values[:, i], loc=lower, scale=upper - lower)
-            else:
-                raise ValueError(f"Unsupported distribution type: {distribution_type}")
+        unit_sample = self._unit_sample(method, num_params, num_samples, seed)
 
-        # we need to do some further processing of the sampled values
-        # first all the values need to be subtracted by 1
-        sampled_values = sampled_values - 1
-        # then column names need to be added to the sampled values and the formate needs to be changed to a dataframe
-        sampled_values = pd.DataFrame(sampled_values, columns=list(GeneralDict.keys()))
+        for start in range(0, num_samples, chunkSize):
+            stop = min(start + chunkSize, num_samples)
 
-        # make the list of scenario names and probabilities
-        scenarioNames = []
-        for n in range(num_samples):
-            scenarioNames.append("sc{}".format(n + 1))
-        self.ScenarioNames = scenarioNames
-        # we assume that the probability of each scenario happening is equal
-        self.ScenarioProbabilities = [1 / num_samples for i in scenarioNames]
-        self.UncertaintyMatrix = sampled_values
-        print('\033[1;32;40m LHS, DONE \033[m')
+            # column names need to be added to the sampled values and the formate needs to be changed to a dataframe
+            sampled_values = pd.DataFrame(self._inverse_cdf(unit_sample[start:stop]), columns=list(GeneralDict.keys()),
+                                          index=range(start, stop))
+
+            # make the list of scenario names and probabilities
+            scenarioNames = ["sc{}".format(n + 1) for n in range(start, stop)]
+            # we assume that the probability of each scenario happening is equal
+            scenarioProbabilities = [1 / num_samples for _ in scenarioNames]
+
+            yield scenarioNames, scenarioProbabilities, sampled_values
 
     def calculate_probability_in_interval(sel, data, metadata):
         """
@@ -402,97 +484,175 @@ class StochasticObject():
         This function makes a dataframe with all the scenarios and their values for each uncertain parameter
         :return: self.UncertaintyMatrix (dataframe)
         """
-        # Define your list and values for n and r
-        my_list = self.DiscretizationList
-        # Number of variables
-        m = len(self.GroupDict)
-        # Number of states each variable can take
-        r = self.Discretization
-        # Generating all states each variable can take
-        states = [my_list for _ in range(m)]
-        # Getting the cartesian product of states
-        combinations = list(itertools.product(*states))
-        # Converting combinations to a DataFrame
-        df = pd.DataFrame(combinations, columns=[f'Variable_{i + 1}' for i in range(m)])
-
-        nr = 1
+        # all scenarios in one chunk
+        scenarioNames, scenarioProbabilities, df = next(self._iter_combinatorial_chunks(None))
+
+        self.UncertaintyMatrix = df
+        self.ScenarioNames = scenarioNames
+
+        # make the list of scenario probabilities
+        if self.CombinatorialProbabilitySetting == 'uniform':
+            self.ScenarioProbabilities = scenarioProbabilities
+        else:
+            self.ScenarioProbabilities.extend(scenarioProbabilities)
+
+    def _combinatorial_columns(self):
+        """
+        Makes the columns of the combinatorial uncertainty matrix. Every group is one variable of the combinations,
+        the parameters of a group are correlated to the reference parameter of the group (equal or opposite). The
+        correlated parameters are placed before the reference parameter of their group.
+
+        :return: list of (parameter name, variable number, sign)
+        """
+        columns = []
+        nr = 0
         for key, value in self.GroupDict.items():
-            referenceNameGroup = None
-            column_index = None
             if len(value) > 1:
-
                 # find the reference name in the group
-                for i in value:
-                    correlation = self.GeneralDict[i]['Correlation']
-                    # find the reference name in the group
-                    if correlation == 'reference':  # the column name on position pos-1 becomes i
-                        df.rename(columns={'Variable_{}'.format(nr): i}, inplace=True)
-                        nr += 1
-                        referenceNameGroup = i
-                        column_index = df.columns.get_loc(referenceNameGroup)
+                references = [i for i in value if self.GeneralDict[i]['Correlation'] == 'reference']
 
                 # error if no reference name is found for group i
-                if referenceNameGroup is None or column_index is None:
+                if len(references) != 1:
                     raise ValueError("There is no reference variable in Group {}".format(key))
 
-                # add the additional columns to the df which are correlated to the reference variable
+                # add the additional columns which are correlated to the reference variable
                 for varName in value:
                     correlation = self.GeneralDict[varName]['Correlation']
                     if correlation == 'equal':
-                        df.insert(column_index, varName, df[referenceNameGroup])
-                        column_index += 1
+                        columns.append((varName, nr, 1))
                     elif correlation == 'opposite':
-                        df.insert(column_index, varName, df[referenceNameGroup] * -1)
-                        column_index += 1
+                        columns.append((varName, nr, -1))
                     elif correlation == 'reference':
                         continue
                     else:
                         raise ValueError("The correlation {} is not supported".format(correlation))
+
+                columns.append((references[0], nr, 1))
             else:
-                colName = value[0]
-                df.rename(columns={'Variable_{}'.format(nr): colName}, inplace=True)
-                nr += 1
+                columns.append((value[0], nr, 1))
+            nr += 1
 
-        dfScenarioCopy = df.copy()
+        return columns
 
-        for varName in df.columns:
-            variation = self.GeneralDict[varName]['(%)']
-            df[varName] = df[varName] * variation
+    def _iter_combinatorial_chunks(self, chunkSize):
+        """
+        Generator of the combinatorial scenarios in chunks of chunkSize scenarios (all scenarios if chunkSize is None),
+        the combinations of the levels are made chunk by chunk instead of all at once.
 
-        self.UncertaintyMatrix = df
+        :param chunkSize: (int) number of scenarios per chunk
+        :return: generator of (scenario names, scenario probabilities, uncertainty matrix of the chunk)
+        """
+        if self.CombinatorialProbabilitySetting not in ('uniform', 'custom'):
+            raise ValueError("ERROR ON EXCEL SHEET 'Uncertainty' \n"
+                             "The probability setting {} is not supported yet".format(
+                self.CombinatorialProbabilitySetting))
 
-        # make the list of scenario names
-        scenarioNames = []
-        for n in range(len(combinations)):
-            scenarioNames.append("sc{}".format(n + 1))
-        self.ScenarioNames = scenarioNames
+        columns = self._combinatorial_columns()
+        # Number of variables
+        m = len(self.GroupDict)
+        numberOfScenarios = len(self.DiscretizationList) ** m
+        if chunkSize is None:
+            chunkSize = max(numberOfScenarios, 1)
+
+        # Getting the cartesian product of the states each variable can take, chunk by chunk
+        combinations = itertools.product(*[self.DiscretizationList for _ in range(m)])
+
+        start = 0
+        while True:
+            chunk = list(itertools.islice(combinations, chunkSize))
+            if not chunk:
+                break
+            stop = start + len(chunk)
+
+            # the levels of the variables, the correlated parameters take the level of their reference
+            levels = pd.DataFrame(chunk, index=range(start, stop))
+            df = pd.DataFrame({varName: levels[nr] * sign for varName, nr, sign in columns}, index=levels.index)
+
+            dfScenarioCopy = df.copy()
+            for varName in df.columns:
+                variation = self.GeneralDict[varName]['(%)']
+                df[varName] = df[varName] * variation
+
+            # make the list of scenario names
+            scenarioNames = ["sc{}".format(n + 1) for n in range(start, stop)]
+
+            # make the list of scenario probabilities
+            if self.CombinatorialProbabilitySetting == 'uniform':
+                scenarioProbabilities = [1 / numberOfScenarios for _ in scenarioNames]
+            else:
+                # the product of the probabilities of the levels of the reference parameters
+                scenarioProbabilities = [1] * len(scenarioNames)
+                for param in dfScenarioCopy.columns:
+                    if self.GeneralDict[param]['Correlation'] == 'reference':
+                        probabilityDict = self.GeneralDict[param]['ProbabilityDict']
+                        scenarioProbabilities = [probabilitySC * probabilityDict[lv] for probabilitySC, lv in
+                                                 zip(scenarioProbabilities, dfScenarioCopy[param].tolist())]
+
+            yield scenarioNames, scenarioProbabilities, df
+            start = stop
+
+    def iter_scenario_chunks(self, chunkSize=1000, seed=66):
+        """
+        Generator of the scenarios in chunks of chunkSize scenarios, so large samples can be used without making the
+        uncertainty matrix of all scenarios at once (make_scenario_dataframe_LHS/_combinatorial). For combinatorial
+        sampling set_group_dict needs to be called first.
 
-        # make the list of scenario probabilities
-        if self.CombinatorialProbabilitySetting == 'uniform':
-            self.ScenarioProbabilities = [1 / len(scenarioNames) for i in scenarioNames]
-
-        elif self.CombinatorialProbabilitySetting == 'custom':
-            for _, row in dfScenarioCopy.iterrows():
-                probabilityListParam = []
-                probabilityListSC = 1
-                for param in row.index:
-                    # check if the parameter is a reference parameter if not skip it
-                    correlation = self.GeneralDict[param]['Correlation']
-                    if correlation == 'reference':
-                        lv = row[param]
-                        probability = self.GeneralDict[param]['ProbabilityDict'][lv]
-                        probabilityListParam.append(probability)
-                        probabilityListSC *= probability
-                self.ScenarioProbabilities.append(probabilityListSC)
-
-            # a = sum(self.ScenarioProbabilities)
-            # print(a)
-            # print('heerererere')
+        :param chunkSize: (int) number of scenarios per chunk
+        :param seed: (int) seed of the random number generator (LHS, Sobol, Halton)
+        :return: generator of (scenario names, scenario probabilities, uncertainty matrix of the chunk)
+        """
+        if self.SamplingMode == 'Combinatorial':
+            return self._iter_combinatorial_chunks(chunkSize)
+        elif self.SamplingMode in SAMPLING_METHODS:
+            return self._iter_sample_chunks(chunkSize, seed, self.SamplingMode)
+        else:
+            raise ValueError('Sampling mode not recognized')
 
+    def count_scenarios(self):
+        """
+        :return: number of scenarios of the sampling mode (int)
+        """
+        if self.SamplingMode == 'Combinatorial':
+            return len(self.DiscretizationList) ** len(self.GroupDict)
+        elif self.SamplingMode in SAMPLING_METHODS:
+            return self.SampleSize
         else:
-            raise ValueError("ERROR ON EXCEL SHEET 'Uncertainty' \n"
-                             "The probability setting {} is not supported yet".format(
-                self.CombinatorialProbabilitySetting))
+            raise ValueError('Sampling mode not recognized')
+
+    def reduce_scenarios(self, numberOfScenarios, method='fast forward', seed=66):
+        """
+        Reduces the scenarios of the uncertainty matrix (make_scenario_dataframe_*) to a smaller set of weighted
+        scenarios, which is then used for the odds of the stochastic problem and the wait and see analysis.
+        The kept scenarios are renamed sc1, sc2, ... and the distance to the original distribution is saved in
+        self.ReductionDistance, the original scenario of every kept scenario in self.ReductionReport.
+
+        :param numberOfScenarios: (int) number of scenarios which are kept
+        :param method: (str) 'fast forward' or 'k-medoids', see utils.scenario_reduction.reduce_scenarios
+        :param seed: (int) seed of the initial medoids (k-medoids)
+        :return: self.UncertaintyMatrix (dataframe)
+        """
+        matrix = getattr(self, 'UncertaintyMatrix', None)
+        if matrix is None:
+            raise ValueError('The scenarios need to be made before they can be reduced (make_scenario_dataframe_*)')
+
+        selected, probabilities, distance, relativeDistance = reduce_scenarios(matrix, self.ScenarioProbabilities,
+                                                                               numberOfScenarios, method, seed)
+
+        originalNames = [self.ScenarioNames[i] for i in selected]
+        self.UncertaintyMatrix = matrix.iloc[selected].reset_index(drop=True)
+        self.ScenarioNames = ["sc{}".format(n + 1) for n in range(len(selected))]
+        self.ScenarioProbabilities = probabilities.tolist()
+        self.NumberOfScenarios = len(selected)
+
+        self.ReductionDistance = {'Distance': distance, 'Relative distance': relativeDistance}
+        self.ReductionReport = pd.DataFrame({'Original scenario': originalNames,
+                                             'Probability': self.ScenarioProbabilities},
+                                            index=self.ScenarioNames)
+
+        print('--INFO:-- {} scenarios reduced to {} ({}), distance to the original distribution: {:.4g} '
+              '(relative to the expected value scenario: {:.3f})'.format(len(matrix), len(selected), method,
+                                                                         distance, relativeDistance))
+        return self.UncertaintyMatrix
 
 
 
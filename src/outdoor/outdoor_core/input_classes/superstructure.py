@@ -1,11 +1,20 @@
 import copy
 import math
+from contextlib import contextmanager
+from itertools import repeat
 
 import numpy as np
-import pandas as pd
 from numpy.ma.core import negative
 
-from ..utils.linearizer import capex_calculator
+from ..utils.heat_intervals import interval_fractions, interval_utility_costs
+from ..utils.linearizer import capex_calculator_vectorized
+from ..utils.scenario_data import ScenarioStream, make_scenario_data_files
+
+# unit parameters which are calculated in create_DataFile from the superstructure data (heat grid, CAPEX curves,
+# interest rate...) {parameter name: unit attribute}. They are read from the unit attributes, not from its ParameterList
+DERIVED_UNIT_PARAMETERS = {'tau_h': 'tau_h', 'tau_c': 'tau_c', 'beta': 'beta', 'lin_CAPEX_x': 'lin_CAPEX_x',
+                           'lin_CAPEX_y': 'lin_CAPEX_y', 'ACC_Factor': 'ACC_Factor', 'flh': 'FLH', 'K_OM': 'K_OM',
+                           'to_acc': 'turn_over_acc'}
 
 
 class Superstructure:
@@ -228,7 +237,10 @@ class Superstructure:
         self.HeatIntervalList = {'HI': []}
         self.HeatUtilitiesList = {'H_UT': []}
         self.Heat_Temperatures = []
+        self.inputHeatTemperatures = []
         self.HeatIntervals = {}
+        self.temperatureMergeTolerance = 0
+        self.HeatTemperatureMergeMap = {}
         self.UtilitiesList = {'UT': []}
         self.OtherUtilitiesList = {'U_UT': []}
         # ---------------------------
@@ -266,6 +278,9 @@ class Superstructure:
         #  Cost calculation variables
         # ----------------------------
         self.linearizationDetail = 'real'
+        self.linearizationMaxError = 0.01
+        self.piecewiseFormulation = 'incremental'
+        self.lazyImpactCategories = False
         self.IR = {'IR': 0}
         self.H = {'H': 0}
         self.CECPI = {'CECPI': 0}
@@ -409,12 +424,14 @@ class Superstructure:
             print('Please chose for State either On or Off, a non-negative \
                   lifetime and for COP a value > 1')
 
-    def set_linearizationDetail(self, Detail='real'):
+    def set_linearizationDetail(self, Detail='real', maxError=0.01):
         """
         Parameters
         ----------
         Detail : String
-            Use: "fine" , "average" or "rough"
+            Use: "fine" , "average", "rough", "real" or "adaptive"
+        maxError : Float
+            Largest relative linearization error of the adaptive mode (default 1 %)
 
         Context
         -------
@@ -425,9 +442,87 @@ class Superstructure:
             average  :  20
             rough    :  10
             real     : New Approach
+            adaptive : as few intervals as needed to meet maxError for all cost units
+                       (see capex_calculator_vectorized)
 
         """
         self.linearizationDetail = Detail
+        self.linearizationMaxError = maxError
+
+    def set_piecewiseFormulation(self, Formulation='incremental'):
+        """
+        Parameters
+        ----------
+        Formulation : String
+            Use: "incremental", "sos2" or "log"
+
+        Context
+        -------
+        Sets how the piece-wise linear CAPEX curves are formulated in the model:
+
+            incremental : one binary per interval (default)
+            sos2        : SOS2 constraints on the interpolation weights, no binaries. Needs a solver
+                          with SOS support (e.g. Gurobi, CPLEX or CBC)
+            log         : logarithmic Gray code encoding with ceil(log2(intervals)) binaries
+
+        The binaries of the incremental formulation grow with the number of intervals, so for the
+        "fine" linearization detail the log or sos2 formulation is recommended.
+
+        """
+        if Formulation not in ('incremental', 'sos2', 'log'):
+            raise ValueError("The piecewise formulation {} is not valid, use 'incremental', 'sos2' or 'log'"
+                             .format(Formulation))
+
+        self.piecewiseFormulation = Formulation
+
+    def set_temperatureMergeTolerance(self, Tolerance=0):
+        """
+        Parameters
+        ----------
+        Tolerance : Float
+            Maximal distance in K of temperatures which are merged into one temperature of the grid (0: no merging)
+
+        Context
+        -------
+        Every distinct process and utility temperature adds a heat interval, so temperatures which are only a
+        few K apart multiply the heat cascade of the model. With a tolerance the sorted temperatures are grouped,
+        every group spans at most Tolerance K, and each group is replaced by one temperature before the heat
+        intervals, beta and delta_q are calculated:
+
+            - the utility and heat pump temperature of the group, if there is one (at most one per group)
+            - otherwise the middle of the group
+
+        Every process temperature is therefore moved by at most Tolerance K (Tolerance/2 K if no utility is in
+        its group), utility and heat pump temperatures are never moved. The heat integration result is that of
+        the superstructure with these moved temperatures: heat can be exchanged between a hot and a cold stream
+        which are up to 2*Tolerance K colder than in the original data (or not between streams up to 2*Tolerance K
+        hotter), comparable to a change of the minimal temperature difference by 2*Tolerance K.
+
+        The merged temperatures are stored in HeatTemperatureMergeMap {original temperature: grid temperature}
+        and reported when the data file is created.
+
+        """
+        if Tolerance < 0:
+            raise ValueError("The temperature merge tolerance must be non-negative, got {}".format(Tolerance))
+
+        self.temperatureMergeTolerance = Tolerance
+
+    def set_lazyImpactCategories(self, State=True):
+        """
+        Parameters
+        ----------
+        State : Boolean
+            True to only build the LCA constraints of the impact categories which are used by the model
+
+        Context
+        -------
+        Only the impact categories used as objective or as multi-objective are part of the MILP. All
+        other impact categories are calculated after the solve from the optimal flows and energy demands,
+        the reported results stay the same. Categories which are used later on as objective or bound
+        (e.g. in the multi-objective mode) are added to the model instance when they are needed.
+
+        """
+        self.lazyImpactCategories = State
 
     #------------------------------------------------------------------------------
     #------------------------------------------------------------------------------
@@ -568,7 +663,12 @@ class Superstructure:
 
 
     def add_linearisationIntervals(self):
-        if self.linearizationDetail == "rough":
+        if self.linearizationDetail == "adaptive":
+            costUnits = [i for i in self.UnitsList if i.Number in self.CostUnitsList['U_C']]
+            (x_vals, y_vals) = capex_calculator_vectorized(costUnits, self.CECPI, Detail='adaptive',
+                                                           maxError=getattr(self, 'linearizationMaxError', 0.01))
+            n = len(x_vals['lin_CAPEX_x']) // max(1, len(costUnits))
+        elif self.linearizationDetail == "rough":
             n = 10
         elif self.linearizationDetail == "fine":
             n = 301
@@ -577,11 +677,8 @@ class Superstructure:
         else:
             n = 13
 
-        for i in range(1, n):
-            self.LinPointsList['J'].append(i)
-            self.LinIntervalsList['JI'].append(i)
-
-        self.LinPointsList['J'].append(n)
+        self.LinIntervalsList['JI'] = list(range(1, n))
+        self.LinPointsList['J'] = list(range(1, n + 1))
 
     def __add_temperatureIntervals(self):
         """
@@ -611,6 +708,9 @@ class Superstructure:
 
         """
 
+        self.HeatIntervals = {}
+        self.HeatIntervalList['HI'] = []
+
         k = len(self.Heat_Temperatures) - 1
         for i in self.Heat_Temperatures:
             self.HeatIntervals[k] = i
@@ -642,10 +742,9 @@ class Superstructure:
     #------------------------------------------------------------------------------
 
     def __set_deltaQ(self):
-        for i, j in self.heat_utilities.items():
-            for k, t in self.HeatIntervals.items():
-                if t <= i and k < len(self.HeatIntervals) - 1:
-                    self.delta_q['delta_q'][k + 1] = j
+        temperatures = [self.HeatIntervals[t] for t in sorted(self.HeatIntervals, reverse=True)]
+        self.delta_q['delta_q'] = interval_utility_costs(temperatures, list(self.heat_utilities),
+                                                         list(self.heat_utilities.values()))
 
     def set_deltaUt(self, delta_ut_dic):
         for j, k in delta_ut_dic.items():
@@ -679,11 +778,12 @@ class Superstructure:
         -----------
         Takes all Processes assigned to the Superstructur Object and checks
         their Process Temperatures (T) T_IN and T_OUT values.
-        From these values it calls
+        The Temperature Grid
 
-            - add.HeatTemperatures(T)
+            - Heat_Temperatures
 
-        in order to set the Temperatures to the Heatintervals, List etc.
+        is set to these values and the utility and heat pump temperatures
+        (inputHeatTemperatures), so it does not depend on earlier calls.
 
 
 
@@ -699,14 +799,18 @@ class Superstructure:
         # create a dictionary with all the parameters and the corresponding prices
         dictTempPrices = {'super': 0, 'high': 0, 'medium': 0, 'low': 0}
 
+        # superstructures of older versions only have the grid, it holds the utility and heat pump temperatures
+        if not hasattr(self, 'inputHeatTemperatures'):
+            self.inputHeatTemperatures = list(self.Heat_Temperatures)
+
+        temperatures = set(self.inputHeatTemperatures)
         for i in self.UnitsList:
             if i.Number in self.CostUnitsList['U_C']:
-                for j in i.T_IN.values():
-                    if j != {}:
-                        self.__set_heatTemperatures(j)
-                for j in i.T_OUT.values():
+                for j in list(i.T_IN.values()) + list(i.T_OUT.values()):
                     if j != {}:
-                        self.__set_heatTemperatures(j)
+                        temperatures.update(t for t in (j if type(j) == list else [j]) if t is not None)
+
+        self.Heat_Temperatures = sorted(temperatures)
 
     def __set_heatTemperatures(self, *args):
         """
@@ -718,11 +822,12 @@ class Superstructure:
 
         Description
         -----------
-        Takes Temperatures and addes them to the Pythonlist (if not already there)
+        Takes Temperatures and addes them to the Pythonlists (if not already there)
 
+            - inputHeatTemperatures
             - Heat_Temperatures
 
-        afterwards sorts the List in Numeric Order
+        afterwards sorts the Lists in Numeric Order
 
 
 
@@ -730,23 +835,80 @@ class Superstructure:
         -------
         Is called from Methods:
 
-                - add_ProcessTemperatures()
-                - add_heatUtilities()
+                - set_heatUtilities()
+                - set_heatPump()
 
-        to fill all Temperatures to a Grid
+        to add the utility and heat pump Temperatures to the Grid
 
         """
+        if not hasattr(self, 'inputHeatTemperatures'):
+            self.inputHeatTemperatures = list(self.Heat_Temperatures)
 
-        for i in args:
-            if type(i) == list:
-                for j in i:
-                    if j not in self.Heat_Temperatures and j is not None:
-                        self.Heat_Temperatures.append(j)
-            else:
-                if i not in self.Heat_Temperatures and i is not None:
-                    self.Heat_Temperatures.append(i)
+        for temperatureList in (self.inputHeatTemperatures, self.Heat_Temperatures):
+            for i in args:
+                for j in (i if type(i) == list else [i]):
+                    if j not in temperatureList and j is not None:
+                        temperatureList.append(j)
+
+        self.inputHeatTemperatures = sorted(self.inputHeatTemperatures)
         self.Heat_Temperatures = sorted(self.Heat_Temperatures)
 
+    def __merge_heatTemperatures(self):
+        """
+        Description
+        -----------
+        Merges the temperatures of the grid
+
+            - Heat_Temperatures
+
+        which are at most temperatureMergeTolerance K apart (see set_temperatureMergeTolerance) and stores the
+        changed temperatures in
+
+            - HeatTemperatureMergeMap
+
+
+
+        Context
+        -------
+        Is called in __prepare_heatEquations after all Temperatures are added to the Grid and before the
+        temperature intervals are created
+
+        """
+        tolerance = getattr(self, 'temperatureMergeTolerance', 0)
+        self.HeatTemperatureMergeMap = {}
+        if not tolerance:
+            return
+
+        # utility and heat pump temperatures keep their value, they define the prices and the heat pump intervals
+        fixedTemperatures = set(self.heat_utilities)
+        if self.HP_active:
+            fixedTemperatures |= {self.HP_T_IN['Temperature'], self.HP_T_OUT['Temperature']}
+
+        groups = []
+        for t in self.Heat_Temperatures:
+            if (groups and t - groups[-1][0] <= tolerance
+                    and not (t in fixedTemperatures and any(g in fixedTemperatures for g in groups[-1]))):
+                groups[-1].append(t)
+            else:
+                groups.append([t])
+
+        mergedTemperatures = []
+        for group in groups:
+            fixed = [t for t in group if t in fixedTemperatures]
+            gridTemperature = fixed[0] if fixed else (group[0] + group[-1]) / 2
+            mergedTemperatures.append(gridTemperature)
+            for t in group:
+                if t != gridTemperature:
+                    self.HeatTemperatureMergeMap[t] = gridTemperature
+
+        if self.HeatTemperatureMergeMap:
+            print("--INFO:-- Heat temperatures merged with a tolerance of {} K: {} of {} temperatures left ----"
+                  .format(tolerance, len(mergedTemperatures), len(self.Heat_Temperatures)))
+            for t, gridTemperature in self.HeatTemperatureMergeMap.items():
+                print("--INFO:--     {} -> {}".format(t, gridTemperature))
+
+        self.Heat_Temperatures = mergedTemperatures
+
     def set_heatUtilities(self, TemperatureList, CostList):
         """
         Parameters
@@ -843,7 +1005,8 @@ class Superstructure:
                 1. If 0 < tau < 0  -- > If tau > 0 : tau_h , else tau_c
                 2. Cross references TIN and TOUT as well as DeltaT with T-Grid
                     and calculates the Split (Portion) of TGrid(k) - TGrid(k-1)
-                    based on DeltaT
+                    based on DeltaT, for all heating and all cooling streams at once
+                    (interval_fractions)
                 3. Sets Splits as beta Attributes
                 4. If TIN = TOUT and tau != 0  --> Process is isothermal, beta is
                     1 for on specific Heat Interval
@@ -851,51 +1014,37 @@ class Superstructure:
 
         """
 
-        r = len(self.Heat_Temperatures)
+        heatingStreams, coolingStreams = [], []
 
         for i in self.UnitsList:
             if (i.Number in self.CostUnitsList['U_C'] and i.Number not in self.HeatGeneratorList["U_FUR"]
                 and i.Number not in self.ElectricityGeneratorList['U_TUR']):
+                i.beta = {'beta': {}}
                 for k, j in i.HeatData.items():
                     tau = j['tau']
                     if tau is not None:
-                        t_in = j['TIN']
-                        t_out = j['TOUT']
+                        # temperatures merged into the grid use the grid temperature
+                        t_in = self.HeatTemperatureMergeMap.get(j['TIN'], j['TIN'])
+                        t_out = self.HeatTemperatureMergeMap.get(j['TOUT'], j['TOUT'])
                         if tau > 0:
-                            DeltaT = t_out - t_in
                             i.tau_h['tau_h'][k, i.Number] = tau
                             i.tau_c['tau_c'][k, i.Number] = 0
-                            for t, s in self.HeatIntervals.items():
-                                if t_in > s:
-                                    i.beta['beta'][i.Number, k, t] = 0
-                                else:
-                                    if t_out == s and t_out == t_in:
-                                        i.beta['beta'][i.Number, k, t] = 1
-                                    else:
-                                        if t != 0:
-                                            if t_out >= self.HeatIntervals[t - 1]:
-                                                i.beta['beta'][i.Number, k, t] = (self.HeatIntervals[
-                                                                                      t - 1] - s) / DeltaT
-                                            else:
-                                                i.beta['beta'][i.Number, k, t] = 0
+                            heatingStreams.append((i, k, t_in, t_out))
                         else:
-                            DeltaT = t_in - t_out
                             i.tau_h['tau_h'][k, i.Number] = 0
                             i.tau_c['tau_c'][k, i.Number] = -tau
-                            for t, s in self.HeatIntervals.items():
-                                if t_out > s:
-                                    i.beta['beta'][i.Number, k, t] = 0
-                                else:
-                                    if t_out == s and t_out == t_in:
-                                        i.beta['beta'][i.Number, k, t + 1] = 1
-                                    else:
-                                        if t != 0:
-                                            if t_in >= self.HeatIntervals[t - 1]:
-                                                i.beta['beta'][i.Number, k, t] = (self.HeatIntervals[
-                                                                                      t - 1] - s) / DeltaT
-                                            else:
-                                                i.beta['beta'][i.Number, k, t] = 0
-                i.ParameterList.append(i.beta)
+                            coolingStreams.append((i, k, t_in, t_out))
+
+        # the splits of all heating and all cooling streams are calculated at once
+        temperatures = [self.HeatIntervals[t] for t in sorted(self.HeatIntervals, reverse=True)]
+        for streams, heating in ((heatingStreams, True), (coolingStreams, False)):
+            if not streams:
+                continue
+
+            fractions = interval_fractions(temperatures, [stream[2] for stream in streams],
+                                           [stream[3] for stream in streams], Heating=heating)
+            for (i, k, _, _), fraction in zip(streams, fractions):
+                i.beta['beta'].update(zip(zip(repeat(i.Number), repeat(k), fraction), fraction.values()))
 
     def __calc_capexLinearizationParameters(self):
         """
@@ -906,14 +1055,23 @@ class Superstructure:
 
         Uses the Side Module
 
-            - capex_calculator()
+            - capex_calculator_vectorized()
 
 
         """
-        for i in self.UnitsList:
-            if i.Number in self.CostUnitsList['U_C']:
-                aa = i.Number
-                (i.lin_CAPEX_x, i.lin_CAPEX_y) = capex_calculator(i, self.CECPI, Detail=self.linearizationDetail)
+        costUnits = [i for i in self.UnitsList if i.Number in self.CostUnitsList['U_C']]
+        (x_vals, y_vals) = capex_calculator_vectorized(costUnits, self.CECPI, Detail=self.linearizationDetail,
+                                                       maxError=getattr(self, 'linearizationMaxError', 0.01),
+                                                       intervals=len(self.LinIntervalsList['JI']) or None)
+
+        for i in costUnits:
+            i.lin_CAPEX_x = {'lin_CAPEX_x': {}}
+            i.lin_CAPEX_y = {'lin_CAPEX_y': {}}
+
+        unitsByNumber = {i.Number: i for i in costUnits}
+        for (u, j), x in x_vals['lin_CAPEX_x'].items():
+            unitsByNumber[u].lin_CAPEX_x['lin_CAPEX_x'][u, j] = x
+            unitsByNumber[u].lin_CAPEX_y['lin_CAPEX_y'][u, j] = y_vals['lin_CAPEX_y'][u, j]
 
     def __calc_accFactorParameter(self):
         """
@@ -952,19 +1110,20 @@ class Superstructure:
                     x.K_OM['K_OM'][x.Number] = self.K_OM
 
     def __scan_unit_connections(self):
+        """
+        Description
+        -----------
+        Sets the connections (u, uu) of the superstructure from the split factors myu (u, (uu, i)) of the
+        data file and the distributor connections. The connections are collected in an ordered dictionary,
+        so every connection is only added once.
 
-        data_file = self.Data_File[None]
-        connector_data = data_file['myu']
-
-        for i in connector_data.keys():
-            connection = (i[0], i[1][0])
+        """
+        connector_data = self.Data_File[None].get('myu', {})
 
-            if connection not in self.connections_set['U_CONNECTORS']:
-                self.connections_set['U_CONNECTORS'].append(connection)
+        connections = dict.fromkeys((i[0], i[1][0]) for i in connector_data)
+        connections.update(dict.fromkeys(self.distributor_subset['U_DIST_SUB']))
 
-        for i in self.distributor_subset['U_DIST_SUB']:
-            if i not in self.connections_set['U_CONNECTORS']:
-                self.connections_set['U_CONNECTORS'].append(i)
+        self.connections_set = {'U_CONNECTORS': list(connections)}
 
     def _set_waste_management_types(self, waste_types: list):
         for waste_type in waste_types:
@@ -1079,6 +1238,156 @@ class Superstructure:
                 wasteType = dto.dialogData['Waste Management']
                 self.WasteTypeU['waste_type_U'][dto.uid] = wasteType
 
+    # Reachability analysis of the superstructure graph
+    # ---------------
+
+    def find_deadUnits(self):
+        """
+        Description
+        -----------
+        Analyses the flow graph of the superstructure (possible sources U_SU, split factors myu
+        and distributor targets U_DIST_SUB) and finds the units which can never carry a flow
+        that ends in a product pool, turbine or furnace, because they can not be reached from
+        a source or can not reach any of these sinks.
+
+        Units required by the input data are never dead: the load unit, sources with a lower
+        limit and product pools with a minimal production. A process group is only dead if all
+        its members are dead, and the targets of the forced connections of a live unit are never dead.
+
+        Returns
+        -------
+        deadUnits : Dictionary
+            {UnitNumber: reason}
+
+        """
+        downstream = {unit.Number: set() for unit in self.UnitsList}
+        upstream = {unit.Number: set() for unit in self.UnitsList}
+
+        edges = list(self.SourceSet['U_SU']) + list(self.distributor_subset['U_DIST_SUB'])
+        for unit in self.UnitsList:
+            # the keys of the stochastic split factors have the scenario as the last entry
+            for key, value in unit.myu['myu'].items():
+                if value:
+                    edges.append((key[0], key[1][0]))
+
+        for (u, uu) in edges:
+            if u in downstream and uu in downstream:
+                downstream[u].add(uu)
+                upstream[uu].add(u)
+
+        def reachable(start, graph):
+            visited = set(start)
+            stack = list(start)
+            while stack:
+                for uu in graph[stack.pop()]:
+                    if uu not in visited:
+                        visited.add(uu)
+                        stack.append(uu)
+            return visited
+
+        sinks = (set(self.ProductPoolList['U_PP']) | set(self.ElectricityGeneratorList['U_TUR'])
+                 | set(self.HeatGeneratorList['U_FUR']))
+        fromSources = reachable(self.SourceList['U_S'], downstream)
+        toSinks = reachable([u for u in sinks if u in upstream], upstream)
+
+        required = set()
+        for unit in self.UnitsList:
+            if unit.Name == self.loadName:
+                required.add(unit.Number)
+            elif unit.Number in self.SourceList['U_S'] and unit.LowerLimit['ll'][unit.Number]:
+                required.add(unit.Number)
+            elif unit.Number in self.ProductPoolList['U_PP'] and unit.min_production['MinProduction'][unit.Number]:
+                required.add(unit.Number)
+
+        deadUnits = dict()
+        for unit in self.UnitsList:
+            if unit.Number in required:
+                continue
+            elif unit.Number not in fromSources:
+                deadUnits[unit.Number] = 'not reachable from a source'
+            elif unit.Number not in toSinks:
+                deadUnits[unit.Number] = 'can not reach a product pool, turbine or furnace'
+
+        # the binaries of group members and of forced connection targets are linked to live units, they
+        # are kept until no more units are revived
+        revived = True
+        while revived:
+            revived = False
+            for members in self.groups.values():
+                if any(u not in deadUnits for u in members) and any(u in deadUnits for u in members):
+                    for u in members:
+                        deadUnits.pop(u, None)
+                    revived = True
+            for u, connectionTypes in self.connections.items():
+                if u in deadUnits:
+                    continue
+                for targets in connectionTypes.values():
+                    for uu in targets or []:
+                        if uu in deadUnits:
+                            deadUnits.pop(uu)
+                            revived = True
+
+        return deadUnits
+
+    @contextmanager
+    def __deadUnits_removed(self, deadUnits, printReport=True):
+        """
+        Parameters
+        ----------
+        deadUnits : Dictionary
+            {UnitNumber: reason} of the units found by find_deadUnits()
+        printReport : Boolean, optional
+            Prints the removed units and the reason for their removal
+
+        Description
+        -----------
+        Used by create_DataFile(). Inside the with block the unit list, all unit sets and the unit names
+        and waste types are replaced by new objects without the dead units, so no sets, variables and
+        constraints are created for them. The split factors to dead units are left out in
+        __fill_processParameterList(). At the end of the block the original objects are put back, so
+        the superstructure (and its units, groups and connections) is never changed.
+
+        """
+        if printReport and deadUnits:
+            print("\033[93m" + "Removed {} unit(s) that can not be part of a flow path from a source to a product:"
+                  .format(len(deadUnits)) + "\033[0m")
+            for unit in self.UnitsList:
+                if unit.Number in deadUnits:
+                    print("\033[93m" + "    {}: {}".format(unit.Name, deadUnits[unit.Number]) + "\033[0m")
+
+        # sets of units and sets of tuples with the positions that hold a unit
+        unitSets = [('UnitsNumberList', 'U', None), ('UnitsNumberList2', 'UU', None),
+                    ('StoichRNumberList', 'U_STOICH_REACTOR', None), ('YieldRNumberList', 'U_YIELD_REACTOR', None),
+                    ('SplitterNumberList', 'U_SPLITTER', None), ('HeatGeneratorList', 'U_FUR', None),
+                    ('ElectricityGeneratorList', 'U_TUR', None), ('ProductPoolList', 'U_PP', None),
+                    ('CostUnitsList', 'U_C', None), ('SourceList', 'U_S', None), ('distributor_list', 'U_DIST', None),
+                    ('SourceSet', 'U_SU', (0, 1)), ('YieldSubSet', 'YC', (0,)),
+                    ('distributor_subset', 'U_DIST_SUB', (0, 1)), ('decimal_set', 'DC_SET', (0,)),
+                    ('distributor_subset2', 'U_DIST_SUB2', (0, 1, 2))]
+
+        original = {'UnitsList': self.UnitsList, 'UnitNames': self.UnitNames, 'WasteTypeU': self.WasteTypeU}
+        try:
+            if deadUnits:
+                self.UnitsList = [unit for unit in self.UnitsList if unit.Number not in deadUnits]
+                for attribute, key, positions in unitSets:
+                    dictionary = getattr(self, attribute)
+                    original[attribute] = dictionary
+                    if positions is None:
+                        units = [u for u in dictionary[key] if u not in deadUnits]
+                    else:
+                        units = [entry for entry in dictionary[key]
+                                 if not any(entry[position] in deadUnits for position in positions)]
+                    setattr(self, attribute, dict(dictionary, **{key: units}))
+
+                self.UnitNames = {'Names': {u: name for u, name in self.UnitNames['Names'].items()
+                                            if u not in deadUnits}}
+                self.WasteTypeU = {'waste_type_U': {u: wasteType for u, wasteType in
+                                                    self.WasteTypeU['waste_type_U'].items() if u not in deadUnits}}
+            yield
+        finally:
+            for attribute, value in original.items():
+                setattr(self, attribute, value)
+
     #------------------------------------------------------------------------------
     #------------------------------------------------------------------------------
     #--------------------------CREATE DATA-FILE METHODS ---------------------------
@@ -1093,6 +1402,7 @@ class Superstructure:
 
         """
 
+        self.NI_ParameterList = []
         self.NI_ParameterList.append(self.UnitsNumberList)
         self.NI_ParameterList.append(self.UnitsNumberList2)
         self.NI_ParameterList.append(self.StoichRNumberList)
@@ -1139,6 +1449,7 @@ class Superstructure:
 
         """
 
+        self.I_ParameterList = []
         self.I_ParameterList.append(self.delta_q)
         self.I_ParameterList.append(self.em_fac_ut)
         self.I_ParameterList.append(self.em_fac_comp)
@@ -1174,7 +1485,7 @@ class Superstructure:
         self.__fill_nonIndexedParameterList()
         for i in self.NI_ParameterList:
             for j in i:
-                self.Data_File[None][j] = {None: i[j]}
+                self.Data_File[None][j] = {None: copy.copy(i[j])}
 
     # Indexed Parameters / Dictionaries
 
@@ -1194,37 +1505,72 @@ class Superstructure:
         x = self.I_ParameterList
         for i in x:
             for j, k in i.items():
-                try:
-                    self.Data_File[None][j].update(k)
-                except:
-                    self.Data_File[None][j] = k
+                self.__add_parameter(self.Data_File[None], j, k)
+
+    def __add_parameter(self, parameters, name, values):
+        """
+        Adds the values of an indexed parameter to the dictionary parameters, the values of
+        different units are merged, the dictionaries of the units are copied and never changed.
+
+        """
+        try:
+            parameters[name].update(values)
+        except (KeyError, AttributeError, TypeError, ValueError):
+            parameters[name] = copy.copy(values)
 
     # Parameters origin from Process Units
 
-    def __fill_processParameterList(self):
+    def __collect_unitParameters(self, unit):
+        """
+        Description
+        -----------
+        Refills the ParameterList of the unit and returns its parameters which do not depend
+        on the rest of the superstructure {parameter name: {index: value}}. The parameters
+        calculated in create_DataFile (DERIVED_UNIT_PARAMETERS) are left out.
+
+        """
+        unit.ParameterList = []
+        unit.fill_parameterList()
+
+        parameters = {}
+        for i in unit.ParameterList:
+            for j, k in i.items():
+                if j not in DERIVED_UNIT_PARAMETERS:
+                    self.__add_parameter(parameters, j, k)
+
+        return parameters
+
+    def __fill_processParameterList(self, deadUnits=()):
         """
+        Parameters
+        ----------
+        deadUnits : Dictionary or List
+            units which are left out of the data file, the split factors myu to them are dropped
+
         Description
         -----------
 
         Goes through all Processes and add the Parameters in their ParameterList
-        to the Model-Ready DataFile
+        to the Model-Ready DataFile. The parameters calculated in create_DataFile
+        (DERIVED_UNIT_PARAMETERS) are taken from the unit attributes.
+        At last the connections of the units are set.
 
         """
-        #
         for z in self.UnitsList:
-            z.fill_parameterList()
-            x = z.ParameterList
-            for i in x:
-                for j, k in i.items():
-                    try:
-                        self.Data_File[None][j].update(k)
-                    except:
-                        self.Data_File[None][j] = copy.copy(k)
+            for j, k in self.__collect_unitParameters(z).items():
+                if j == 'myu' and deadUnits:
+                    k = {key: val for key, val in k.items() if key[1][0] not in deadUnits}
+                self.__add_parameter(self.Data_File[None], j, k)
 
-            self.__scan_unit_connections()
+            for j, attribute in DERIVED_UNIT_PARAMETERS.items():
+                derivedParameter = getattr(z, attribute, None)
+                if derivedParameter and j in derivedParameter:
+                    self.__add_parameter(self.Data_File[None], j, derivedParameter[j])
 
-            for j in self.connections_set:
-                self.Data_File[None][j] = {None: self.connections_set[j]}
+        self.__scan_unit_connections()
+
+        for j in self.connections_set:
+            self.Data_File[None][j] = {None: list(self.connections_set[j])}
 
     def __prepare_capexEquations(self):
         """
@@ -1259,6 +1605,7 @@ class Superstructure:
         Heat intervals by calling:
 
             - add_ProcessTemperatures()
+            - __merge_heatTemperatures()
             - __add_temperatureIntervals()
             - __set_deltaQ()
 
@@ -1268,6 +1615,8 @@ class Superstructure:
 
         self.__set_processTemperatures()
 
+        self.__merge_heatTemperatures()
+
         self.__add_temperatureIntervals()
 
         self.__calc_heatPump()
@@ -1295,11 +1644,21 @@ class Superstructure:
     # Create Data File
     # -----------------
 
-    def create_DataFile(self):
+    def create_DataFile(self, removeDeadUnits=True):
         """
+        Parameters
+        ----------
+        removeDeadUnits : Boolean, optional
+            If True (default), units which can not be part of a flow path (find_deadUnits()) are left
+            out of the data file. The superstructure itself is not changed.
+
         Description
         -----------
-        First prepares Data for Heatbalances (T-Grid, Costs...)
+        First finds the units which can not be part of a flow path and leaves them out of the data file by calling:
+
+            - find_deadUnits()
+
+        Then prepares Data for Heatbalances (T-Grid, Costs...)
 
             - preprace_HeatBalances()
 
@@ -1316,6 +1675,9 @@ class Superstructure:
             - __fill_processParameterList()
             #
 
+        The Data File is created from scratch on every call, so repeated calls give the same Data File
+        as long as the superstructure does not change.
+
 
         Returns
         -------
@@ -1323,17 +1685,22 @@ class Superstructure:
 
         """
 
+        self.Data_File = {None: {}}
         self.load_data_from_txt(self.Database)
 
-        # heat balances
-        self.__prepare_heatEquations()
-        # capex equations
-        self.__prepare_capexEquations()
+        # units that can not be part of a flow path get no variables and constraints
+        deadUnits = self.find_deadUnits() if removeDeadUnits else {}
 
-        # mass balance equations
-        self.__fill_nonIndexedParameters()
-        self.__fill_indexedParameters()
-        self.__fill_processParameterList()
+        with self.__deadUnits_removed(deadUnits):
+            # heat balances
+            self.__prepare_heatEquations()
+            # capex equations
+            self.__prepare_capexEquations()
+
+            # mass balance equations
+            self.__fill_nonIndexedParameters()
+            self.__fill_indexedParameters()
+            self.__fill_processParameterList(deadUnits=deadUnits)
 
         return self.Data_File
 
@@ -1563,8 +1930,11 @@ class Superstructure:
          In this function, we set the uncertainty data for the mpisspy model based on the uncertainty object. mpi-sppy
          is a parallel implementation of stochastic programming. The function is similar to the set_uncertainty_data
 
+        Only the base case data file and the changed parameter values of every scenario are stored
+        (ScenarioDataFiles), the full data file of a scenario is made when it is accessed.
+
         :param uncertaintyObject:
-        :return: scearioDataFiles: a dictionary that contains the data files for each scenario
+        :return: scearioDataFiles: a ScenarioDataFiles object, used as a dictionary {scenario: data file}
         """
 
         # set the list of Scenarios so the set can be declared in pyomo
@@ -1579,66 +1949,12 @@ class Superstructure:
 
         # make the base case data_file of the model
         baseCaseDataFile = self.create_DataFile()
-        unitNames = baseCaseDataFile[None]['Names']
-
-        scenarioDataFiles = {}
-        newUncertaintyMatrix = pd.DataFrame()
-
-        for rowIndex, scenario in enumerate(self.Scenarios['SC']):
-            dataFileScenario = copy.deepcopy(baseCaseDataFile)
-            adjustedPhiDict = {}
-            # get the row of the uncertaintyMatrix corresponding to the rowIndex (int)
-            row = uncertaintyMatrix.iloc[rowIndex]
-            # loop over each row of the uncertainty matrix
-
-            for j, value in row.items():
-                # Split the string by the last underscore and remove it
-                parameterName = '_'.join(j.split('_')[:-1])
-
-                index = uncertaintyDict[parameterName][j]
-                # get the basecase value of the parameter
-                currentValue = baseCaseDataFile[None][parameterName][index]
-                # get the value of the parameter for the current scenario
-                newValue = currentValue * (1 + value)
-
-                # constrain to be equal to 1, otherwise mass balance problems will occur
-                constrained_parameters = ('myu', 'theta', 'gamma', 'phi', 'xi')
-                if parameterName in constrained_parameters:
-                    if newValue > 1:
-                        newValue = 1  # constrain to be equal to 1, otherwise mass balance problems will occur
-
-                # make a new column name, depending on the parameter name
-                if parameterName == 'tau_h':
-                    unitNumber = index[1]  # unit number is the second element of the index tuple
-                    columnName = parameterName + ' ' + str(unitNames[unitNumber])
-
-                elif parameterName == 'delta_ut':
-                    columnName = 'ElectricityPrice'
-
-                elif isinstance(index, tuple):
-                    unitNumber = index[0]
-                    compound = str(index[1])
-                    columnName = parameterName + ' ' + str(unitNames[unitNumber]) + ' ' + compound
-
-                else:
-                    # the index is not a tuple in the case of raw material costs and product prices
-                    columnName = parameterName + '_' + str(unitNames[index])
-
-                newUncertaintyMatrix.at[rowIndex, columnName] = newValue
-
-                # update the data file with the new value
-                dataFileScenario[None][parameterName][index] = newValue
-                # keep a dictionary of the compostition of the source units, so later the other fractions can be updated
-                # so the sum of the fractions is equal to 1
-                if parameterName == 'phi':  # phi being the parameter name for the composition of the source units
-                    adjustedPhiDict[index] = newValue
-
-                # update the composition of the source units to keep the sum of the fractions equal to 1, do this for each scenario
-                if adjustedPhiDict:
-                    dataFileScenario = self.adjust_phi_data(adjustedPhiDict, dataFileScenario, baseCaseDataFile,
-                                                            phiExcludeList)
-
-            scenarioDataFiles[scenario] = dataFileScenario
+
+        # the data files of the scenarios and the values of the uncertain parameters (one array operation)
+        scenarioDataFiles, newUncertaintyMatrix = make_scenario_data_files(baseCaseDataFile, self.Scenarios['SC'],
+                                                                           uncertaintyMatrix, uncertaintyDict,
+                                                                           phiExcludeList,
+                                                                           uncertaintyObject.ScenarioProbabilities)
 
         # add the new uncertainty matrix, dataFiles and stochasticMode to the superstructure object
         self.uncertaintyMatrix = newUncertaintyMatrix
@@ -1647,6 +1963,36 @@ class Superstructure:
         #print('pause')
         return scenarioDataFiles
 
+    def set_uncertainty_stream_mpisspy(self, uncertaintyObject, chunkSize=1000, seed=66):
+        """
+        Same as set_uncertainty_data_mpisspy, but for very large samples: the scenarios are not generated up front,
+        they are generated chunk by chunk while the WaitAndSee or HereAndNow optimizer solves them
+        (ScenarioStream). Only the base case data file and the scenarios of one chunk are kept in memory, the
+        uncertainty matrix is made by the optimizer once all scenarios are solved.
+
+        :param uncertaintyObject: StochasticObject with the sampling settings (make_scenario_dataframe_* is not needed)
+        :param chunkSize: number of scenarios which are generated at once
+        :param seed: seed of the random number generator (LHS)
+        :return: scenarioDataFiles: a ScenarioStream object
+        """
+        # the scenarios are not known up front, the model does not need them (one model instance per scenario)
+        self.Scenarios = {'SC': []}
+        self.Odds = {'odds': {}}
+
+        uncertaintyDict = self.invert_dictionary(uncertaintyObject.LableDict)
+        phiExcludeList = uncertaintyObject.PhiExclusionList
+
+        # make the base case data_file of the model
+        baseCaseDataFile = self.create_DataFile()
+
+        scenarioDataFiles = ScenarioStream(baseCaseDataFile, uncertaintyObject, uncertaintyDict, phiExcludeList,
+                                           ChunkSize=chunkSize, Seed=seed)
+
+        self.uncertaintyMatrix = None
+        self.scenarioDataFiles = scenarioDataFiles
+        self.stochasticMode = 'mpi-sppy'
+        return scenarioDataFiles
+
     def invert_dictionary(self, originalDict):
         """
         Inverts the keys and values of the given dictionary, allowing for non-unique values.
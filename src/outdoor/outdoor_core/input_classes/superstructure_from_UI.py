@@ -1,7 +1,7 @@
 import copy
 import math
-import pandas as pd
 from ..utils.linearizer import capex_calculator
+from ..utils.scenario_data import ScenarioStream, make_scenario_data_files
 
 
 class Superstructure_from_UI():
@@ -1403,8 +1403,11 @@ class Superstructure_from_UI():
          In this function, we set the uncertainty data for the mpisspy model based on the uncertainty object. mpi-sppy
          is a parallel implementation of stochastic programming. The function is similar to the set_uncertainty_data
 
+        Only the base case data file and the changed parameter values of every scenario are stored
+        (ScenarioDataFiles), the full data file of a scenario is made when it is accessed.
+
         :param uncertaintyObject:
-        :return: scearioDataFiles: a dictionary that contains the data files for each scenario
+        :return: scearioDataFiles: a ScenarioDataFiles object, used as a dictionary {scenario: data file}
         """
 
         # set the list of Scenarios so the set can be declared in pyomo
@@ -1419,66 +1422,12 @@ class Superstructure_from_UI():
 
         # make the base case data_file of the model
         baseCaseDataFile = self.create_DataFile()
-        unitNames = baseCaseDataFile[None]['Names']
-
-        scenarioDataFiles = {}
-        newUncertaintyMatrix = pd.DataFrame()
-
-        for rowIndex, scenario in enumerate(self.Scenarios['SC']):
-            dataFileScenario = copy.deepcopy(baseCaseDataFile)
-            adjustedPhiDict = {}
-            # get the row of the uncertaintyMatrix corresponding to the rowIndex (int)
-            row = uncertaintyMatrix.iloc[rowIndex]
-            # loop over each row of the uncertainty matrix
-
-            for j, value in row.items():
-                # Split the string by the last underscore and remove it
-                parameterName = '_'.join(j.split('_')[:-1])
-
-                index = uncertaintyDict[parameterName][j]
-                # get the basecase value of the parameter
-                currentValue = baseCaseDataFile[None][parameterName][index]
-                # get the value of the parameter for the current scenario
-                newValue = currentValue * (1 + value)
-
-                # constrain to be equal to 1, otherwise mass balance problems will occur
-                constrained_parameters = ('myu', 'theta', 'gamma', 'phi', 'xi')
-                if parameterName in constrained_parameters:
-                    if newValue > 1:
-                        newValue = 1  # constrain to be equal to 1, otherwise mass balance problems will occur
-
-                # make a new column name, depending on the parameter name
-                if parameterName == 'tau_h':
-                    unitNumber = index[1]  # unit number is the second element of the index tuple
-                    columnName = parameterName + ' ' + str(unitNames[unitNumber])
-
-                elif parameterName == 'delta_ut':
-                    columnName = 'ElectricityPrice'
-
-                elif isinstance(index, tuple):
-                    unitNumber = index[0]
-                    compound = str(index[1])
-                    columnName = parameterName + ' ' + str(unitNames[unitNumber]) + ' ' + compound
-
-                else:
-                    # the index is not a tuple in the case of raw material costs and product prices
-                    columnName = parameterName + '_' + str(unitNames[index])
-
-                newUncertaintyMatrix.at[rowIndex, columnName] = newValue
-
-                # update the data file with the new value
-                dataFileScenario[None][parameterName][index] = newValue
-                # keep a dictionary of the compostition of the source units, so later the other fractions can be updated
-                # so the sum of the fractions is equal to 1
-                if parameterName == 'phi':  # phi being the parameter name for the composition of the source units
-                    adjustedPhiDict[index] = newValue
-
-                # update the composition of the source units to keep the sum of the fractions equal to 1, do this for each scenario
-                if adjustedPhiDict:
-                    dataFileScenario = self.adjust_phi_data(adjustedPhiDict, dataFileScenario, baseCaseDataFile,
-                                                            phiExcludeList)
-
-            scenarioDataFiles[scenario] = dataFileScenario
+
+        # the data files of the scenarios and the values of the uncertain parameters (one array operation)
+        scenarioDataFiles, newUncertaintyMatrix = make_scenario_data_files(baseCaseDataFile, self.Scenarios['SC'],
+                                                                           uncertaintyMatrix, uncertaintyDict,
+                                                                           phiExcludeList,
+                                                                           uncertaintyObject.ScenarioProbabilities)
 
         # add the new uncertainty matrix, dataFiles and stochasticMode to the superstructure object
         self.uncertaintyMatrix = newUncertaintyMatrix
@@ -1487,6 +1436,36 @@ class Superstructure_from_UI():
         #print('pause')
         return scenarioDataFiles
 
+    def set_uncertainty_stream_mpisspy(self, uncertaintyObject, chunkSize=1000, seed=66):
+        """
+        Same as set_uncertainty_data_mpisspy, but for very large samples: the scenarios are not generated up front,
+        they are generated chunk by chunk while the WaitAndSee or HereAndNow optimizer solves them
+        (ScenarioStream). Only the base case data file and the scenarios of one chunk are kept in memory, the
+        uncertainty matrix is made by the optimizer once all scenarios are solved.
+
+        :param uncertaintyObject: StochasticObject with the sampling settings (make_scenario_dataframe_* is not needed)
+        :param chunkSize: number of scenarios which are generated at once
+        :param seed: seed of the random number generator (LHS)
+        :return: scenarioDataFiles: a ScenarioStream object
+        """
+        # the scenarios are not known up front, the model does not need them (one model instance per scenario)
+        self.Scenarios = {'SC': []}
+        self.Odds = {'odds': {}}
+
+        uncertaintyDict = self.invert_dictionary(uncertaintyObject.LableDict)
+        phiExcludeList = uncertaintyObject.PhiExclusionList
+
+        # make the base case data_file of the model
+        baseCaseDataFile = self.create_DataFile()
+
+        scenarioDataFiles = ScenarioStream(baseCaseDataFile, uncertaintyObject, uncertaintyDict, phiExcludeList,
+                                           ChunkSize=chunkSize, Seed=seed)
+
+        self.uncertaintyMatrix = None
+        self.scenarioDataFiles = scenarioDataFiles
+        self.stochasticMode = 'mpi-sppy'
+        return scenarioDataFiles
+
     def invert_dictionary(self, originalDict):
         """
         Inverts the keys and values of the given dictionary, allowing for non-unique values.
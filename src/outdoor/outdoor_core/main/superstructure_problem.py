@@ -11,6 +11,7 @@ from ..optimizers.customs.custom_optimizer import (MCDAOptimizer, MultiObjective
                                                    WaitAndSeeOptimizer, StochasticRecourseOptimizer_mpi_sppy,
                                                    HereAndNowOptimizer,)
 from ..optimizers.main_optimizer import SingleOptimizer
+from ..utils.flow_bounds import calculate_flow_bounds, calculate_parallel_units
 from ..utils.timer import time_printer
 
 
@@ -77,6 +78,7 @@ class SuperstructureProblem:
         outputFileDesignSpace=None,
         multi_objective_options=None,
         modelObjective=None,
+        parallel_options=None,
     ):
         """
 
@@ -90,7 +92,9 @@ class SuperstructureProblem:
                 'sensitivity', 'cross-parameter', 'multi-objective'
         solver : string, optional
             DESCRIPTION. The default is "gurobi". Solver name to use, solver must
-                be installed.
+                be installed. "highs" runs through Pyomo's persistent interface
+                (highspy). The sensitivity, cross-parameter and multi-objective
+                modes use the persistent interface of the solver if it is available.
         interface : string optional
             DESCRIPTION. The default is "local". Permitted values ares:
                 'local', 'executable'. Local are installed solver packages,
@@ -103,6 +107,11 @@ class SuperstructureProblem:
                 Keys are options, values are values. Keys have to be permitted by
                 chosen solver.
         stochastic_mode : string, optional (only for 2-stage-recourse) defines if you want to use mpi-sspy
+        parallel_options : Dictionary, optional
+            DESCRIPTION. The default is None (serial runs). Solves the runs of the sensitivity,
+                cross-parameter sensitivity and multi-objective (pareto points) modes in parallel worker processes,
+                e.g. {'workers': 4, 'solver_threads': 2}.
+                The calling script needs an if __name__ == '__main__': guard.
 
 
         Returns
@@ -191,7 +200,8 @@ class SuperstructureProblem:
                                              solver_path,
                                              options, optimization_mode, mode_options,
                                              input_data, stochastic_options,
-                                             mpi_sppy_options=mpi_sppy_options) #add options for mpi-sppy None if not mpi-sppy
+                                             mpi_sppy_options=mpi_sppy_options, #add options for mpi-sppy None if not mpi-sppy
+                                             parallel_options=parallel_options)
             # run the optimization
             model_output = optimizer.run_optimization(model_instance)
 
@@ -264,6 +274,10 @@ class SuperstructureProblem:
             mode_options = input_data.sensitive_parameters
             prepare_mutable_parameters(model, mode_options)
 
+        if optimization_mode == "single" or optimization_mode == "multi-objective":
+            # the flow parameters are the same in every run, so the big-M values can be tightened once
+            data_file = self.tighten_big_m_parameters(data_file, model, printReport=printTimer)
+
         # populate the model instance
         model_instance = model.populateModel(data_file)
 
@@ -283,7 +297,8 @@ class SuperstructureProblem:
         stochastic_options,
         printTimer=True,
         remakeMetadata=None,
-        mpi_sppy_options=None
+        mpi_sppy_options=None,
+        parallel_options=None,
     ):
         """
 
@@ -306,6 +321,8 @@ class SuperstructureProblem:
             DESCRIPTION: Additional information eg on sensitive parameters
         superstructure : Superstructure Class object
             DESCRIPTION.
+        parallel_options : Dictionary
+            DESCRIPTION: workers and solver_threads of the parallel multi-runs
 
 
         Returns
@@ -374,11 +391,13 @@ class SuperstructureProblem:
             optimizer = MCDAOptimizer(solver, interface, options, mode_options)
 
         elif optimization_mode == "multi-objective":
-            optimizer = MultiObjectiveOptimizer(solver, interface, options, mode_options)
+            optimizer = MultiObjectiveOptimizer(solver, interface, options, mode_options,
+                                                superstructure=superstructure, **(parallel_options or {}))
 
         elif optimization_mode == "sensitivity":
             optimizer = SensitivityOptimizer(solver, interface, options,
-                                             mode_options, superstructure)
+                                             mode_options, superstructure,
+                                             **(parallel_options or {}))
 
         elif optimization_mode == "cross-parameter sensitivity":
             optimizer = TwoWaySensitivityOptimizer(
@@ -386,7 +405,8 @@ class SuperstructureProblem:
                 solver_interface=interface,
                 solver_options=options,
                 two_way_data=mode_options,
-                superstructure=superstructure)
+                superstructure=superstructure,
+                **(parallel_options or {}))
 
         else:
             raise ValueError("Optimization mode not supported")
@@ -474,6 +494,57 @@ class SuperstructureProblem:
 
         return nan_parameters
 
+    def tighten_big_m_parameters(self, data_file, model, defaultAlpha=100000, setFlowBounds=False, printReport=True):
+        """
+
+        Parameters
+        ----------
+        data_file : Dictionary
+            Model ready data file of the superstructure
+        model : SuperstructureModel
+        defaultAlpha : Float
+            The default big-M value (alpha) of the SuperstructureModel
+        setFlowBounds : Boolean
+            If True, the flow bounds are also set as upper bounds of FLOW_IN, FLOW_OUT and FLOW_SUM.
+            Off by default, on the case studies the extra variable bounds made HiGHS slower as often as faster.
+        printReport : Boolean
+
+        Returns
+        -------
+        data_file : Dictionary
+            Copy of the data file with the tightened alpha values, the number of parallel units and the flow bounds
+
+        Description
+        -----------
+        Propagates the source bounds through the superstructure (see calculate_flow_bounds) and sets
+        alpha[u] to the flow bound of the unit if it is smaller than the default value. The number of parallel
+        units of the piecewise CAPEX (nParallelUnits) is limited to the units the flow bound can fill
+        (see calculate_parallel_units). The bounds are only valid for the parameters of the data file,
+        so they are not used if parameters change between runs.
+
+        """
+        flowBounds, alphaBounds = calculate_flow_bounds(data_file, model.loadID, model.loadType)
+        tightAlpha = {u: bound for u, bound in alphaBounds.items() if bound < defaultAlpha}
+        parallelUnits = calculate_parallel_units(data_file, flowBounds, maxUnits=len(model.N_CAPEX))
+
+        # copy the top level, so the data file of the superstructure object keeps the default values
+        data_file = {None: dict(data_file[None])}
+        data_file[None]['alpha'] = tightAlpha
+        data_file[None]['nParallelUnits'] = parallelUnits
+        if setFlowBounds:
+            data_file[None]['flowUpperBound'] = flowBounds
+
+        if printReport:
+            nUnits = len(data_file[None]['U'][None])
+            print("--INFO:-- Big-M tightening: alpha tightened for {} of {} units ----".format(len(tightAlpha), nUnits))
+            if tightAlpha:
+                print("--INFO:-- Tightened alpha values between {:.3g} and {:.3g} (default {:.3g}) ----".format(
+                    min(tightAlpha.values()), max(tightAlpha.values()), defaultAlpha))
+            print("--INFO:-- Parallel units limited by the flow bounds for {} of {} cost units ----".format(
+                len(parallelUnits), len(data_file[None]['U_C'][None])))
+
+        return data_file
+
     def print_count_variables_constraints(self, model_instance):
         # Initialize a counter for variables
         total_variables = 0
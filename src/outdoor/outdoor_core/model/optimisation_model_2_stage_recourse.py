@@ -1428,7 +1428,7 @@ class SuperstructureModel_2_Stage_recourse(AbstractModel):
             for i, j in self.connections.items():
                 if u == i:
                     if j[k]:
-                        return sum(self.Y[uu] for uu in j[k]) >= self.Y[u]
+                        return sum(self.Y[uu] for uu in j[k] if uu in self.U) >= self.Y[u]
                         ind = True
 
             if ind == False:
@@ -1,8 +1,11 @@
+import math
+
+from pyomo.common.gc_manager import PauseGC
 from pyomo.environ import *
 
 
 
-class SuperstructureModel(AbstractModel):
+class SuperstructureEquations:
     """
     Class description
     -----------------
@@ -17,6 +20,10 @@ class SuperstructureModel(AbstractModel):
     operating and maintenance and other aspects. Additionally GWP and fresh
     water demand are calculated.
 
+    The equations are used by the SuperstructureModel (AbstractModel, populated
+    with a data file) and the ConcreteSuperstructureModel (built directly from a
+    data file).
+
     """
 
     def __init__(self, superstructure_input=None, fixedDesign=False, *args, **kwargs):
@@ -64,6 +71,10 @@ class SuperstructureModel(AbstractModel):
                 "t_out": 0}
 
         self.objective_name = superstructure_input.objective
+        # superstructures of older versions have no piecewise formulation, they use the incremental one
+        self.piecewise_formulation = getattr(superstructure_input, 'piecewiseFormulation', 'incremental')
+        self.lazy_impact_categories = getattr(superstructure_input, 'lazyImpactCategories', False)
+        self.multi_objectives = superstructure_input.multi_objectives
         self.groups = superstructure_input.groups
         self.connections = superstructure_input.connections
 
@@ -123,23 +134,6 @@ class SuperstructureModel(AbstractModel):
         self.create_DecisionMaking()
         self.create_ObjectiveFunction()
 
-    def populateModel(self, Data_file):
-        """
-        Parameters
-        ----------
-        Data_file : Dictionary
-            Model data in AbstractModel readable file
-
-        Returns
-        -------
-        PYOMO ConcreteModel
-            filled model instance with equations from SuperstructureModel and
-            data from Data_file.
-
-        """
-        self.ModelInstance = self.create_instance(Data_file)
-        return self.ModelInstance
-
     # Pyomo Model Methods
     # --------------------
 
@@ -209,6 +203,40 @@ class SuperstructureModel(AbstractModel):
 
         self.U_DIST_SUB2 = Set(within=self.U_DIST_SUB * self.U_DIST * iterator(100))
 
+        # Sparse adjacency of the flowsheet
+        # ---------------------------------
+        # these sets are derived from U_CONNECTORS and U_DIST_SUB2 when the instance is populated, so the mass
+        # balances only loop over existing connections instead of scanning all U x UU pairs
+
+        def connectors_out_init(self):
+            adjacency = {u: [] for u in self.U}
+            for (u, uu) in self.U_CONNECTORS:
+                adjacency[u].append(uu)
+            return adjacency
+
+        def connectors_in_init(self):
+            adjacency = {u: [] for u in self.U}
+            for (u, uu) in self.U_CONNECTORS:
+                adjacency[uu].append(u)
+            return adjacency
+
+        def distributor_decimals_init(self):
+            decimals = {(u, uu): [] for (u, uu) in self.U_DIST_SUB}
+            for (u, uu, uk, k) in self.U_DIST_SUB2:
+                decimals[u, uu].append((uk, k))
+            return decimals
+
+        def distributor_targets_init(self):
+            targets = {u: [] for u in self.U_DIST}
+            for (u, uu) in self.U_DIST_SUB:
+                targets[u].append(uu)
+            return targets
+
+        self.U_CONNECTORS_OUT = Set(self.U, within=self.U, initialize=connectors_out_init)
+        self.U_CONNECTORS_IN = Set(self.U, within=self.U, initialize=connectors_in_init)
+        self.U_DIST_SUB_DC = Set(self.U_DIST_SUB, dimen=2, initialize=distributor_decimals_init)
+        self.U_DIST_TARGETS = Set(self.U_DIST, within=self.U, initialize=distributor_targets_init)
+
     # **** MASS BALANCES *****
     # -------------------------
 
@@ -249,6 +277,8 @@ class SuperstructureModel(AbstractModel):
         self.kappa_2_rhs_conc = Param(self.U, initialize=3)
         self.Names = Param(self.U, within= Any)
         self.alpha = Param(self.U, initialize=100000, mutable=True)
+        # upper bound of the flows through a unit from the flow bound propagation (None if not bounded)
+        self.flowUpperBound = Param(self.U, within=Any, default=None)
 
         # upper and lower bounds for source flows
         self.ul = Param(self.U_S, initialize=100000, mutable=True)
@@ -267,14 +297,17 @@ class SuperstructureModel(AbstractModel):
         # Variables
         # --------
 
+        def flow_bounds(self, u, *args):
+            return (0, self.flowUpperBound[u])
+
         self.FLOW = Var(self.U_CONNECTORS, self.I, within=NonNegativeReals)
-        self.FLOW_IN = Var(self.U, self.I, within=NonNegativeReals)
-        self.FLOW_OUT = Var(self.U, self.I, within=NonNegativeReals)
+        self.FLOW_IN = Var(self.U, self.I, within=NonNegativeReals, bounds=flow_bounds)
+        self.FLOW_OUT = Var(self.U, self.I, within=NonNegativeReals, bounds=flow_bounds)
         self.FLOW_WASTE = Var(self.U, self.I, within=NonNegativeReals)
         self.FLOW_WASTE_TOTAL = Var(self.I, within=NonNegativeReals)
         self.FLOW_ADD = Var(self.U_SU, within=NonNegativeReals)
         self.FLOW_ADD_TOT = Var(self.U, self.I, within=NonNegativeReals)
-        self.FLOW_SUM = Var(self.U, within=NonNegativeReals)
+        self.FLOW_SUM = Var(self.U, within=NonNegativeReals, bounds=flow_bounds)
         self.FLOW_SOURCE = Var(self.U_S, within=NonNegativeReals)
         self.FLOW_DIST = Var(self.U_DIST_SUB2, self.I, within=NonNegativeReals)
         self.FLOW_FT = Var(self.U_CONNECTORS, within=NonNegativeReals)
@@ -298,7 +331,7 @@ class SuperstructureModel(AbstractModel):
         # -----------
 
         def MassBalance_1_rule(self, u, i):
-            return self.FLOW_IN[u, i] == self.FLOW_ADD_TOT[u, i] + sum(self.flh[uu] / self.flh[u] * self.FLOW[uu, u, i] for uu in self.UU if (uu,u) in self.U_CONNECTORS)
+            return self.FLOW_IN[u, i] == self.FLOW_ADD_TOT[u, i] + sum(self.flh[uu] / self.flh[u] * self.FLOW[uu, u, i] for uu in self.U_CONNECTORS_IN[u])
 
         def MassBalance_2_rule(self, u, i):
             return self.FLOW_ADD_TOT[u, i] == sum(
@@ -379,7 +412,7 @@ class SuperstructureModel(AbstractModel):
 
         def MassBalance_9_rule(self, u, i):
             return self.FLOW_WASTE[u, i] == self.FLOW_OUT[u, i] - sum(
-                self.FLOW[u, uu, i] for uu in self.UU if (u,uu) in self.U_CONNECTORS
+                self.FLOW[u, uu, i] for uu in self.U_CONNECTORS_OUT[u]
             )
 
         def MassBalance_10_rule(self, i):
@@ -424,42 +457,30 @@ class SuperstructureModel(AbstractModel):
             # bounds defined in tons per year (t/a) hence flow times full loading hours
             return self.FLOW_SUM[up] <= self.MaxProduction[up]
 
+        # MassBalance_6, 7 and 8 are indexed over U_CONNECTORS x I, so every rule call belongs to an existing connection
         def MassBalance_6_rule(self, u, uu, i):
             if (u, uu) not in self.U_DIST_SUB:
-                    if (u, uu) in self.U_CONNECTORS:
-                        return self.FLOW[u, uu, i] <= self.myu[u, uu, i] * self.FLOW_OUT[
-                            u, i
-                            ] + self.alpha[u] * (1 - self.Y[uu])
-                    else:
-                        return Constraint.Skip
-
+                return self.FLOW[u, uu, i] <= self.myu[u, uu, i] * self.FLOW_OUT[
+                    u, i
+                    ] + self.alpha[u] * (1 - self.Y[uu])
             else:
                 return self.FLOW[u, uu, i] <= sum(
                     self.FLOW_DIST[u, uu, uk, k, i]
-                    for (uk, k) in self.DC_SET
-                    if (u, uu, uk, k) in self.U_DIST_SUB2
+                    for (uk, k) in self.U_DIST_SUB_DC[u, uu]
                 ) + self.alpha[u] * (1 - self.Y[uu])
 
         def MassBalance_7_rule(self, u, uu, i):
-            if (u,uu) in self.U_CONNECTORS:
-                return self.FLOW[u, uu, i] <= self.alpha[u] * self.Y[uu]
-            else:
-                return Constraint.Skip
-
+            return self.FLOW[u, uu, i] <= self.alpha[u] * self.Y[uu]
 
         def MassBalance_8_rule(self, u, uu, i):
             if (u, uu) not in self.U_DIST_SUB:
-                if (u, uu) in self.U_CONNECTORS:
-                    return self.FLOW[u, uu, i] >= self.myu[u, uu, i] * self.FLOW_OUT[
-                        u, i
-                        ] - self.alpha[u] * (1 - self.Y[uu])
-                else:
-                    return Constraint.Skip
+                return self.FLOW[u, uu, i] >= self.myu[u, uu, i] * self.FLOW_OUT[
+                    u, i
+                    ] - self.alpha[u] * (1 - self.Y[uu])
             else:
                 return self.FLOW[u, uu, i] >= sum(
                     self.FLOW_DIST[u, uu, uk, k, i]
-                    for (uk, k) in self.DC_SET
-                    if (u, uu, uk, k) in self.U_DIST_SUB2
+                    for (uk, k) in self.U_DIST_SUB_DC[u, uu]
                 ) - self.alpha[u] * (1 - self.Y[uu])
 
         # Distributor Equations
@@ -482,7 +503,7 @@ class SuperstructureModel(AbstractModel):
 
         def MassBalance_16_rule(self, u, i):
             return self.FLOW_OUT[u, i] == sum(
-                self.FLOW[u, uu, i] for uu in self.U if (u, uu) in self.U_DIST_SUB
+                self.FLOW[u, uu, i] for uu in self.U_DIST_TARGETS[u]
             )
 
         def MassBalance_17_rule(self, u, uu):
@@ -490,8 +511,8 @@ class SuperstructureModel(AbstractModel):
 
 
         def MassBalance_Distribution_Factor(self, u, uu):
-            return self.DistFraction[u, uu] == sum(self.Decimal_numbers[u, k] * self.Y_DIST[u, uu, u, k]
-                                                   for u1, k in self.DC_SET if u == u1)
+            return self.DistFraction[u, uu] == sum(self.Decimal_numbers[uk, k] * self.Y_DIST[u, uu, uk, k]
+                                                   for (uk, k) in self.U_DIST_SUB_DC[u, uu])
 
 
         self.MassBalance_1 = Constraint(self.U, self.I, rule=MassBalance_1_rule)
@@ -503,9 +524,9 @@ class SuperstructureModel(AbstractModel):
         #self.MassBalance_15 = Constraint(rule=MassBalance_15_rule)
 
         self.MassBalance_5 = Constraint(self.U, self.I, rule=MassBalance_5_rule)
-        self.MassBalance_6 = Constraint(self.U, self.UU, self.I, rule=MassBalance_6_rule)
-        self.MassBalance_7 = Constraint(self.U, self.UU, self.I, rule=MassBalance_7_rule)
-        self.MassBalance_8 = Constraint(self.U, self.UU, self.I, rule=MassBalance_8_rule)
+        self.MassBalance_6 = Constraint(self.U_CONNECTORS, self.I, rule=MassBalance_6_rule)
+        self.MassBalance_7 = Constraint(self.U_CONNECTORS, self.I, rule=MassBalance_7_rule)
+        self.MassBalance_8 = Constraint(self.U_CONNECTORS, self.I, rule=MassBalance_8_rule)
         self.MassBalance_9 = Constraint(self.U, self.I, rule=MassBalance_9_rule)
         self.MassBalance_10 = Constraint(self.I, rule=MassBalance_10_rule)
         self.MassBalance_11 = Constraint(self.U, rule=MassBalance_11_rule)
@@ -550,6 +571,30 @@ class SuperstructureModel(AbstractModel):
         self.tau_c = Param(self.H_UT, self.U, initialize=0, mutable=True)
         self.beta = Param(self.U, self.H_UT, self.HI, initialize=0, mutable=True)
 
+        # (u, hi) pairs in which a unit can have a heating or cooling demand (nonzero beta). The demand of all other
+        # pairs is zero, whatever tau_h and tau_c are, so no variables and constraints are needed for them. The set is
+        # fixed when the instance is populated, changes of beta need a new instance (SET_DEFINING_PARAMETERS of
+        # change_params)
+        def heat_intervals_init(self):
+            return [(u, hi) for u in self.U for hi in self.HI
+                    if any(value(self.beta[u, ut, hi]) != 0 for ut in self.H_UT)]
+
+        def heat_interval_units_init(self):
+            units = {hi: [] for hi in self.HI}
+            for (u, hi) in self.U_HI:
+                units[hi].append(u)
+            return units
+
+        def unit_heat_intervals_init(self):
+            intervals = {u: [] for u in self.U}
+            for (u, hi) in self.U_HI:
+                intervals[u].append(hi)
+            return intervals
+
+        self.U_HI = Set(within=self.U * self.HI, initialize=heat_intervals_init, ordered=True)
+        self.HI_UNITS = Set(self.HI, within=self.U, initialize=heat_interval_units_init)
+        self.U_HEAT_INTERVALS = Set(self.U, within=self.HI, initialize=unit_heat_intervals_init)
+
         # Slack Parameters (Flow Choice, HEN, Upper bounds)
         self.kappa_1_ut = Param(self.U, self.UT, self.I, initialize=0)
         self.kappa_2_ut = Param(self.U, self.UT, initialize=3)
@@ -580,8 +625,8 @@ class SuperstructureModel(AbstractModel):
         self.ENERGY_DEMAND_HP_EL = Var(within=NonNegativeReals)
 
         # Heating and cooling demand (Interval, Unit, Resi, Defi, Cooling, Exchange, Production , HP)
-        self.ENERGY_DEMAND_HEAT = Var(self.U, self.HI, within=NonNegativeReals)
-        self.ENERGY_DEMAND_COOL = Var(self.U, self.HI, within=NonNegativeReals)
+        self.ENERGY_DEMAND_HEAT = Var(self.U_HI, within=NonNegativeReals)
+        self.ENERGY_DEMAND_COOL = Var(self.U_HI, within=NonNegativeReals)
         self.ENERGY_DEMAND_HEAT_UNIT = Var(self.U, within=NonNegativeReals)
         self.ENERGY_DEMAND_COOL_UNIT = Var(self.U, within=NonNegativeReals)
         self.ENERGY_DEMAND_HEAT_RESI = Var(self.HI, within=NonNegativeReals)
@@ -691,13 +736,13 @@ class SuperstructureModel(AbstractModel):
             hp_tin = self.heat_pump_options["t_in"]
             hp_tout = self.heat_pump_options["t_out"]
 
-            def HeatBalance_3_rule(self, u, hi):
+            def HeatBalance_3_rule(self, hi):
                 k = len(self.HI)
                 if hi == 1:
                     return (
                         sum(
                             self.ENERGY_DEMAND_HEAT[u, hi] * self.flh[u] / self.H
-                            for u in self.U
+                            for u in self.HI_UNITS[hi]
                         )
                         + self.ENERGY_DEMAND_HEAT_PROD_USE
                         - self.ENERGY_DEMAND_HEAT_RESI[hi]
@@ -708,7 +753,7 @@ class SuperstructureModel(AbstractModel):
                     return (
                         sum(
                             self.ENERGY_DEMAND_HEAT[u, hi] * self.flh[u] / self.H
-                            for u in self.U
+                            for u in self.HI_UNITS[hi]
                         )
                         + self.ENERGY_DEMAND_HEAT_RESI[hi - 1]
                         - self.ENERGY_DEMAND_HEAT_RESI[hi]
@@ -720,7 +765,7 @@ class SuperstructureModel(AbstractModel):
                     return (
                         sum(
                             self.ENERGY_DEMAND_HEAT[u, hi] * self.flh[u] / self.H
-                            for u in self.U
+                            for u in self.HI_UNITS[hi]
                         )
                         + self.ENERGY_DEMAND_HEAT_RESI[hi - 1]
                         - self.ENERGY_DEMAND_COOLING
@@ -731,7 +776,7 @@ class SuperstructureModel(AbstractModel):
                     return (
                         sum(
                             self.ENERGY_DEMAND_HEAT[u, hi] * self.flh[u] / self.H
-                            for u in self.U
+                            for u in self.HI_UNITS[hi]
                         )
                         + self.ENERGY_DEMAND_HEAT_RESI[hi - 1]
                         - self.ENERGY_EXCHANGE[hi]
@@ -739,12 +784,12 @@ class SuperstructureModel(AbstractModel):
                         == 0
                     )
 
-            def HeatBalance_4_rule(self, u, hi):
+            def HeatBalance_4_rule(self, hi):
                 if hi == 1:
                     return (
                         sum(
                             self.ENERGY_DEMAND_COOL[u, hi] * self.flh[u] / self.H
-                            for u in self.U
+                            for u in self.HI_UNITS[hi]
                         )
                         - self.ENERGY_EXCHANGE[hi]
                         - self.ENERGY_DEMAND_HEAT_DEFI[hi]
@@ -754,7 +799,7 @@ class SuperstructureModel(AbstractModel):
                     return (
                         sum(
                             self.ENERGY_DEMAND_COOL[u, hi] * self.flh[u] / self.H
-                            for u in self.U
+                            for u in self.HI_UNITS[hi]
                         )
                         - self.ENERGY_DEMAND_HEAT_DEFI[hi]
                         - self.ENERGY_EXCHANGE[hi]
@@ -765,7 +810,7 @@ class SuperstructureModel(AbstractModel):
                     return (
                         sum(
                             self.ENERGY_DEMAND_COOL[u, hi] * self.flh[u] / self.H
-                            for u in self.U
+                            for u in self.HI_UNITS[hi]
                         )
                         - self.ENERGY_EXCHANGE[hi]
                         - self.ENERGY_DEMAND_HEAT_DEFI[hi]
@@ -786,13 +831,13 @@ class SuperstructureModel(AbstractModel):
             self.HeatBalance_9 = Constraint(rule=HeatBalance_9_rule)
 
         else:
-            def HeatBalance_3_rule(self, u, hi):
+            def HeatBalance_3_rule(self, hi):
                 k = len(self.HI)
                 if hi == 1:
                     return (
                         sum(
                             self.ENERGY_DEMAND_HEAT[u, hi] * self.flh[u] / self.H
-                            for u in self.U
+                            for u in self.HI_UNITS[hi]
                         )
                         + self.ENERGY_DEMAND_HEAT_PROD_USE
                         - self.ENERGY_DEMAND_HEAT_RESI[hi]
@@ -803,7 +848,7 @@ class SuperstructureModel(AbstractModel):
                     return (
                         sum(
                             self.ENERGY_DEMAND_HEAT[u, hi] * self.flh[u] / self.H
-                            for u in self.U
+                            for u in self.HI_UNITS[hi]
                         )
                         + self.ENERGY_DEMAND_HEAT_RESI[hi - 1]
                         - self.ENERGY_DEMAND_COOLING
@@ -814,7 +859,7 @@ class SuperstructureModel(AbstractModel):
                     return (
                         sum(
                             self.ENERGY_DEMAND_HEAT[u, hi] * self.flh[u] / self.H
-                            for u in self.U
+                            for u in self.HI_UNITS[hi]
                         )
                         + self.ENERGY_DEMAND_HEAT_RESI[hi - 1]
                         - self.ENERGY_EXCHANGE[hi]
@@ -822,11 +867,11 @@ class SuperstructureModel(AbstractModel):
                         == 0
                     )
 
-            def HeatBalance_4_rule(self, u, hi):
+            def HeatBalance_4_rule(self, hi):
                 return (
                     sum(
                         self.ENERGY_DEMAND_COOL[u, hi] * self.flh[u] / self.H
-                        for u in self.U
+                        for u in self.HI_UNITS[hi]
                     )
                     - self.ENERGY_EXCHANGE[hi]
                     - self.ENERGY_DEMAND_HEAT_DEFI[hi]
@@ -845,7 +890,7 @@ class SuperstructureModel(AbstractModel):
         #  Exchange Constraints, Production and Sell etc.
         def HeatBalance_5_rule(self, hi):
             return self.ENERGY_EXCHANGE[hi] <= sum(
-                self.ENERGY_DEMAND_COOL[u, hi] * self.flh[u] / self.H for u in self.U
+                self.ENERGY_DEMAND_COOL[u, hi] * self.flh[u] / self.H for u in self.HI_UNITS[hi]
             )
 
         def HeatBalance_6_rule(self, hi):
@@ -854,7 +899,7 @@ class SuperstructureModel(AbstractModel):
                     self.ENERGY_EXCHANGE[hi]
                     <= sum(
                         self.ENERGY_DEMAND_HEAT[u, hi] * self.flh[u] / self.H
-                        for u in self.U
+                        for u in self.HI_UNITS[hi]
                     )
                     + self.ENERGY_DEMAND_HEAT_PROD_USE
                 )
@@ -863,7 +908,7 @@ class SuperstructureModel(AbstractModel):
                     self.ENERGY_EXCHANGE[hi]
                     <= sum(
                         self.ENERGY_DEMAND_HEAT[u, hi] * self.flh[u] / self.H
-                        for u in self.U
+                        for u in self.HI_UNITS[hi]
                     )
                     + self.ENERGY_DEMAND_HEAT_RESI[hi - 1]
                 )
@@ -880,12 +925,12 @@ class SuperstructureModel(AbstractModel):
 
         def HeatBalance_14_rule(self, u):
             return self.ENERGY_DEMAND_HEAT_UNIT[u] == sum(
-                self.ENERGY_DEMAND_COOL[u, hi] for hi in self.HI
+                self.ENERGY_DEMAND_COOL[u, hi] for hi in self.U_HEAT_INTERVALS[u]
             ) * self.flh[u] / self.H
 
         def HeatBalance_15_rule(self, u):
             return self.ENERGY_DEMAND_COOL_UNIT[u] == sum(
-                self.ENERGY_DEMAND_HEAT[u, hi] for hi in self.HI
+                self.ENERGY_DEMAND_HEAT[u, hi] for hi in self.U_HEAT_INTERVALS[u]
             ) * self.flh[u] / self.H
 
         def HeatBalance_16_rule(self):
@@ -898,10 +943,11 @@ class SuperstructureModel(AbstractModel):
                 - self.ENERGY_DEMAND_HEAT_PROD_SELL
             )
 
-        self.HeatBalance_1 = Constraint(self.U, self.HI, rule=HeatBalance_1_rule)
-        self.HeatBalance_2 = Constraint(self.U, self.HI, rule=HeatBalance_2_rule)
-        self.HeatBalance_3 = Constraint(self.U, self.HI, rule=HeatBalance_3_rule)
-        self.HeatBalance_4 = Constraint(self.U, self.HI, rule=HeatBalance_4_rule)
+        self.HeatBalance_1 = Constraint(self.U_HI, rule=HeatBalance_1_rule)
+        self.HeatBalance_2 = Constraint(self.U_HI, rule=HeatBalance_2_rule)
+        # the cascade balances sum over all units, one constraint per interval
+        self.HeatBalance_3 = Constraint(self.HI, rule=HeatBalance_3_rule)
+        self.HeatBalance_4 = Constraint(self.HI, rule=HeatBalance_4_rule)
         self.HeatBalance_5 = Constraint(self.HI, rule=HeatBalance_5_rule)
         self.HeatBalance_6 = Constraint(self.HI, rule=HeatBalance_6_rule)
         self.HeatBalance_7 = Constraint(rule=HeatBalance_7_rule)
@@ -1048,14 +1094,32 @@ class SuperstructureModel(AbstractModel):
         # Maximum number of parallel units allowed
         self.N_CAPEX = RangeSet(1, 5)
 
+        # number of parallel units that can be needed from the flow bound propagation (None if not bounded)
+        self.nParallelUnits = Param(self.U_C, within=Any, default=None)
+
+        # (u, n) pairs of the parallel units that can exist, without a flow bound a single unit suffices if the
+        # flow limit is left at its default (1e12), otherwise all N_CAPEX units are needed. The set is fixed when the
+        # instance is populated, changes of upperFlowLimitUnit need a new instance (SET_DEFINING_PARAMETERS of
+        # change_params)
+        def parallel_units_init(self):
+            for u in self.U_C:
+                nMax = self.nParallelUnits[u]
+                if nMax is None:
+                    nMax = 1 if value(self.upperFlowLimitUnit[u]) >= 1e12 else len(self.N_CAPEX)
+                for n in self.N_CAPEX:
+                    if n <= nMax:
+                        yield u, n
+
+        self.U_C_PARALLEL = Set(within=self.U_C * self.N_CAPEX, initialize=parallel_units_init, ordered=True)
+
         # Binary: whether parallel unit n of technology u exists
-        self.Y_PARALLEL_UNIT = Var(self.U_C, self.N_CAPEX, within=Binary)
+        self.Y_PARALLEL_UNIT = Var(self.U_C_PARALLEL, within=Binary)
 
         # Reference flow assigned to each parallel unit
-        self.REF_FLOW_CAPEX_UNIT = Var(self.U_C, self.N_CAPEX,within=NonNegativeReals)
+        self.REF_FLOW_CAPEX_UNIT = Var(self.U_C_PARALLEL, within=NonNegativeReals)
 
         # Equipment cost of each parallel unit
-        self.EC_UNIT = Var(self.U_C,self.N_CAPEX,within=NonNegativeReals)
+        self.EC_UNIT = Var(self.U_C_PARALLEL, within=NonNegativeReals)
 
         # Total equipment cost over all parallel units
         self.EC = Var(self.U_C, within=NonNegativeReals)
@@ -1064,9 +1128,39 @@ class SuperstructureModel(AbstractModel):
         self.FCI = Var(self.U_C, within=NonNegativeReals)
 
         # Piecewise CAPEX variables per parallel unit
-        self.lin_CAPEX_s = Var(self.U_C, self.N_CAPEX, self.JI, bounds=(0, 1))
-        self.lin_CAPEX_z = Var(self.U_C, self.N_CAPEX, self.JI, within=Binary)
-        self.lin_CAPEX_lambda = Var(self.U_C, self.N_CAPEX, self.J, bounds=(0, 1))
+        formulation = getattr(self, 'piecewise_formulation', 'incremental')
+        self.lin_CAPEX_lambda = Var(self.U_C_PARALLEL, self.J, bounds=(0, 1))
+
+        if formulation == 'incremental':
+            self.lin_CAPEX_s = Var(self.U_C_PARALLEL, self.JI, bounds=(0, 1))
+            self.lin_CAPEX_z = Var(self.U_C_PARALLEL, self.JI, within=Binary)
+
+        elif formulation == 'log':
+            # reflected Gray code of the intervals, neighbouring intervals differ in a single bit
+            def gray_code(self, ji):
+                return (ji - 1) ^ ((ji - 1) >> 1)
+
+            def gray_bits_init(self):
+                return range(1, max(1, math.ceil(math.log2(len(self.JI)))) + 1)
+
+            self.JB = Set(initialize=gray_bits_init, ordered=True)
+
+            # points j whose neighbouring intervals all have bit b set (L) or all have it unset (R)
+            def gray_points_init(self, b, bitValue):
+                points = []
+                for j in self.J:
+                    neighbours = [ji for ji in (j - 1, j) if ji in self.JI]
+                    if all((gray_code(self, ji) >> (b - 1)) & 1 == bitValue for ji in neighbours):
+                        points.append(j)
+                return points
+
+            self.J_GRAY_L = Set(self.JB, within=self.J, initialize=lambda self, b: gray_points_init(self, b, 1))
+            self.J_GRAY_R = Set(self.JB, within=self.J, initialize=lambda self, b: gray_points_init(self, b, 0))
+            self.lin_CAPEX_w = Var(self.U_C_PARALLEL, self.JB, within=Binary)
+
+        elif formulation != 'sos2':
+            raise ValueError("The piecewise formulation {} is not valid, use 'incremental', 'sos2' or 'log'"
+                             .format(formulation))
 
 
         self.ACC = Var(self.U_C, within=NonNegativeReals)
@@ -1118,7 +1212,7 @@ class SuperstructureModel(AbstractModel):
         def CapexParallel_1_rule(self, u):
             return self.REF_FLOW_CAPEX[u] == sum(
                 self.REF_FLOW_CAPEX_UNIT[u, n]
-                for n in self.N_CAPEX
+                for n in self.N_CAPEX if (u, n) in self.U_C_PARALLEL
             )
 
         # flow through that parallel unit <= upperFlowLimitUnit
@@ -1130,7 +1224,7 @@ class SuperstructureModel(AbstractModel):
 
         # a minimum loading / ordering constraint so that earlier units are filled before later units.
         def CapexParallel_FillOrder_rule(self, u, n):
-            if n == max(self.N_CAPEX):
+            if (u, n + 1) not in self.U_C_PARALLEL:
                 return Constraint.Skip
 
             return (
@@ -1140,7 +1234,7 @@ class SuperstructureModel(AbstractModel):
 
         # This avoids strange solutions where unit 3 is active but unit 1 is inactive.
         def CapexParallel_3_rule(self, u, n):
-            if n == max(self.N_CAPEX):
+            if (u, n + 1) not in self.U_C_PARALLEL:
                 return Constraint.Skip
 
             return self.Y_PARALLEL_UNIT[u, n] >= self.Y_PARALLEL_UNIT[u, n + 1]
@@ -1160,6 +1254,22 @@ class SuperstructureModel(AbstractModel):
                 for j in self.J
             )
 
+        # weights of the piecewise points add up to one if the parallel unit exists (sos2 and log formulation)
+        def CapexEquation_lambda_rule(self, u, n):
+            return sum(self.lin_CAPEX_lambda[u, n, j] for j in self.J) == self.Y_PARALLEL_UNIT[u, n]
+
+        # at most two neighbouring weights are nonzero
+        def CapexEquation_SOS2_rule(self, u, n):
+            return [self.lin_CAPEX_lambda[u, n, j] for j in self.J]
+
+        # the Gray code bits select the interval: the points of one side of every bit are switched off
+        def CapexEquation_Gray_L_rule(self, u, n, b):
+            return sum(self.lin_CAPEX_lambda[u, n, j] for j in self.J_GRAY_L[b]) <= self.lin_CAPEX_w[u, n, b]
+
+        def CapexEquation_Gray_R_rule(self, u, n, b):
+            return (sum(self.lin_CAPEX_lambda[u, n, j] for j in self.J_GRAY_R[b])
+                    <= self.Y_PARALLEL_UNIT[u, n] - self.lin_CAPEX_w[u, n, b])
+
         def CapexEquation_4_rule(self, u, n):
             return sum(
                 self.lin_CAPEX_z[u, n, j]
@@ -1194,7 +1304,7 @@ class SuperstructureModel(AbstractModel):
         def CapexEquation_EC_Total_rule(self, u):
             return self.EC[u] == sum(
                 self.EC_UNIT[u, n]
-                for n in self.N_CAPEX
+                for n in self.N_CAPEX if (u, n) in self.U_C_PARALLEL
             )
 
         # Fixed Capital investment, Annual capital costs, Heat Pump, Returning costs, Total
@@ -1261,23 +1371,29 @@ class SuperstructureModel(AbstractModel):
         )
 
         self.CapexParallel_2 = Constraint(
-            self.U_C,
-            self.N_CAPEX,
+            self.U_C_PARALLEL,
             rule=CapexParallel_2_rule
         )
 
         self.CapexParallel_3 = Constraint(
-            self.U_C,
-            self.N_CAPEX,
+            self.U_C_PARALLEL,
             rule=CapexParallel_3_rule
         )
 
-        self.CapexEquation_2 = Constraint(self.U_C, self.N_CAPEX, rule=CapexEquation_2_rule)
-        self.CapexEquation_filling = Constraint(self.U_C, self.N_CAPEX, rule= CapexParallel_FillOrder_rule)
-        self.CapexEquation_3 = Constraint(self.U_C, self.N_CAPEX,rule=CapexEquation_3_rule)
-        self.CapexEquation_4 = Constraint(self.U_C, self.N_CAPEX, rule=CapexEquation_4_rule)
-        self.CapexEquation_5 = Constraint( self.U_C, self.N_CAPEX, self.JI, rule=CapexEquation_5_rule)
-        self.CapexEquation_6 = Constraint(self.U_C,self.N_CAPEX, self.J, rule=CapexEquation_6_rule)
+        self.CapexEquation_2 = Constraint(self.U_C_PARALLEL, rule=CapexEquation_2_rule)
+        self.CapexEquation_filling = Constraint(self.U_C_PARALLEL, rule= CapexParallel_FillOrder_rule)
+        self.CapexEquation_3 = Constraint(self.U_C_PARALLEL, rule=CapexEquation_3_rule)
+        if formulation == 'incremental':
+            self.CapexEquation_4 = Constraint(self.U_C_PARALLEL, rule=CapexEquation_4_rule)
+            self.CapexEquation_5 = Constraint(self.U_C_PARALLEL, self.JI, rule=CapexEquation_5_rule)
+            self.CapexEquation_6 = Constraint(self.U_C_PARALLEL, self.J, rule=CapexEquation_6_rule)
+        else:
+            self.CapexEquation_lambda = Constraint(self.U_C_PARALLEL, rule=CapexEquation_lambda_rule)
+            if formulation == 'sos2':
+                self.CapexEquation_SOS2 = SOSConstraint(self.U_C_PARALLEL, rule=CapexEquation_SOS2_rule, sos=2)
+            else:
+                self.CapexEquation_Gray_L = Constraint(self.U_C_PARALLEL, self.JB, rule=CapexEquation_Gray_L_rule)
+                self.CapexEquation_Gray_R = Constraint(self.U_C_PARALLEL, self.JB, rule=CapexEquation_Gray_R_rule)
         self.CapexEquation_EC_Total = Constraint( self.U_C, rule=CapexEquation_EC_Total_rule)
         self.CapexEquation_7 = Constraint(self.U_C, rule=CapexEquation_7_rule)
 
@@ -1398,8 +1514,26 @@ class SuperstructureModel(AbstractModel):
     def create_LCAEquations(self):
         """
         Description
-        :return:
+        -------
+        Creates the impacts of the inflowing components, the utilities and the waste per impact category.
+
+        If lazy impact categories are set (Superstructure.set_lazyImpactCategories), the constraints are only
+        built for the categories in IMPACT_CATEGORIES_MILP: the objective and the multi-objective categories.
+        The variables of the other categories are not part of any constraint and are calculated after the
+        solve (utils/impact_categories.py). A category which is needed later as objective or bound is added
+        to the instance with activate_impact_category.
         """
+
+        def milp_impact_categories_init(self):
+            if not getattr(self, 'lazy_impact_categories', False):
+                return list(self.IMPACT_CATEGORIES)
+
+            used = {self.objective_name} | set(getattr(self, 'multi_objectives', None) or {})
+            return [impCat for impCat in self.IMPACT_CATEGORIES if impCat in used]
+
+        self.IMPACT_CATEGORIES_MILP = Set(within=self.IMPACT_CATEGORIES, initialize=milp_impact_categories_init,
+                                          ordered=True)
+
         # start with impacts of the inflowing components
         # needs to be introduced like phi variable! look how it is passed on
         self.impact_inFlow_components = Param(self.I, self.IMPACT_CATEGORIES, initialize=0, mutable=True)
@@ -1407,9 +1541,13 @@ class SuperstructureModel(AbstractModel):
         self.IMPACT_INPUTS_PER_CAT = Var(self.IMPACT_CATEGORIES)
 
         def LCA_Inflow_U_rule(self, u, ImpCat):
+            if ImpCat not in self.IMPACT_CATEGORIES_MILP:
+                return Constraint.Skip
             return self.IMPACT_INPUTS_U_CAT[u, ImpCat] == sum(self.FLOW_ADD_TOT[u, i] * self.impact_inFlow_components[i, ImpCat] * self.flh[u]
                                                 for i in self.I)
         def LCA_All_Inflow_rule(self, ImpCat):
+            if ImpCat not in self.IMPACT_CATEGORIES_MILP:
+                return Constraint.Skip
             return (self.IMPACT_INPUTS_PER_CAT[ImpCat] == sum(self.IMPACT_INPUTS_U_CAT[u, ImpCat] for u in self.U)
                     /self.sourceOrProductLoad/1000)  # to convert to impc/KG of product or source
 
@@ -1428,7 +1566,9 @@ class SuperstructureModel(AbstractModel):
 
         # set the constraints
         def LCA_Utility_rule(self, ut, impCat):
-            if ut == "Electricity":  # ENERGY_DEMAND_TOT is in MWh! util_impact_factors in kg_CO2/MWh
+            if impCat not in self.IMPACT_CATEGORIES_MILP:
+                return Constraint.Skip
+            elif ut == "Electricity":  # ENERGY_DEMAND_TOT is in MWh! util_impact_factors in kg_CO2/MWh
                 return (self.IMPACT_UTILITIES[ut, impCat] == (self.ENERGY_DEMAND_TOT[ut] + self.ENERGY_DEMAND_HP_EL * self.H)
                         * self.util_impact_factors[ut, impCat])
             elif ut == "Chilling":
@@ -1442,6 +1582,8 @@ class SuperstructureModel(AbstractModel):
                 return self.IMPACT_UTILITIES[ut, impCat] == 0
 
         def LCA_Utility_TOT_rule(self, impCat):
+            if impCat not in self.IMPACT_CATEGORIES_MILP:
+                return Constraint.Skip
             return (self.IMPACT_UTILITIES_PER_CAT[impCat] == sum(self.IMPACT_UTILITIES[ut, impCat] for ut in self.UT)
                     /self.sourceOrProductLoad/1000) # to convert to impc/KG of product or source
 
@@ -1457,10 +1599,14 @@ class SuperstructureModel(AbstractModel):
         self.IMPACT_WASTE_PER_CAT = Var(self.IMPACT_CATEGORIES)
 
         def LCA_Waste_rule(self, u, impCat):
+            if impCat not in self.IMPACT_CATEGORIES_MILP:
+                return Constraint.Skip
             wasteType = self.waste_type_U[u].value
             return (self.WASTE_U[u, impCat] == self.flh[u] * sum(self.FLOW_WASTE[u, i] * self.waste_impact_fac[wasteType, impCat]
                                                           for i in self.I))
         def LCA_Waste_TOT_rule(self, impCat):
+            if impCat not in self.IMPACT_CATEGORIES_MILP:
+                return Constraint.Skip
             return (self.IMPACT_WASTE_PER_CAT[impCat] == sum(self.WASTE_U[u, impCat] for u in self.U)
                     /self.sourceOrProductLoad/1000) # to convert to impc/KG of product or source
 
@@ -1472,6 +1618,8 @@ class SuperstructureModel(AbstractModel):
         self.IMPACT_TOT = Var(self.IMPACT_CATEGORIES)
 
         def LCA_Total_Impact_rule(self, impCat):
+            if impCat not in self.IMPACT_CATEGORIES_MILP:
+                return Constraint.Skip
             return self.IMPACT_TOT[impCat] == (self.IMPACT_INPUTS_PER_CAT[impCat] + self.IMPACT_UTILITIES_PER_CAT[impCat]
                                                + self.IMPACT_WASTE_PER_CAT[impCat])
 
@@ -1496,28 +1644,41 @@ class SuperstructureModel(AbstractModel):
 
         numbers = [1, 2, 3]
 
+        # Sets
+        # ----
+
+        def group_links_init(self):
+            # every member of a process group is linked to the first member of the group (its representative),
+            # so a group with n members results in n-1 equality constraints
+            links = []
+            for members in self.groups.values():
+                members = [u for u in members if u in self.U]
+                for u in members[1:]:
+                    if (u, members[0]) not in links:
+                        links.append((u, members[0]))
+            return links
+
+        def connection_links_init(self):
+            # pairs (u, k) of units which have at least one forced connection of type k
+            return [(u, k) for u, targets in self.connections.items() if u in self.U
+                    for k in numbers if targets.get(k)]
+
+        self.GROUP_LINKS = Set(within=self.U * self.U, initialize=group_links_init)
+        self.CONNECTION_LINKS = Set(within=self.U * numbers, initialize=connection_links_init)
+
         # Variables
         # ---------
 
         # Constraints
         # -----------
 
-        def ProcessGroup_logic_1_rule(self, u, uu):
+        def ProcessGroup_logic_1_rule(self, u, u_rep):
 
             # this constraint is only relevant if the design is not fixed
             if self._fixedDesign:
                 return Constraint.Skip
 
-            ind = False
-
-            for i, j in self.groups.items():
-
-                if u in j and uu in j:
-                    return self.Y[u] == self.Y[uu]
-                    ind = True # what is this?? Unreachable code?
-
-            if ind == False:
-                return Constraint.Skip
+            return self.Y[u] == self.Y[u_rep]
 
         def ProcessGroup_logic_2_rule(self, u, k):
 
@@ -1525,23 +1686,15 @@ class SuperstructureModel(AbstractModel):
             if self._fixedDesign:
                 return Constraint.Skip
 
-            ind = False
-
-            for i, j in self.connections.items():
-                if u == i:
-                    if j[k]:
-                        # so only 1 connection is allowed
-                        # also this currently does not work if you want your input to only go into one unit...,
-                        # Might have to build that functionality in the SOURCE tab of the Excel file
-                        return sum(self.Y[uu] for uu in j[k]) >= self.Y[u]
-                        # ind = True
-
-            if ind == False:
-                return Constraint.Skip
+            # so only 1 connection is allowed
+            # also this currently does not work if you want your input to only go into one unit...,
+            # Might have to build that functionality in the SOURCE tab of the Excel file
+            # units left out of the data file (dead units) can not be connected
+            return sum(self.Y[uu] for uu in self.connections[u][k] if uu in self.U) >= self.Y[u]
 
-        self.ProcessGroup_logic_1 = Constraint(self.U, self.UU, rule=ProcessGroup_logic_1_rule)
+        self.ProcessGroup_logic_1 = Constraint(self.GROUP_LINKS, rule=ProcessGroup_logic_1_rule)
 
-        self.ProcessGroup_logic_2 = Constraint(self.U, numbers, rule=ProcessGroup_logic_2_rule)
+        self.ProcessGroup_logic_2 = Constraint(self.CONNECTION_LINKS, rule=ProcessGroup_logic_2_rule)
 
 
     # **** OBJECTIVE FUNCTIONS *****
@@ -1660,3 +1813,79 @@ class SuperstructureModel(AbstractModel):
                 return self.objective_sense == 0  # 0 for minimizing
 
         self.objective_sense_rule = Constraint(rule=objective_sense_rule1)
+
+
+class SuperstructureModel(SuperstructureEquations, AbstractModel):
+    """
+    Class description
+    -----------------
+
+    Abstract superstructure model. The equations are declared once with
+    create_ModelEquations, populateModel creates a model instance for every data file.
+
+    """
+
+    def populateModel(self, Data_file):
+        """
+        Parameters
+        ----------
+        Data_file : Dictionary
+            Model data in AbstractModel readable file
+
+        Returns
+        -------
+        PYOMO ConcreteModel
+            filled model instance with equations from SuperstructureModel and
+            data from Data_file.
+
+        Description
+        -------
+        The declared model is not changed, so populateModel can be called
+        repeatedly (e.g., once per scenario) on the same SuperstructureModel.
+
+        """
+        # the instance is not assigned to the model: as a Pyomo component it would become a sub-block of this model
+        # and be cloned again (with all earlier instances) on every following call
+        return self.create_instance(Data_file, name='ModelInstance')
+
+
+class ConcreteSuperstructureModel(SuperstructureEquations, ConcreteModel):
+    """
+    Class description
+    -----------------
+
+    Superstructure model instance that is built directly from a data file. The
+    equations are declared on the ConcreteModel itself and every component is
+    constructed with its entry of the data file. This skips the clone of the
+    declared AbstractModel and Pyomo's ModelData layer of populateModel. The
+    component names are the same, so the instance can be used with the
+    optimizers, ModelOutput and the analyzers like the one from populateModel.
+
+    """
+
+    def __init__(self, superstructure_input, Data_file, fixedDesign=False, name='ModelInstance'):
+        """
+        Parameters
+        ----------
+        superstructure_input : Superstructure Object
+        Data_file : Dictionary
+            Model data in AbstractModel readable file (see Superstructure.create_DataFile)
+        fixedDesign : Bool
+            see SuperstructureModel
+        name : String
+            Name of the model instance
+
+        """
+        # Model.__init__ instead of ConcreteModel.__init__: a ConcreteModel constructs every component as soon as it
+        # is declared, but the constraint rules use parameters that are declared after them (e.g., H). So all
+        # components are declared first and then constructed in declaration order, each with its data.
+        Model.__init__(self, name=name)
+        self._set_optionals_from_superstructure(superstructure_input)
+        self._fixedDesign = fixedDesign
+
+        self.create_ModelEquations()
+
+        # garbage collection is paused like in create_instance, the many small expression objects otherwise trigger
+        # a lot of needless collection cycles
+        with PauseGC():
+            self.construct(Data_file)
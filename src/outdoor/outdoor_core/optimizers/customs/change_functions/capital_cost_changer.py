@@ -14,7 +14,9 @@ def change_capital_costs(Instance, Parameter, Value, Index = None, Superstructur
         if i.Number == Index:
             unit_operation = i
             unit_operation.CAPEX_factors['C_Ref'][Index] = Value
-            (x_vals,y_vals) = capex_calculator(unit_operation, Superstructure.CECPI,Superstructure.linearizationDetail)
+            (x_vals,y_vals) = capex_calculator(unit_operation, Superstructure.CECPI,Superstructure.linearizationDetail,
+                                               maxError=getattr(Superstructure, 'linearizationMaxError', 0.01),
+                                               intervals=len(Instance.JI))
             temp_x = x_vals['lin_CAPEX_x']
             temp_y = y_vals['lin_CAPEX_y']
 
@@ -35,7 +35,9 @@ def change_simple_capex(Instance, Parameter, Value, Index = None, Superstructure
             unit_operation.CAPEX_factors['m_Ref'][Index] = 1
             unit_operation.CAPEX_factors['CECPI_ref'][Index] = Superstructure.CECPI['CECPI']
 
-            (x_vals,y_vals) = capex_calculator(unit_operation, Superstructure.CECPI,Superstructure.linearizationDetail)
+            (x_vals,y_vals) = capex_calculator(unit_operation, Superstructure.CECPI,Superstructure.linearizationDetail,
+                                               maxError=getattr(Superstructure, 'linearizationMaxError', 0.01),
+                                               intervals=len(Instance.JI))
             temp_x = x_vals['lin_CAPEX_x']
             temp_y = y_vals['lin_CAPEX_y']
 
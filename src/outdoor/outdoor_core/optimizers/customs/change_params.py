@@ -16,8 +16,13 @@ from numpy import linspace
 
 from .change_functions.parameter_changer_functions import *  # contains all funcitions to change the parameters in the model instance called in change_parameter
 from ...utils.timer import time_printer
+from pyomo.environ import Param
 import re
 
+# parameters the sparse index sets of the model are built from when the instance is populated (U_C_PARALLEL, U_HI).
+# A model instance does not follow changes of these parameters, it has to be populated again
+SET_DEFINING_PARAMETERS = ('upperFlowLimitUnit', 'beta')
+
 
 # from .change_functions.utility_cost_changer import change_utility_costs
 # from .change_functions.capital_cost_changer import change_capital_costs
@@ -168,6 +173,9 @@ def prepare_mutable_parameters(ModelInstance, input_data):
         else:
             #param_id = param_name.split("(")[-1][0:-1] # Get the parameter name in between the brackets
             param_id = extract_string_between_brackets(param_name)
+            if param_id in SET_DEFINING_PARAMETERS:
+                raise ValueError("The parameter {} defines index sets of the model, it can not be changed in a "
+                                 "sensitivity analysis".format(param_id))
             param = getattr(ModelInstance, param_id)  # Dynamically access the parameter
             # change the parameter to mutable
             param._mutable = True
@@ -175,6 +183,92 @@ def prepare_mutable_parameters(ModelInstance, input_data):
     return ModelInstance
 
 
+def update_mutable_parameters(ModelInstance, dataFile, currentDataFile):
+    """
+    Parameters
+    ----------
+    ModelInstance : PYOMO ConcreteModel
+        model instance which was populated with currentDataFile
+    dataFile : Dictionary
+        data file of the new case (e.g., a scenario)
+    currentDataFile : Dictionary
+        data file the model instance currently holds
+
+    Returns
+    -------
+    Boolean
+        True if the model instance now holds the data of dataFile, False if the data files differ in data which can
+        not be changed in place (sets, non-mutable parameters, parameters in SET_DEFINING_PARAMETERS, missing
+        entries). In that case the model instance has to be populated again and is left unchanged.
+
+    Description
+    -------
+    Pushes all parameter values of dataFile which differ from currentDataFile into the mutable parameters of the
+    model instance. Used to solve many scenarios with one model instance instead of repopulating the model for
+    each of them.
+
+    """
+    newData = dataFile[None]
+    currentData = currentDataFile[None]
+
+    if newData.keys() != currentData.keys():
+        return False
+
+    changes = []
+    for name, newValues in newData.items():
+        currentValues = currentData[name]
+        if newValues is currentValues:
+            continue
+
+        changedValues = _changed_values(newValues, currentValues)
+        if changedValues is None:
+            return False
+        if not changedValues:
+            continue
+
+        if name in SET_DEFINING_PARAMETERS:
+            return False
+        component = ModelInstance.find_component(name)
+        if component is None or component.ctype is not Param or not component.mutable:
+            return False
+        if None in changedValues and component.is_indexed():
+            return False
+
+        changes.append((component, changedValues))
+
+    for component, changedValues in changes:
+        for index, value in changedValues.items():
+            component[index] = value
+
+    return True
+
+
+def _changed_values(newValues, currentValues):
+    """
+    Returns the entries of newValues which differ from currentValues, or None if the two can not be compared entry
+    by entry (e.g., different indices or set data)
+    """
+    if not isinstance(newValues, dict) or not isinstance(currentValues, dict):
+        return None if newValues != currentValues else {}
+
+    if newValues.keys() != currentValues.keys():
+        return None
+
+    changedValues = {}
+    for index, value in newValues.items():
+        currentValue = currentValues[index]
+        if value is currentValue or value == currentValue:
+            continue
+        # nan values are never equal to themselves, don't treat them as a change
+        if value != value and currentValue != currentValue:
+            continue
+        if isinstance(value, (list, tuple, set, dict)):
+            return None
+        changedValues[index] = value
+
+    return changedValues
+
+
 def extract_string_between_brackets(s):
     # Regular expression pattern to match text within parentheses
     pattern = r'\((.*?)\)'
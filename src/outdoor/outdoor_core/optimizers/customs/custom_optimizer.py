@@ -9,7 +9,7 @@ Created on Tue Jun 15 12:19:19 2021
 
 import copy
 import logging
-from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import numpy as np
 import pyomo.environ as pyo
 from pyomo.environ import *
@@ -19,14 +19,25 @@ import random
 from .change_objective import change_objective_function
 from .change_params import (
     calculate_sensitive_parameters,
-    change_parameter,
+    update_mutable_parameters,
+)
+from .parallel_runs import (
+    ParameterPointSolver,
+    PointWorkers,
+    default_solver_threads,
+    parameter_point_solver,
+    run_points,
+    worker_solver_options,
 )
 from ..main_optimizer import SingleOptimizer
 from ...model.optimization_model import SuperstructureModel
 from ...output_classes.multi_model_output import MultiModelOutput
 from ...output_classes.stochastic_model_output import StochasticModelOutput_mpi_sppy
+from ...utils.impact_categories import activate_impact_category
 from ...utils.progress_bar import print_progress_bar
+from ...utils.scenario_data import ScenarioStream
 from ...utils.timer import time_printer
+from ...utils.warm_start import SolutionPool, flowsheet_solution, scenario_coordinates
 
 
 class MCDAOptimizer(SingleOptimizer):
@@ -72,10 +83,32 @@ class MultiObjectiveOptimizer(SingleOptimizer):
     This class is used to solve a multi-objective optimization problem between two objectives
     with the goal of finding the pareto front
     """
-    def __init__(self, solver_name, solver_interface, solver_options=None, multi_data=None):
+    def __init__(self, solver_name, solver_interface, solver_options=None, multi_data=None, warm_start=True,
+                 superstructure=None, workers=1, solver_threads=None):
+        """
+        Parameters
+        ----------
+        warm_start : Boolean, optional
+            Start every pareto point (and design space sample) from the flowsheet of the nearest solved one
+        superstructure : Superstructure, optional
+            Needed for workers > 1, every worker builds its own model instance from it
+        workers : Integer, optional
+            Number of worker processes which solve the pareto points in parallel, 1 solves them one after another
+            in this process (see parallel_runs.run_points)
+        solver_threads : Integer, optional
+            Number of solver threads of every worker
+        """
         super().__init__(solver_name, solver_interface, solver_options)
         self.multi_data = multi_data
-        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options)
+        self.warm_start = warm_start
+        self.superstructure = superstructure
+        self.solver_options = solver_options
+        self.workers = workers
+        self.solver_threads = solver_threads
+        # the pareto points only change the objective and the bound constraint, so the model stays in the solver
+        self.single_optimizer = SingleOptimizer(solver_name, solver_interface,
+                                                solver_options=worker_solver_options(solver_options, solver_threads),
+                                                persistent=True)
 
     def run_optimization(self,
                          model_instance,
@@ -95,30 +128,24 @@ class MultiObjectiveOptimizer(SingleOptimizer):
         objective2 = self.multi_data["objective2"] #  the objective function that is the model objective
         paretoPoints = self.multi_data["paretoPoints"]
 
-        # get the bounds of the first objective function
-        manualBoundsObjective1 = self.multi_data["bounds_objective1"]
         # start the timer
         time_printer(programm_step="Multi-objective optimization")
 
         # if there are bounds set them:
-        lowerBound = manualBoundsObjective1[0]
-        upperBound = manualBoundsObjective1[1]
-
-        if lowerBound is not None:
-            self.bound_region_objective(model_instance, objective1, lowerBound, "lower")
-        if upperBound is not None:
-            self.bound_region_objective(model_instance, objective1, upperBound, "upper")
+        self.bound_region(model_instance)
 
 
         # run the optimization for the first objective
         self.change_model_objective(model_instance, objective1)
         single_solved_obj1 = self.single_optimizer.run_optimization(model_instance)
+        flowsheet_obj1 = flowsheet_solution(model_instance)
         single_solved_obj1._tidy_data()
         # model_output.add_process("maxObjective1", single_solved_obj1)
 
         # run the optimization for the second objective
         self.change_model_objective(model_instance, objective2)
         single_solved_obj2 = self.single_optimizer.run_optimization(model_instance)
+        flowsheet_obj2 = flowsheet_solution(model_instance)
         single_solved_obj2._tidy_data()
         # model_output.add_process("maxObjective2", single_solved_obj2)
 
@@ -137,29 +164,31 @@ class MultiObjectiveOptimizer(SingleOptimizer):
             model_output.add_process("maxObjective1", single_solved_obj1)
             return model_output
 
-        # now divide the bounds into pareto points and run the optimization for each bound
-        bounds = np.linspace(bound_1, bound_2, paretoPoints)
         unfeasibleBounds = []
-        # change the objective function to the second objective
-        self.change_model_objective(model_instance, objective2)
-        count = 0
-        for bound in bounds:
-            count += 1
-            outputName = "pareto_bound_" + str(count)
-            # change the bounds of the first objective,
-            # DON'T MAKE THE CONSTRAINT NAME -> need to be replaced each iteration
-            self.bound_objective(model_instance, objective1, bound)
-            try:
-                single_solved = self.single_optimizer.run_optimization(model_instance, runFeasibilityAnalysis=False,
-                                                                       tee=False)
-                single_solved._tidy_data()
-                model_output.add_process(outputName, single_solved)
-            except:
+        # the pareto points are started from the flowsheets of the anchor points (or the nearest solved point)
+        anchorFlowsheets = [({objective1: bound_1}, flowsheet_obj1), ({objective1: bound_2}, flowsheet_obj2)]
+        adaptive = self.multi_data.get("adaptive_refinement", False)
+        maxPoints = self.multi_data.get("max_solves", paretoPoints) if adaptive else paretoPoints
+
+        # every point is solved for the objective function of the second objective and its bound of the first one
+        with self.pareto_point_runner(model_instance, anchorFlowsheets, maxPoints) as solvePoints:
+            if adaptive:
+                results = self.refine_pareto_front(solvePoints, bound_1, bound_2)
+            else:
+                # now divide the bounds into pareto points and run the optimization for each bound
+                results = solvePoints([(bound, bound) for bound in np.linspace(bound_1, bound_2, paretoPoints)])
+
+        # merge the points by their pareto index (from the first to the second anchor point)
+        bounds = sorted(results, key=lambda bound: (bound - bound_1) / (bound_2 - bound_1))
+        for count, bound in enumerate(bounds, start=1):
+            if results[bound] is None:
                 # print the error message in orange
                 unfeasibleBounds.append(bound)
                 print("\033[93m" + "The optimization problem is infeasible for the bound: {}"
                                    " \n of objective {}".format(bound, objective1) + "\033[0m")
-        print('the bounds are:', bounds)
+            else:
+                model_output.add_process("pareto_bound_" + str(count), results[bound])
+        print('the bounds are:', np.array(bounds))
         print("\033[93m" + "The infeasible for the bounds are: {}"
                            " \n for objective {}".format(unfeasibleBounds, objective1) + "\033[0m")
 
@@ -192,20 +221,25 @@ class MultiObjectiveOptimizer(SingleOptimizer):
             bound_instance = self.create_bounded_design_space(model_instance_original, design_space_bounds)
 
             # get the 4 corners of the trapezoid
+            cornerFlowsheets = []
             self.change_model_objective(bound_instance, objective1)
             opt_1 = self.single_optimizer.run_optimization(bound_instance)
+            cornerFlowsheets.append(flowsheet_solution(bound_instance))
             opt_1._tidy_data()
 
             self.change_model_objective(bound_instance, objective1, flipSense=True)
             opt_2 = self.single_optimizer.run_optimization(bound_instance)
+            cornerFlowsheets.append(flowsheet_solution(bound_instance))
             opt_2._tidy_data()
 
             self.change_model_objective(bound_instance, objective2)
             opt_3 = self.single_optimizer.run_optimization(bound_instance)
+            cornerFlowsheets.append(flowsheet_solution(bound_instance))
             opt_3._tidy_data()
 
             self.change_model_objective(bound_instance, objective2, flipSense=True)
             opt_4 = self.single_optimizer.run_optimization(bound_instance)
+            cornerFlowsheets.append(flowsheet_solution(bound_instance))
             opt_4._tidy_data()
 
             # Determine the x points for objective1
@@ -249,6 +283,11 @@ class MultiObjectiveOptimizer(SingleOptimizer):
                 print("\033[93m" + "The 'sample_size' is not defined in the options, defaulted to 100" + "\033[0m")
 
             samplePoints = self.sample_uniform_in_polygon(polygon, n_samples=sample_size)
+
+            # the samples are started from the nearest solved sample (or corner)
+            samplePool = SolutionPool()
+            for x, y, flowsheet in zip(x_points_obj_1, y_points_obj_2, cornerFlowsheets):
+                samplePool.add({objective1: x, objective2: y}, flowsheet)
             count = 0
             nEnd = len(samplePoints)
 
@@ -279,8 +318,12 @@ class MultiObjectiveOptimizer(SingleOptimizer):
                 # else:
                 #     self.change_model_objective(model_instance, objective1)
 
+                coordinates = {objective1: objective1_bound, objective2: objective2_bound}
+                warmstart = samplePool.nearest(coordinates) if self.warm_start else None
                 try:
-                    single_opt_solved = self.single_optimizer.run_optimization(model_instance, tee=False)
+                    single_opt_solved = self.single_optimizer.run_optimization(model_instance, tee=False,
+                                                                               warmstart=warmstart)
+                    samplePool.add(coordinates, flowsheet_solution(model_instance))
                     single_opt_solved._tidy_data()
                     model_output.add_process("sc{}".format(count), single_opt_solved)
                 except:
@@ -335,6 +378,7 @@ class MultiObjectiveOptimizer(SingleOptimizer):
 
         else:
             if objective in list(model_instance.IMPACT_CATEGORIES):
+                activate_impact_category(model_instance, objective)
                 def Objective_rule(Instance):
                     return Instance.IMPACT_TOT[objective]
                 model_instance.Objective = Objective(rule=Objective_rule, sense=objective_sense)
@@ -385,13 +429,182 @@ class MultiObjectiveOptimizer(SingleOptimizer):
                 return operator(Instance.NPFWD, bound)
         else:
             if objective in model_instance.impact_categories_list:
+                activate_impact_category(model_instance, objective)
                 def bound_objective_rule(Instance):
                     return operator(Instance.IMPACT_TOT[objective], bound)
             else:
                 raise Exception("The objective function {} is not defined in the model instance".format(objective))
 
-        # set the bound constraint
-        setattr(model_instance, constraint_name, Constraint(rule=bound_objective_rule))
+        # set the bound constraint, an existing bound is updated in place so a persistent solver only changes its rhs
+        if model_instance.component(constraint_name) is not None:
+            model_instance.component(constraint_name).set_value(bound_objective_rule(model_instance))
+        else:
+            setattr(model_instance, constraint_name, Constraint(rule=bound_objective_rule))
+
+    @contextmanager
+    def pareto_point_runner(self, model_instance, anchorFlowsheets, maxPoints=None):
+        """
+        Context manager which gives a function that solves a list of (key, bound) pareto points and returns
+        {key: ModelOutput or None (infeasible)}. The points are solved with the model instance of this process or,
+        for workers > 1, by worker processes which build their own model instance from the superstructure and keep
+        it until the end of the with block (e.g., for the rounds of refine_pareto_front).
+        :param model_instance: the model instance with the region bounds
+        :param anchorFlowsheets: List of ({objective1: bound}, flowsheet) of the anchor points (warm start)
+        :param maxPoints: number of points which are solved at most, no more workers are started
+        """
+        if self.workers is not None and self.workers > 1:
+            if self.superstructure is None:
+                raise ValueError("The parallel pareto points need the superstructure, the workers build their own "
+                                 "model instance from it")
+            solverOptions = worker_solver_options(self.solver_options,
+                                                  default_solver_threads(self.workers, self.solver_threads))
+            with PointWorkers(pareto_point_solver,
+                              (self.superstructure, self.multi_data, self.solver_name, self.solver_interface,
+                               solverOptions, self.warm_start, anchorFlowsheets),
+                              workers=self.workers, maxWorkers=maxPoints) as pointWorkers:
+                yield pointWorkers.run
+        else:
+            self.change_model_objective(model_instance, self.multi_data["objective2"])
+            pointSolver = ParetoPointSolver(model_instance, self, self.warm_start, anchorFlowsheets)
+            yield lambda points: {key: pointSolver.solve_point(bound) for key, bound in points}
+
+    def refine_pareto_front(self, solvePoints, bound_1, bound_2):
+        """
+        Parameters
+        ----------
+        solvePoints : Function
+            solves a list of (bound, bound) pareto points, see pareto_point_runner
+        bound_1 : Float
+            value of the first objective at the first anchor point
+        bound_2 : Float
+            value of the first objective at the second anchor point
+
+        Returns
+        -------
+        results : Dictionary
+            {bound: ModelOutput or None (infeasible)} of all solved pareto points
+
+        Description
+        -----------
+        Adaptive pareto front (multi_data["adaptive_refinement"] = True). Starts with a coarse uniform grid of
+        multi_data["initial_points"] points (default 3) between the anchor values and bisects the intervals in which
+        the chosen flowsheet changes or next to a point where the slope of the front changes (see
+        refinement_intervals). Stops after multi_data["max_solves"] pareto points (default paretoPoints) or when no
+        interval needs to be refined. Every round bisects as many intervals as there are workers, so the front
+        after each round is a complete approximation.
+
+        """
+        maxSolves = self.multi_data.get("max_solves", self.multi_data["paretoPoints"])
+        initialPoints = max(min(self.multi_data.get("initial_points", 3), maxSolves), 2)
+        batchSize = self.workers if self.workers is not None and self.workers > 1 else 1
+
+        results = solvePoints([(bound, bound) for bound in np.linspace(bound_1, bound_2, initialPoints)])
+        while len(results) < maxSolves:
+            intervals = self.refinement_intervals(results, bound_1, bound_2)
+            if not intervals:
+                break
+            midpoints = [(left + right) / 2 for left, right in intervals[:min(batchSize, maxSolves - len(results))]]
+            results.update(solvePoints([(bound, bound) for bound in midpoints]))
+            print("--INFO:-- Pareto front refinement: {} points solved, {} intervals to refine ----".format(
+                len(results), len(intervals)))
+
+        return results
+
+    def refinement_intervals(self, results, bound_1, bound_2):
+        """
+        Parameters
+        ----------
+        results : Dictionary
+            {bound: ModelOutput or None (infeasible)} of the solved pareto points
+        bound_1 : Float
+            value of the first objective at the first anchor point
+        bound_2 : Float
+            value of the first objective at the second anchor point
+
+        Returns
+        -------
+        intervals : List
+            (bound, bound) of the neighbouring solved points whose interval is bisected next, intervals with a
+            change of the flowsheet first, then the widest ones
+
+        Description
+        -----------
+        An interval is refined if the chosen flowsheets (return_chosen) of its points differ or if the slope of the
+        front changes by more than multi_data["slope_tolerance"] (default 0.1) at one of its points. The slope is
+        taken on the front scaled to the range of the first objective between the anchors and the range of the
+        second objective of the solved points. Intervals narrower than multi_data["resolution"] (default 0.01,
+        fraction of the anchor range) are not refined. If infeasible points lie in an interval, the widest gap
+        between its solved points is bisected.
+
+        """
+        slopeTolerance = self.multi_data.get("slope_tolerance", 0.1)
+        resolution = self.multi_data.get("resolution", 0.01)
+        objective2 = self.multi_data["objective2"]
+
+        # position of the feasible points along the front, 0 at the first and 1 at the second anchor point
+        front = sorted(((bound - bound_1) / (bound_2 - bound_1), bound, result)
+                       for bound, result in results.items() if result is not None)
+        if len(front) < 2:
+            return []
+
+        positions = [position for position, _, _ in front]
+        values = [self.get_objective_value(result, objective2) for _, _, result in front]
+        valueRange = (max(values) - min(values)) or 1.0
+        chosen = [self.chosen_units(result) for _, _, result in front]
+
+        slopes = [(values[i + 1] - values[i]) / valueRange / (positions[i + 1] - positions[i])
+                  for i in range(len(front) - 1)]
+        kinks = [0 < i < len(front) - 1 and abs(slopes[i] - slopes[i - 1]) > slopeTolerance
+                 for i in range(len(front))]
+
+        # all solved points, the infeasible points between two feasible ones split their interval as well
+        tried = sorted(((bound - bound_1) / (bound_2 - bound_1), bound) for bound in results)
+
+        intervals = []
+        for i in range(len(front) - 1):
+            switch = chosen[i] != chosen[i + 1]
+            if not (switch or kinks[i] or kinks[i + 1]):
+                continue
+            inside = [point for point in tried if positions[i] <= point[0] <= positions[i + 1]]
+            width, left, right = max((b[0] - a[0], a[1], b[1]) for a, b in zip(inside, inside[1:]))
+            if width > resolution:
+                intervals.append((not switch, -width, left, right))
+
+        return [(left, right) for _, _, left, right in sorted(intervals)]
+
+    def get_objective_value(self, result, objective):
+        """
+        :param result: ModelOutput of a run
+        :param objective: objective function or impact category
+        :return: value of the objective in the run (zero impacts are deleted by _tidy_data)
+        """
+        if objective in result._data["IMPACT_CATEGORIES"]:
+            return result._data["IMPACT_TOT"].get(objective, 0)
+        return result._data[objective]
+
+    def chosen_units(self, result):
+        """
+        :param result: ModelOutput of a run
+        :return: frozenset of the unit numbers of the chosen flowsheet (return_chosen)
+        """
+        # return_chosen fails if no unit has a flow (the zero flows are deleted by _tidy_data)
+        if not result._data.get("FLOW_SUM"):
+            return frozenset()
+        return frozenset(result.return_chosen())
+
+    def bound_region(self, model_instance):
+        """
+        This function is used to bound the first objective to the region of multi_data["bounds_objective1"]
+        (lower and upper bound, None if not bound)
+        :param model_instance: the model instance of the pareto front
+        """
+        objective1 = self.multi_data["objective1"]
+        lowerBound, upperBound = self.multi_data["bounds_objective1"]
+
+        if lowerBound is not None:
+            self.bound_region_objective(model_instance, objective1, lowerBound, "lower")
+        if upperBound is not None:
+            self.bound_region_objective(model_instance, objective1, upperBound, "upper")
 
     def bound_region_objective(self, model_instance, objective, bound, boundType):
         """
@@ -446,6 +659,9 @@ class MultiObjectiveOptimizer(SingleOptimizer):
             setattr(model_instance, "bound_FWD_lower", Constraint(rule=bound_objective_rule_FWD_lower))
 
         else:
+            if objective in model_instance.impact_categories_list:
+                activate_impact_category(model_instance, objective)
+
             if objective in model_instance.impact_categories_list and boundType == "upper":
                 def bound_objective_rule_impact_upper(Instance):
                     return Instance.IMPACT_TOT[objective] <= bound
@@ -592,6 +808,73 @@ class MultiObjectiveOptimizer(SingleOptimizer):
 
         return optimized_instance
 
+class ParetoPointSolver:
+    """
+    Class Description
+    -----------------
+    Solves the epsilon-constraint problems of the pareto front on one model instance: the second objective is
+    optimised with the first objective bounded by the epsilon value of the point. Only the bound constraint changes
+    between the points, it is updated in place. With warmStart every point is started from the flowsheet of the
+    nearest solved point (or anchor point).
+    """
+
+    def __init__(self, model_instance, multi_objective_optimizer, warmStart=True, anchorFlowsheets=()):
+        self.model_instance = model_instance
+        self.optimizer = multi_objective_optimizer
+        self.solutionPool = SolutionPool() if warmStart else None
+        if warmStart:
+            for coordinates, flowsheet in anchorFlowsheets:
+                self.solutionPool.add(coordinates, flowsheet)
+
+    def solve_point(self, bound):
+        """
+        Parameters
+        ----------
+        bound : Float
+            epsilon value of the first objective
+
+        Returns
+        -------
+        single_solved : ModelOutput or None
+            tidied results of the point, None if the point is infeasible
+
+        """
+        objective1 = self.optimizer.multi_data["objective1"]
+        # DON'T MAKE THE CONSTRAINT NAME -> need to be replaced each iteration
+        self.optimizer.bound_objective(self.model_instance, objective1, bound)
+        warmstart = self.solutionPool.nearest({objective1: bound}) if self.solutionPool is not None else None
+
+        # infeasible bounds return 'infeasible' (VSS_EVPI_mode), any other error of the run is raised
+        single_solved = self.optimizer.single_optimizer.run_optimization(self.model_instance,
+                                                                         runFeasibilityAnalysis=False,
+                                                                         tee=False, VSS_EVPI_mode=True,
+                                                                         warmstart=warmstart)
+        if single_solved == 'infeasible':
+            return None
+
+        if self.solutionPool is not None:
+            self.solutionPool.add({objective1: bound}, flowsheet_solution(self.model_instance))
+        single_solved._tidy_data()
+        return single_solved
+
+
+def pareto_point_solver(superstructure, multi_data, solverName, solverInterface, solverOptions=None, warmStart=True,
+                        anchorFlowsheets=()):
+    """
+    Factory of the ParetoPointSolver of a worker: sets up the model instance of the superstructure (as
+    SuperstructureProblem.setup_model_instance in multi-objective mode) with the region bounds and the objective of the
+    pareto points
+    """
+    # imported here, the superstructure problem imports this module
+    from ...main.superstructure_problem import SuperstructureProblem
+
+    model_instance = SuperstructureProblem().setup_model_instance(superstructure, "multi-objective", printTimer=False)
+    optimizer = MultiObjectiveOptimizer(solverName, solverInterface, solverOptions, multi_data, warm_start=warmStart)
+    optimizer.bound_region(model_instance)
+    optimizer.change_model_objective(model_instance, multi_data["objective2"])
+    return ParetoPointSolver(model_instance, optimizer, warmStart, anchorFlowsheets)
+
+
 class SensitivityOptimizer(SingleOptimizer):
     def __init__(
         self,
@@ -600,13 +883,34 @@ class SensitivityOptimizer(SingleOptimizer):
         solver_options=None,
         sensi_data=None,
         superstructure=None,
+        workers=1,
+        solver_threads=None,
+        warm_start=True,
     ):
+        """
+        Parameters
+        ----------
+        workers : Integer, optional
+            Number of worker processes which solve the sensitivity points in parallel, 1 solves them one after
+            another in this process (see parallel_runs.run_points)
+        solver_threads : Integer, optional
+            Number of solver threads of every worker
+        warm_start : Boolean, optional
+            Start every point from the flowsheet of the nearest solved point
+        """
         super().__init__(solver_name, solver_interface, solver_options)
 
         self.sensi_data = sensi_data
         self.superstructure = superstructure
+        self.solver_options = solver_options
+        self.workers = workers
+        self.solver_threads = solver_threads
+        self.warm_start = warm_start
 
-        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options)
+        # only (mutable) parameters change between the runs, so the model stays in the solver
+        self.single_optimizer = SingleOptimizer(solver_name, solver_interface,
+                                                solver_options=worker_solver_options(solver_options, solver_threads),
+                                                persistent=True)
 
     def run_optimization(self, model_instance,
                          optimization_mode = None,
@@ -619,63 +923,35 @@ class SensitivityOptimizer(SingleOptimizer):
         timer1 = time_printer(programm_step="Sensitivity optimization")
         sensi_data_Dict_lists = self.calculate_sensitive_parameters(self.sensi_data)
 
-        initial_model_instance = model_instance.clone()
-        time_printer(passed_time=timer1, programm_step="Create initial ModelInstance copy")
         model_output = MultiModelOutput(optimization_mode="sensitivity")
 
-        superstructureData = self.superstructure
-
-
-        for parameterName, (value_list, metadata) in sensi_data_Dict_lists.items():
-            for val in value_list:
-                model_instance = change_parameter(Instance=model_instance,
-                                                  parameter=parameterName,
-                                                  value=val, metadata=metadata,
-                                                  superstructure= superstructureData)
-
-                single_solved = self.single_optimizer.run_optimization(model_instance)
-
-                single_solved._tidy_data()
-                model_output.add_process((parameterName, val), single_solved)
+        # every point changes one parameter of the base case
+        points = [((parameterName, val), [(parameterName, val, metadata)])
+                  for parameterName, (value_list, metadata) in sensi_data_Dict_lists.items()
+                  for val in value_list]
+
+        if self.workers is not None and self.workers > 1:
+            # the workers build their own model instance from the superstructure
+            solverOptions = worker_solver_options(self.solver_options,
+                                                  default_solver_threads(self.workers, self.solver_threads))
+            results = run_points(points, parameter_point_solver,
+                                 (self.superstructure, self.sensi_data, self.solver_name, self.solver_interface,
+                                  solverOptions, self.warm_start),
+                                 workers=self.workers)
+        else:
+            pointSolver = ParameterPointSolver(model_instance, self.single_optimizer, self.superstructure,
+                                               self.warm_start)
+            results = {key: pointSolver.solve_point(changes) for key, changes in points}
+            pointSolver.reset()
 
-            model_instance = initial_model_instance
+        for key, _ in points:
+            model_output.add_process(key, results[key])
 
         model_output.set_sensitivity_data(self.sensi_data)
         timer = time_printer(timer1, "Sensitivity optimization")
         model_output.fill_information(timer)
         return model_output
 
-    def _solve_single_optimisation(self, model_instance, senitivityData):
-        """
-        This function is used to solve the single optimisation problem for each parameter in the sensitivity analysis
-        :param model_instance:
-        :param senitivityData:
-        :return:
-
-        # NOT REALLY WORKING LORD HELP ME PLEASE
-        the idea is to use this function to run parralell computing using follwong code:
-         # Using ProcessPoolExecutor to solve models in parallel
-        with ProcessPoolExecutor(max_workers=4) as executor:
-            futures = [executor.submit(self.solve_single_optimisation, model_instance) for data in data_list]
-            results = [future.result() for future in futures]
-
-        """
-        # parameterName = senitivityData
-        # for parameterName, (value_list, metadata) in sensi_data_Dict_lists.items():
-        #     for val in value_list:
-        #         model_instance = change_parameter(Instance=model_instance,
-        #                                           parameter=parameterName,
-        #                                           value=val, metadata=metadata,
-        #                                           superstructure= superstructureData)
-        #
-        #         single_solved = self.single_optimizer.run_optimization(model_instance)
-        #
-        #         single_solved._tidy_data()
-        #         model_output.add_process((parameterName, val), single_solved)
-        #
-        #     model_instance = initial_model_instance
-        pass
-
 class TwoWaySensitivityOptimizer(SingleOptimizer):
     def __init__(
         self,
@@ -684,15 +960,35 @@ class TwoWaySensitivityOptimizer(SingleOptimizer):
         solver_options=None,
         two_way_data=None,
         superstructure=None,
+        workers=1,
+        solver_threads=None,
+        warm_start=True,
     ):
+        """
+        Parameters
+        ----------
+        workers : Integer, optional
+            Number of worker processes which solve the grid points in parallel, 1 solves them one after another in
+            this process (see parallel_runs.run_points)
+        solver_threads : Integer, optional
+            Number of solver threads of every worker
+        warm_start : Boolean, optional
+            Start every grid point from the flowsheet of the nearest solved point
+        """
 
         super().__init__(solver_name, solver_interface, solver_options)
 
         self.cross_parameters = two_way_data
         self.superstructure = superstructure
+        self.solver_options = solver_options
+        self.workers = workers
+        self.solver_threads = solver_threads
+        self.warm_start = warm_start
 
+        # only (mutable) parameters change between the runs, so the model stays in the solver
         self.single_optimizer = SingleOptimizer(
-            solver_name, solver_interface, solver_options
+            solver_name, solver_interface, solver_options=worker_solver_options(solver_options, solver_threads),
+            persistent=True
         )
 
     def run_optimization(self,
@@ -707,6 +1003,7 @@ class TwoWaySensitivityOptimizer(SingleOptimizer):
                          ):
 
         timer1 = time_printer(programm_step="Two-way sensitivity optimimization")
+        sensitiveParameters = self.cross_parameters
         self.cross_parameters = self.calculate_sensitive_parameters(self.cross_parameters)
 
         model_output = MultiModelOutput(optimization_mode="cross-parameter sensitivity")
@@ -733,70 +1030,36 @@ class TwoWaySensitivityOptimizer(SingleOptimizer):
         metadata1 = list(dic_1.values())[0][1]
         metadata2 = list(dic_2.values())[0][1]
 
-        if parralellComputing:
-            # todo make parallel computing work
-            # Using ProcessPoolExecutor to solve models in parallel
-            with ProcessPoolExecutor(max_workers=5) as executor:
-                futures = [executor.submit(self._solve_model_instance,
-                                           paramName1, paramName2,
-                                           paramVal1, paramVal2,
-                                           metadata1, metadata2,
-                                           model_instance, model_output)
-                           for paramVal1 in parmaValues1 for paramVal2 in paramValues2]
-
-                results = [future.result() for future in futures]
-            print(results)
-        # model_output.add_process((paramName1, paramVal1, paramName2, paramVal2), single_solved)
-
+        # every grid point changes both parameters of the base case, the rows of the grid are solved one after
+        # another so neighbouring points end up on the same worker
+        points = [((paramName1, paramVal1, paramName2, paramVal2),
+                   [(paramName1, paramVal1, metadata1), (paramName2, paramVal2, metadata2)])
+                  for paramVal1 in parmaValues1 for paramVal2 in paramValues2]
+
+        # parralellComputing uses all CPUs if no number of workers is given
+        workers = None if parralellComputing and self.workers == 1 else self.workers
+
+        if workers is None or workers > 1:
+            # the workers build their own model instance from the superstructure
+            solverOptions = worker_solver_options(self.solver_options,
+                                                  default_solver_threads(workers, self.solver_threads))
+            results = run_points(points, parameter_point_solver,
+                                 (self.superstructure, sensitiveParameters, self.solver_name,
+                                  self.solver_interface, solverOptions, self.warm_start),
+                                 workers=workers)
         else:
-            for i in parmaValues1:
-                for j in paramValues2:
-                    self._solve_model_instance(paramName1, paramName2,
-                                                 i, j,
-                                                 metadata1, metadata2,
-                                                 model_instance, model_output)
-
+            pointSolver = ParameterPointSolver(model_instance, self.single_optimizer, self.superstructure,
+                                               self.warm_start)
+            results = {key: pointSolver.solve_point(changes) for key, changes in points}
+            pointSolver.reset()
 
+        for key, _ in points:
+            model_output.add_process(key, results[key])
 
         timer = time_printer(timer1, "Ending Two-way sensitivity Analysis")
         model_output.fill_information(timer)
         return model_output
 
-    def _solve_model_instance(self, paramName1, paramName2,
-                              paramVal1, paramVal2,
-                              metadata1, metadata2,
-                              model_instance, model_output):
-        """
-        This function is used to solve the model instance for a given parameter set
-        :param param1:
-        :param param2:
-        :param model_instance:
-        :param superstructure:
-        :return:
-
-        """
-        superstructure = self.superstructure
-
-        model_instance = change_parameter(Instance=model_instance,
-                                          parameter=paramName1,
-                                          value=paramVal1, metadata=metadata1,
-                                          superstructure=superstructure,
-                                          printTimer=False)
-
-        model_instance = change_parameter(Instance=model_instance,
-                                          parameter=paramName2,
-                                          value=paramVal2, metadata=metadata2,
-                                          superstructure=superstructure,
-                                          printTimer=False)
-
-        single_solved = self.single_optimizer.run_optimization(model_instance,
-                                                               tee=False,
-                                                               keepfiles=True,
-                                                               printTimer=False)
-        single_solved._tidy_data()
-        model_output.add_process((paramName1, paramVal1, paramName2, paramVal2), single_solved)
-        return (paramName1, paramVal1, paramName2, paramVal2), single_solved
-
 class StochasticRecourseOptimizer(SingleOptimizer):
     # NOT USED ANYMORE IN THE NEW VERSION, SEE StochasticOptimizer_mpi_sppy!!
     # keep it for now, just in case I need code snippets from it
@@ -1333,8 +1596,11 @@ class HereAndNowOptimizer(SingleOptimizer):
         solver_options=None,
         scenarioDataFiles=None,
         *args,
+        warm_start=True,
     ):
         super().__init__(solver_name, solver_interface, solver_options)
+        # start every scenario from the flowsheet of the nearest solved scenario
+        self.warm_start = warm_start
 
         self.inputObject = inputObject  # superstructure object
         self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options)
@@ -1381,31 +1647,40 @@ class HereAndNowOptimizer(SingleOptimizer):
         logging.getLogger('pyomo.core').setLevel(logging.ERROR)
         total_scenarios = len(scenarioDataFiles)
 
-        for index, (scenario, dataFile) in enumerate(scenarioDataFiles.items()):
-            # create a model instance for the scenario
-            # initialize the model
-            model = SuperstructureModel(self.inputObject, fixedDesign=True)
-
-            # create the model equations
-            model.create_ModelEquations()
+        # the model is declared once, for each scenario only the (mutable) uncertain parameters are updated
+        model = SuperstructureModel(self.inputObject, fixedDesign=True)
+        model.create_ModelEquations()
+        modelInstance = None
+        currentDataFile = None
+        solutionPool = SolutionPool()
+        baseDataFile = getattr(scenarioDataFiles, 'baseDataFile', None)
 
+        for index, (scenario, dataFile) in enumerate(scenarioDataFiles.items()):
             # you need to modify the data file to include the design space parameters Y_Dist and Y
             dataFile[None]['Y'] = self.designSpaceFile['Y']
             dataFile[None]['Y_DIST'] = self.designSpaceFile['Y_DIST']
 
-            # populate the model instance
-            modelInstance = model.populateModel(dataFile)
+            # update the model instance for the scenario, or populate a new one if the data can not be changed in place
+            if modelInstance is None or not update_mutable_parameters(modelInstance, dataFile, currentDataFile):
+                modelInstance = model.populateModel(dataFile)
+            currentDataFile = dataFile
+
+            coordinates = scenario_coordinates(dataFile, baseDataFile) if self.warm_start else None
+            warmstart = solutionPool.nearest(coordinates) if self.warm_start else None
 
             # run the optimization problem for the scenario
             single_solved = self.single_optimizer.run_optimization(model_instance=modelInstance,
                                                                    tee=False,
                                                                    keepfiles=False,
                                                                    printTimer=False,
-                                                                   VSS_EVPI_mode=True)
+                                                                   VSS_EVPI_mode=True,
+                                                                   warmstart=warmstart)
 
             if single_solved == 'infeasible':
                 infeasibleScenarios.append(scenario)
             else:
+                if self.warm_start:
+                    solutionPool.add(coordinates, flowsheet_solution(modelInstance))
                 # tidy the data, i.e., delete variables and constraints that are 0
                 single_solved._tidy_data()
                 # add the results to the model output
@@ -1422,8 +1697,14 @@ class HereAndNowOptimizer(SingleOptimizer):
         # reactivate the warning if model is infeasible
         logging.getLogger('pyomo.core').setLevel(logging.WARNING)
 
-        # add the uncertainty matrix to the model output
-        model_output.uncertaintyMatrix = self.inputObject.uncertaintyMatrix
+        # add the uncertainty matrix and the scenario probabilities to the model output (a scenario stream makes them
+        # once all scenarios are solved)
+        if isinstance(scenarioDataFiles, ScenarioStream):
+            model_output.uncertaintyMatrix = scenarioDataFiles.uncertainty_matrix()
+            model_output.scenarioProbabilities = scenarioDataFiles.scenario_probabilities()
+        else:
+            model_output.uncertaintyMatrix = self.inputObject.uncertaintyMatrix
+            model_output.scenarioProbabilities = dict(self.inputObject.Odds['odds'])
 
         return model_output
 
@@ -1434,10 +1715,13 @@ class WaitAndSeeOptimizer(SingleOptimizer):
         solver_interface,
         inputObject,
         solver_options=None,
+        warm_start=True,
     ):
         super().__init__(solver_name, solver_interface, solver_options)
 
         self.inputObject = inputObject # superstructure object
+        # start every scenario from the flowsheet of the nearest solved scenario
+        self.warm_start = warm_start
         self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options)
 
     def run_optimization(self,
@@ -1473,27 +1757,36 @@ class WaitAndSeeOptimizer(SingleOptimizer):
         logging.getLogger('pyomo.core').setLevel(logging.ERROR)
         total_scenarios = len(scenarioDataFiles)
 
-        for index, (scenario, dataFile) in enumerate(scenarioDataFiles.items()):
-            # create a model instance for the scenario
-            # initialize the model
-            model = SuperstructureModel(self.inputObject)
+        # the model is declared once, for each scenario only the (mutable) uncertain parameters are updated
+        model = SuperstructureModel(self.inputObject)
+        model.create_ModelEquations()
+        modelInstance = None
+        currentDataFile = None
+        solutionPool = SolutionPool()
+        baseDataFile = getattr(scenarioDataFiles, 'baseDataFile', None)
 
-            # create the model equations
-            model.create_ModelEquations()
+        for index, (scenario, dataFile) in enumerate(scenarioDataFiles.items()):
+            # update the model instance for the scenario, or populate a new one if the data can not be changed in place
+            if modelInstance is None or not update_mutable_parameters(modelInstance, dataFile, currentDataFile):
+                modelInstance = model.populateModel(dataFile)
+            currentDataFile = dataFile
 
-            # populate the model instance
-            modelInstance = model.populateModel(dataFile)
+            coordinates = scenario_coordinates(dataFile, baseDataFile) if self.warm_start else None
+            warmstart = solutionPool.nearest(coordinates) if self.warm_start else None
 
             # run the optimization problem for the scenario
             single_solved = self.single_optimizer.run_optimization(model_instance=modelInstance,
                                                                    tee=False,
                                                                    keepfiles=False,
                                                                    printTimer=False,
-                                                                   VSS_EVPI_mode=True)
+                                                                   VSS_EVPI_mode=True,
+                                                                   warmstart=warmstart)
 
             if single_solved == 'infeasible':
                 infeasibleScenarios.append(scenario)
             else:
+                if self.warm_start:
+                    solutionPool.add(coordinates, flowsheet_solution(modelInstance))
                 # tidy the data, i.e., delete variables and constraints that are 0
                 single_solved._tidy_data()
                 # add the results to the model output
@@ -1511,8 +1804,14 @@ class WaitAndSeeOptimizer(SingleOptimizer):
         # reactivate the warning if model is infeasible
         logging.getLogger('pyomo.core').setLevel(logging.WARNING)
 
-        # add the uncertainty matrix to the model output
-        model_output.uncertaintyMatrix = self.inputObject.uncertaintyMatrix
+        # add the uncertainty matrix and the scenario probabilities to the model output (a scenario stream makes them
+        # once all scenarios are solved)
+        if isinstance(scenarioDataFiles, ScenarioStream):
+            model_output.uncertaintyMatrix = scenarioDataFiles.uncertainty_matrix()
+            model_output.scenarioProbabilities = scenarioDataFiles.scenario_probabilities()
+        else:
+            model_output.uncertaintyMatrix = self.inputObject.uncertaintyMatrix
+            model_output.scenarioProbabilities = dict(self.inputObject.Odds['odds'])
 
         return model_output
 
@@ -1544,6 +1843,9 @@ class StochasticRecourseOptimizer_mpi_sppy(SingleOptimizer):
         else:
             self.options = mpiOptions
 
+        # declared SuperstructureModel shared by all scenarios of this process, see scenario_creator
+        self._scenarioModel = None
+
 
     def run_optimization(self,*args, **kwargs):
 
@@ -1582,11 +1884,11 @@ class StochasticRecourseOptimizer_mpi_sppy(SingleOptimizer):
         inputObject = self.inputObject
         scenarioDataFile = inputObject.scenarioDataFiles
 
-        # initialize the model
-        model = SuperstructureModel(inputObject)
-
-        # create the model equations
-        model.create_ModelEquations()
+        # the model is declared once per process, every scenario only populates its own instance from it
+        if self._scenarioModel is None:
+            self._scenarioModel = SuperstructureModel(inputObject)
+            self._scenarioModel.create_ModelEquations()
+        model = self._scenarioModel
 
         # get the correct data file for the scenarioDataFile
         dataFile = scenarioDataFile[scenarioName]
@@ -1639,8 +1941,13 @@ class StochasticRecourseOptimizer_mpi_sppy(SingleOptimizer):
         # takes long to load these modules, so only load them if needed
         from mpisppy.opt.ph import PH
 
+        if isinstance(inputObject.scenarioDataFiles, ScenarioStream):
+            raise Exception("mpi-sppy needs the data files of all scenarios by name, a scenario stream can only be used "
+                            "for the wait and see and here and now optimizers (use set_uncertainty_data_mpisspy)")
+
         allScenarioNames = list(inputObject.scenarioDataFiles.keys())
         self.inputObject = inputObject
+        self._scenarioModel = None
 
         ph = PH(options,
                 allScenarioNames,
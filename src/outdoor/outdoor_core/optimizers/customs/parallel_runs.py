@@ -0,0 +1,207 @@
+"""
+Parallel execution of the multi-run optimizers (e.g., sensitivity runs).
+
+Every worker process makes its own point solver once, with a factory function that builds the model instance from the
+superstructure (the Pyomo model objects are not sent to the workers), and keeps the instance loaded in a persistent
+solver. The workers receive lists of points, solve them and send back the tidied ModelOutput of every point. The
+results are returned in the order of the points, so the MultiModelOutput is the same as the one of a serial run.
+
+The workers are started with the 'spawn' method, scripts that use them need an if __name__ == '__main__': guard.
+"""
+
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pyomo.environ import Param
+
+from .change_params import change_parameter, prepare_mutable_parameters
+from ..main_optimizer import SingleOptimizer
+from ...model.optimization_model import SuperstructureModel
+from ...utils.warm_start import SolutionPool, flowsheet_solution
+
+# point solver of a worker process, set by _init_worker
+_WORKER = {}
+
+
+class ParameterPointSolver:
+    """
+    Class Description
+    -----------------
+    Solves one model instance for a sequence of parameter points. Before the changes of a point are applied, the
+    mutable parameters are reset to the values the instance had when it was handed over, so every point is
+    solved from the same base case, independent of the points solved before it (and of the worker it runs on).
+    Only the reset and changed parameter values are passed on to the persistent solver.
+
+    With warmStart every point is started from the flowsheet of the nearest point this solver has solved.
+    """
+
+    def __init__(self, model_instance, single_optimizer, superstructure, warmStart=True):
+        self.model_instance = model_instance
+        self.single_optimizer = single_optimizer
+        self.superstructure = superstructure
+        self.solutionPool = SolutionPool() if warmStart else None
+        self.baseValues = {param.name: param.extract_values()
+                           for param in model_instance.component_objects(Param, active=True) if param.mutable}
+        self.changedParameters = set()
+
+    def solve_point(self, changes):
+        """
+        Parameters
+        ----------
+        changes : List
+            (parameter name, value, metadata) of every parameter which is changed in this point
+
+        Returns
+        -------
+        single_solved : ModelOutput
+            tidied results of the point
+
+        """
+        self.reset()
+
+        for parameterName, value, metadata in changes:
+            change_parameter(Instance=self.model_instance, parameter=parameterName, value=value, metadata=metadata,
+                             superstructure=self.superstructure, printTimer=False)
+
+        # remember which parameters were changed, they are reset before the next point
+        self.changedParameters = {name for name, values in self.baseValues.items()
+                                  if self.model_instance.component(name).extract_values() != values}
+
+        coordinates = {parameterName: value for parameterName, value, _ in changes}
+        warmstart = self.solutionPool.nearest(coordinates) if self.solutionPool is not None else None
+
+        single_solved = self.single_optimizer.run_optimization(self.model_instance, tee=False, keepfiles=False,
+                                                               printTimer=False, warmstart=warmstart)
+        if self.solutionPool is not None:
+            self.solutionPool.add(coordinates, flowsheet_solution(self.model_instance))
+        single_solved._tidy_data()
+        return single_solved
+
+    def reset(self):
+        for name in self.changedParameters:
+            self.model_instance.component(name).store_values(self.baseValues[name])
+        self.changedParameters = set()
+
+
+def parameter_point_solver(superstructure, mutableParameters, solverName, solverInterface, solverOptions=None,
+                           warmStart=True):
+    """
+    Factory of the ParameterPointSolver of a worker: populates the model instance of the superstructure with the
+    mutable parameters of the sensitivity runs (as SuperstructureProblem.setup_model_instance)
+    """
+    model = SuperstructureModel(superstructure)
+    model.create_ModelEquations()
+    prepare_mutable_parameters(model, mutableParameters)
+    model_instance = model.populateModel(superstructure.create_DataFile())
+
+    single_optimizer = SingleOptimizer(solverName, solverInterface, solver_options=solverOptions, persistent=True)
+    return ParameterPointSolver(model_instance, single_optimizer, superstructure, warmStart)
+
+
+def worker_solver_options(solverOptions, solverThreads):
+    # every worker gets its own copy of the options (set_solver_options adds to them) with its share of the threads
+    options = dict(solverOptions) if solverOptions else {}
+    if solverThreads is not None:
+        options['Threads'] = solverThreads
+    return options or None
+
+
+def run_points(points, pointSolverFactory, factoryArgs, workers=None, chunkSize=None):
+    """
+    Parameters
+    ----------
+    points : List
+        (key, point) of every point, the point is passed on to the solve_point method of the point solver
+
+    pointSolverFactory : Function
+        module level function which makes the point solver of a worker (e.g., parameter_point_solver)
+
+    factoryArgs : Tuple
+        arguments of pointSolverFactory (e.g., the superstructure and the solver settings)
+
+    workers : Integer
+        number of worker processes, default is the number of CPUs
+
+    chunkSize : Integer
+        number of points sent to a worker at once, default splits the points in about 4 chunks per worker.
+        Neighbouring points are solved by the same worker.
+
+    Returns
+    -------
+    results : Dictionary
+        {key: result of solve_point} in the order of the points
+
+    """
+    with PointWorkers(pointSolverFactory, factoryArgs, workers, maxWorkers=len(points)) as pointWorkers:
+        return pointWorkers.run(points, chunkSize)
+
+
+class PointWorkers:
+    """
+    Class Description
+    -----------------
+    Worker processes which keep their point solver (and model instance) between several calls of run, e.g. for the
+    rounds of an adaptive method which only knows its next points once the previous ones are solved. Used as context
+    manager, the workers are stopped at the end of the with block.
+    """
+
+    def __init__(self, pointSolverFactory, factoryArgs, workers=None, maxWorkers=None):
+        """
+        :param pointSolverFactory: module level function which makes the point solver of a worker
+        :param factoryArgs: arguments of pointSolverFactory
+        :param workers: number of worker processes, default is the number of CPUs
+        :param maxWorkers: optional upper limit of the number of workers (e.g., the number of points)
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 1:
+            raise ValueError('The number of workers has to be at least 1, not {}'.format(workers))
+
+        self.workers = min(workers, max(maxWorkers, 1)) if maxWorkers is not None else workers
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_init_worker,
+                                            initargs=(pointSolverFactory, factoryArgs))
+
+    def run(self, points, chunkSize=None):
+        """
+        :param points: List of (key, point), see run_points
+        :param chunkSize: number of points sent to a worker at once, see run_points
+        :return: Dictionary {key: result of solve_point} in the order of the points
+        """
+        if chunkSize is None:
+            chunkSize = max(math.ceil(len(points) / (4 * self.workers)), 1)
+
+        chunks = [points[start:start + chunkSize] for start in range(0, len(points), chunkSize)]
+
+        results = {}
+        for chunkResults in self.executor.map(_solve_points, chunks):
+            results.update(chunkResults)
+
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.executor.shutdown()
+
+
+def default_solver_threads(workers, solverThreads=None):
+    """
+    :return: solverThreads or the number of CPUs divided by the number of workers (int)
+    """
+    if solverThreads is not None:
+        return solverThreads
+    return max((os.cpu_count() or 1) // max(workers or 1, 1), 1)
+
+
+def _init_worker(pointSolverFactory, factoryArgs):
+    _WORKER['solver'] = pointSolverFactory(*factoryArgs)
+
+
+def _solve_points(points):
+    pointSolver = _WORKER['solver']
+    return [(key, pointSolver.solve_point(point)) for key, point in points]
@@ -16,10 +16,24 @@ from numpy import linspace
 
 from ..output_classes.model_output import ModelOutput
 from ..output_classes.stochastic_model_output import StochasticModelOutput
+from ..utils.impact_categories import calculate_lazy_impacts
 from ..utils.timer import time_printer
+from ..utils.warm_start import warm_start_values
 #from pyomo.util.infeasible import log_infeasible_constraints
 #import logging
 
+# solvers with a persistent (APPSI) interface in Pyomo
+PERSISTENT_SOLVER_LIBRARY = {"gurobi": "appsi_gurobi",
+                             "cbc": "appsi_cbc",
+                             "highs": "appsi_highs"}
+
+# Gurobi option names used in OUTDOOR and their HiGHS counterpart
+HIGHS_OPTION_NAMES = {"IntFeasTol": "mip_feasibility_tolerance",
+                      "MIPGap": "mip_rel_gap",
+                      "TimeLimit": "time_limit",
+                      "Threads": "threads"}
+
+
 class SingleOptimizer:
     """
     Class Description
@@ -32,13 +46,17 @@ class SingleOptimizer:
     especially for special runs in Superstructure Opimitzation (e.g. Sensitivity etc.)
     """
     def __init__(self, solver_name, solver_interface, optimization_mode= None, solver_path=None,
-                 solver_options=None):
+                 solver_options=None, persistent=False):
         """
         Parameters
         ----------
         solver_name : String
         solver_interface : String
         solver_options : Dict, optional
+        persistent : Boolean, optional
+            If True, the solver is created through Pyomo's persistent (APPSI) interface if one is available for the
+            solver. The model instance then stays loaded in the solver between runs and only the changes
+            (parameters, bounds, constraints, objective) are passed on. Used by the multi-run optimizers.
 
         Description
         -------
@@ -51,7 +69,7 @@ class SingleOptimizer:
         # logging.basicConfig(level=logging.INFO)
         # logging.getLogger('pyomo.core').setLevel(logging.INFO)
 
-        SOLVER_LIBRARY = {"gurobi", "cbc", "scip", "glpk", 'gams'}
+        SOLVER_LIBRARY = {"gurobi", "cbc", "scip", "glpk", 'gams', "highs"}
         INTERFACE_LIBRARY = {"local", "executable"}
 
         # setup name
@@ -72,7 +90,17 @@ class SingleOptimizer:
             self.solver_io = "python"
 
         # create solver
-        if solver_interface == "local":
+        # HiGHS has no file based interface in Pyomo, so it is always used through APPSI
+        self.persistent = False
+        # model instance loaded in the persistent solver
+        self._solverInstance = None
+        if solver_name == "highs" or (persistent and solver_interface == "local"):
+            self.solver = self.create_persistent_solver(self.solver_name)
+            self.persistent = self.solver is not None
+
+        if self.persistent:
+            pass
+        elif solver_interface == "local":
             if solver_name == "gurobi":
                 self.solver = pyo.SolverFactory(
                     self.solver_name, solver_io=self.solver_io
@@ -96,13 +124,17 @@ class SingleOptimizer:
                          printTimer=True,
                          VSS_EVPI_mode=False,
                          stochastic_optimisation=False,
-                         runFeasibilityAnalysis=False):
+                         runFeasibilityAnalysis=False,
+                         warmstart=None):
 
 
         """
         Parameters
         ----------
         model_instance : PYOMO Concrete Model
+        warmstart : ModelOutput, Dictionary or String, optional
+            MIP start of the run: the ModelOutput (or its _data) of a previous run or the path of a saved
+            ModelOutput (pickle file), see set_warm_start
 
         Returns
         -------
@@ -118,8 +150,20 @@ class SingleOptimizer:
 
         timer = time_printer(programm_step='Superstructure optimization run', printTimer=printTimer)
 
+        useWarmstart = warmstart is not None and self.set_warm_start(model_instance, warmstart)
+
         # Solve the model
-        results = self.solver.solve(model_instance, keepfiles=keepfiles, tee=tee)
+        if self.persistent:
+            # the persistent interface only passes on what changed since the last solve, the solution is loaded
+            # once the termination condition is checked (no files are written, so keepfiles is ignored). HiGHS takes
+            # the MIP start from the variable values after the update (warmstart), Gurobi from the Start attribute
+            results = self.solver.solve(model_instance, tee=tee, load_solutions=False, warmstart=useWarmstart)
+            self._solverInstance = model_instance
+        elif useWarmstart:
+            results = self.solver.solve(model_instance, keepfiles=keepfiles, tee=tee, warmstart=True,
+                                        load_solutions=False)
+        else:
+            results = self.solver.solve(model_instance, keepfiles=keepfiles, tee=tee, load_solutions=False)
 
 
         # Check if the model is infeasible
@@ -170,12 +214,25 @@ class SingleOptimizer:
             else:
                 print("The solver terminated with a different condition.: ", results.solver.termination_condition)
 
+        # runs without a solution (e.g., a time limit before the first feasible point) leave the variable values
+        # of the model instance as they are
+        solutionLoaded = len(results.solution) > 0
+        if solutionLoaded:
+            model_instance.solutions.load_from(results)
+        elif VSS_EVPI_mode:
+            # there is no solution to evaluate, the run is treated like an infeasible one
+            return 'infeasible'
+
+        # impact categories which are not part of the MILP are calculated from the solution
+        if solutionLoaded and model_instance.component('IMPACT_CATEGORIES_MILP') is not None:
+            calculate_lazy_impacts(model_instance)
+
         gap = (
             (results["Problem"][0]["Upper bound"] - results["Problem"][0]["Lower bound"])
             / (results["Problem"][0]["Upper bound"] + 1e-9)) * 100
 
-        if printTimer:
-            timer = time_printer(timer, 'Single optimization run', printTimer=printTimer)
+        # the run time is also needed without printing (e.g., solve times of the multi-run optimizers)
+        timer = time_printer(timer, 'Single optimization run', printTimer=printTimer)
 
         if stochastic_optimisation: # if the run is a stochastic run we need to use the stochastic model output class
             model_output = StochasticModelOutput(model_instance=model_instance, # the model instance now contains the optimised values
@@ -218,6 +275,10 @@ class SingleOptimizer:
         else:
             options.update({'IntFeasTol': 1e-8})
 
+        # HiGHS uses its own option names, translate the (Gurobi) names used throughout OUTDOOR
+        if self.solver_name == "highs":
+            options = {HIGHS_OPTION_NAMES.get(i, i): j for i, j in options.items()}
+
         if options is not None:
             for i, j in options.items():
                 solver.options[i] = j
@@ -225,6 +286,88 @@ class SingleOptimizer:
             pass
         return solver
 
+    def set_warm_start(self, model_instance, warmstart):
+        """
+        Parameters
+        ----------
+        model_instance : PYOMO Concrete Model
+        warmstart : ModelOutput, Dictionary or String
+            ModelOutput of a previous run, its _data (or a utils.warm_start.flowsheet_solution) or the path of a
+            ModelOutput saved as pickle file (ModelOutput.save_file / save_with_pickel)
+
+        Returns
+        -------
+        started : Boolean
+            False if the solver takes no MIP start or the solution has no values for the model instance
+
+        Description
+        -----------
+        Sets the flowsheet (Y and Y_DIST) of the solution as MIP start of the next run, the solver completes the
+        other variables. The persistent Gurobi interface gets the start as Start attribute of the variables, the
+        other solvers take the values of the variables of the model instance (solve with warmstart=True), the values
+        of the other variables are cleared.
+
+        """
+        if isinstance(warmstart, str):
+            warmstart = ModelOutput.load_from_pickle(warmstart)
+        solution = warmstart._data if isinstance(warmstart, ModelOutput) else warmstart
+
+        startValues = warm_start_values(model_instance, solution)
+        if not startValues:
+            return False
+
+        if self.persistent and self.solver_name == "gurobi":
+            # the Start attribute is set on the variables of the solver, so the model instance has to be loaded
+            if self._solverInstance is not model_instance:
+                self.solver.set_instance(model_instance)
+                self._solverInstance = model_instance
+            for var, val in startValues:
+                self.solver.set_var_attr(var, 'Start', val)
+            return True
+        elif self.persistent and self.solver_name != "highs":
+            # the other persistent interfaces take no MIP start
+            return False
+
+        if not self.solver.warm_start_capable():
+            return False
+        # the solver takes the values of all variables as start, so the values of the last run are cleared and
+        # only the flowsheet of the solution is started
+        startVars = {id(var) for var, _ in startValues}
+        for var in model_instance.component_data_objects(pyo.Var):
+            if not var.fixed and id(var) not in startVars:
+                var.set_value(None, skip_validation=True)
+        for var, val in startValues:
+            var.set_value(val, skip_validation=True)
+        return True
+
+    def create_persistent_solver(self, solver_name):
+        """
+        Parameters
+        ----------
+        solver_name : String
+
+        Returns
+        -------
+        solver : Pyomo APPSI solver object or None
+
+        Description
+        -----------
+        Creates the persistent (APPSI) version of the solver. If the solver has no
+        persistent interface or it is not installed, None is returned and the
+        default file based interface is used instead.
+
+        """
+        if solver_name not in PERSISTENT_SOLVER_LIBRARY:
+            return None
+
+        solver = pyo.SolverFactory(PERSISTENT_SOLVER_LIBRARY[solver_name])
+        if not solver.available(exception_flag=False):
+            print("\033[93m" + "The persistent interface of {} is not available, "
+                               "the default interface is used".format(solver_name) + "\033[0m")
+            return None
+
+        return solver
+
     # some class functions used for sensitivity analysis type optimization
     # should move them all here honestly TODO Move functions of file change_params here
 
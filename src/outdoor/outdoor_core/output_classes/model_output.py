@@ -381,7 +381,7 @@ class ModelOutput:
 
         n = len(model_data['HI'])
         for hi in model_data['HI']:
-            Q_cool_Heat = sum(model_data['ENERGY_DEMAND_HEAT'][u,hi] for u in model_data['U'])
+            Q_cool_Heat = sum(model_data['ENERGY_DEMAND_HEAT'].get((u, hi), 0) for u in model_data['U'])
             Q_heat_produced_used = model_data['ENERGY_DEMAND_HEAT_PROD_USE']
             Q_residual = model_data['ENERGY_DEMAND_HEAT_RESI'][hi]
             Q_exchange = model_data['ENERGY_EXCHANGE'][hi]
@@ -401,7 +401,7 @@ class ModelOutput:
                 heatBalanceDict[hi].update({'Residual hi -1': Q_residual_hi_1})
 
             # i know should be revered but philip switch them and now it's a horrid feature
-            Q_Demand_heating = sum(model_data['ENERGY_DEMAND_COOL'][u,hi] for u in model_data['U'])
+            Q_Demand_heating = sum(model_data['ENERGY_DEMAND_COOL'].get((u, hi), 0) for u in model_data['U'])
             Q_deficit = model_data['ENERGY_DEMAND_HEAT_DEFI'][hi]
             coolingBalanceDict[hi] = {'HEATING demand': Q_Demand_heating,
                                       'Deficit': Q_deficit,
@@ -10,6 +10,7 @@ import datetime
 import os
 
 import numpy as np
+import pandas as pd
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 from tabulate import tabulate
@@ -77,6 +78,9 @@ class MultiModelOutput(ModelOutput):
         # pass on the multi-objective settings
         self.multi_data = None
 
+        # probabilities of the scenarios of the wait and see analysis {scenario: probability}
+        self.scenarioProbabilities = None
+
 
     def add_process(self, index, process_results):
         """
@@ -301,18 +305,10 @@ class MultiModelOutput(ModelOutput):
             # delete the rows that were not run in the parameterArray
             parameterArray = np.delete(parameterArray, indicesRows, axis=0)
 
-        # Standardize data using sklearn (so-called mean-centred sigma-scaling)
-        scaler = StandardScaler()
-        parametersStandardized = scaler.fit_transform(parameterArray)
-        resultsStandardized = scaler.fit_transform(results)
-
-        # Perform regression analysis
-        reg = LinearRegression()
-        reg.fit(parametersStandardized, resultsStandardized)
-        #reg.fit(parameterArray, results)
-
-        # Obtain SRCs
-        srcs = reg.coef_
+        # Standardized regression of the objective on the uncertain parameters, weighted by the probabilities of the
+        # scenarios (which differ after a scenario reduction)
+        srcs, RSquared = self._standardized_regression(parameterArray, results,
+                                                       self._scenario_weights(scenarioControl))
 
         srcDict = {}
         squareSumSRC = 0
@@ -325,11 +321,6 @@ class MultiModelOutput(ModelOutput):
             #print(f"SRC for parameter {parameterName}: {src}")
 
 
-        # Obtain R-squared value
-        RSquared = reg.score(parametersStandardized, resultsStandardized)
-
-
-
         print('')
         print('-----------------------------------')
         print('Sum of SRC squared: ', squareSumSRC)
@@ -342,6 +333,148 @@ class MultiModelOutput(ModelOutput):
             print(f"SCR, {key}: {value}")
 
 
+    def _scenario_weights(self, scenarioNames):
+        """
+        Parameters
+        ----------
+        scenarioNames : List
+            Names of the solved scenarios
+
+        Returns
+        -------
+        weights : Array
+            Probabilities of the scenarios, scaled to a sum of 1 (infeasible scenarios are left out). Equal weights
+            if the probabilities are not known (e.g., model outputs of older versions).
+
+        """
+        probabilities = getattr(self, 'scenarioProbabilities', None) or {}
+        if scenarioNames and all(sc in probabilities for sc in scenarioNames):
+            weights = np.array([probabilities[sc] for sc in scenarioNames], dtype=float)
+        else:
+            weights = np.ones(len(scenarioNames))
+        return weights / weights.sum()
+
+    def _standardized_regression(self, parameterArray, results, weights=None):
+        """
+        Parameters
+        ----------
+        parameterArray : Array
+            Values of the uncertain parameters (scenarios x parameters)
+        results : Array
+            Objective values of the scenarios (scenarios x 1)
+        weights : Array, optional
+            Probabilities of the scenarios, the mean, standard deviation and the regression are weighted with them
+
+        Returns
+        -------
+        srcs : Array
+            Standardized regression coefficients (1 x parameters)
+        RSquared : Float
+            R squared of the regression
+
+        """
+        # Standardize data using sklearn (so-called mean-centred sigma-scaling)
+        parametersStandardized = StandardScaler().fit(parameterArray, sample_weight=weights).transform(parameterArray)
+        resultsStandardized = StandardScaler().fit(results, sample_weight=weights).transform(results)
+
+        # Perform regression analysis
+        reg = LinearRegression()
+        reg.fit(parametersStandardized, resultsStandardized, sample_weight=weights)
+
+        # Obtain SRCs and the R-squared value
+        return reg.coef_, reg.score(parametersStandardized, resultsStandardized, sample_weight=weights)
+
+    def convergence_report(self, sampleSizes=None, printReport=True):
+        """
+        Parameters
+        ----------
+        sampleSizes : List, optional
+            Numbers of scenarios to evaluate, default are the powers of 2 (at least the number of parameters + 2)
+            and the number of solved scenarios
+        printReport : Boolean, optional
+            Print the report as table
+
+        Returns
+        -------
+        report : DataFrame
+            Per sample size: expected objective, its standard error, R squared of the regression, the SRC of every
+            uncertain parameter and the largest change of the SRCs to the previous sample size
+
+        Description
+        -----------
+        Shows how the expected objective and the SRCs of the wait and see analysis stabilise with the number of
+        scenarios, by evaluating the first n scenarios (in the order of the uncertainty matrix) for every sample
+        size n. The first 2^k scenarios of a Sobol sample are balanced, so powers of 2 are used by default. If the
+        values are stable well before the last sample size, fewer scenarios give the same accuracy.
+
+        The first n scenarios are only a smaller sample if all scenarios are equally likely, so scenarios with
+        different probabilities (e.g., after StochasticObject.reduce_scenarios) are not accepted.
+
+        """
+        if self._optimization_mode != "wait and see":
+            raise ValueError("The convergence report is only available for the 'wait and see' analysis.")
+
+        probabilities = list((getattr(self, 'scenarioProbabilities', None) or {}).values())
+        if probabilities and not np.allclose(probabilities, probabilities[0]):
+            raise ValueError("The convergence report needs equally likely scenarios of a sample, the scenarios have "
+                             "different probabilities (e.g., after a scenario reduction).")
+
+        uncertaintyMatrix = self.uncertaintyMatrix
+        parameterArray = np.array(uncertaintyMatrix)
+        scenarioNames = ['sc{}'.format(i + 1) for i in range(len(parameterArray))]
+
+        # objective values of the solved scenarios, in the order of the uncertainty matrix
+        rows, objectiveValues = [], []
+        for i, scenario in enumerate(scenarioNames):
+            if scenario not in self._results_data:
+                continue  # infeasible scenario
+            data = self._results_data[scenario]
+            data = data._data if hasattr(data, '_data') else data
+            rows.append(i)
+            objectiveValues.append(data[data['ObjectiveFunctionName']])
+
+        parameterArray = parameterArray[rows]
+        results = np.array(objectiveValues, dtype=float).reshape(-1, 1)
+        numberOfScenarios = len(results)
+        numberOfParameters = parameterArray.shape[1]
+
+        if sampleSizes is None:
+            sampleSizes = [2 ** k for k in range(1, int(np.log2(max(numberOfScenarios, 1))) + 1)
+                           if 2 ** k >= numberOfParameters + 2]
+            if numberOfScenarios not in sampleSizes:
+                sampleSizes.append(numberOfScenarios)
+        sampleSizes = [n for n in sampleSizes if 2 <= n <= numberOfScenarios]
+        if not sampleSizes:
+            raise ValueError("Not enough solved scenarios for a convergence report.")
+
+        report = []
+        previousSRC = None
+        for n in sampleSizes:
+            row = {'Scenarios': n,
+                   'Expected objective': results[:n].mean(),
+                   'Standard error': results[:n].std(ddof=1) / np.sqrt(n)}
+
+            srcs, RSquared = self._standardized_regression(parameterArray[:n], results[:n])
+            row['R squared'] = RSquared
+            for i, parameterName in enumerate(uncertaintyMatrix.columns):
+                row['SRC ' + str(parameterName)] = srcs[0, i]
+
+            row['Max SRC change'] = np.nan if previousSRC is None else np.max(np.abs(srcs[0] - previousSRC))
+            previousSRC = srcs[0]
+            report.append(row)
+
+        report = pd.DataFrame(report).set_index('Scenarios')
+        self.convergenceReport = report
+
+        if printReport:
+            print('')
+            print('-----------------------------------')
+            print('Convergence of the wait and see analysis')
+            print(tabulate(report, headers='keys', floatfmt='.4g'))
+            print('-----------------------------------\n')
+
+        return report
+
     def calculate_parameter_ranges(self, objectiveValue, listKeys, objectiveFunctionName='EBIT'):
         """
         Calculate the ranges of the parameters where the objective value is larger then the given value
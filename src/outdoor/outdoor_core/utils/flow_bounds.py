@@ -0,0 +1,194 @@
+import math
+from collections import deque
+
+
+def calculate_flow_bounds(DataFile, loadID=None, loadType=None, margin=1.01):
+    """
+
+    Parameters
+    ----------
+    DataFile : Dictionary
+        The model ready data file of the superstructure (Superstructure.create_DataFile())
+
+    loadID : String, optional
+        Number of the source unit that carries the substrate load (SuperstructureModel.loadID)
+
+    loadType : String, optional
+        'Substrate' or 'Product' (SuperstructureModel.loadType)
+
+    margin : Float, optional
+        Relative safety margin added to the bounds, so that solver tolerances never cut off
+        a feasible flow. Default is 1 %.
+
+
+    Description
+    ------------
+
+    Propagates the source bounds (ul or the substrate load) through the superstructure graph
+    to get an upper bound for the total mass flow through every unit. The flows entering a
+    unit are the source flows (FLOW_ADD, scaled by phi and the full load hours) and the flows
+    of the connected units. The flows leaving a unit are bounded by the flows entering it times
+    the largest mass gain of the reaction (yield factors xi, stoich. factors gamma * theta),
+    and a connection carries at most max(myu) of the leaving flow (a distributor at most all of it).
+
+    Units are visited in topological order. Units in a recycle loop, and all units downstream
+    of them, can not be bounded this way and get no bound.
+
+
+    Returns
+    -------
+    flowBounds : Dictionary
+        Upper bound of the mass flow into or out of each bounded unit (FLOW_IN, FLOW_OUT, FLOW_SUM)
+
+        Example: flowBounds = {ProcessUnit: Value}
+
+    alphaBounds : Dictionary
+        Big-M value of each bounded unit which is valid for the constraints using alpha[u]
+        (FLOW_ADD into u in MassBalance_3, FLOW of u in MassBalance_6/7/8 and FLOW_DIST
+        of u in MassBalance_15a-c)
+
+        Example:     Same as flowBounds.
+
+    """
+
+    data = DataFile[None]
+
+    units = data['U'][None]
+    sources = set(data['U_S'][None])
+    connections = data['U_CONNECTORS'][None]
+    distributorConnections = set(data['U_DIST_SUB'][None])
+    yieldReactors = set(data['U_YIELD_REACTOR'][None])
+    stoichReactors = set(data['U_STOICH_REACTOR'][None])
+    flh = data['flh']
+
+    # upper bounds of the source flows (MassBalance_13)
+    sourceBound = {}
+    for u_s in sources:
+        if u_s == loadID and loadType == 'Substrate':
+            sourceBound[u_s] = data['sourceOrProductLoad'][None] / data['H'][None]
+        else:
+            sourceBound[u_s] = data['ul'].get(u_s, 100000)
+
+    phiSum = {u_s: 0 for u_s in sources}
+    for (u_s, i), value in data['phi'].items():
+        phiSum[u_s] += value
+
+    # largest split factor of every connection (MassBalance_6/8), a distributor passes on at most all of its flow
+    splitFactor = {connection: 1.0 for connection in connections if connection in distributorConnections}
+    for (u, (uu, i)), value in data['myu'].items():
+        if (u, uu) not in distributorConnections:
+            splitFactor[u, uu] = max(splitFactor.get((u, uu), 0), value)
+
+    # sum of the decimal numbers of the distributors (MassBalance_15a-c and the distributor branch of 8)
+    decimalSum = {}
+    for (u, k), value in data.get('Decimal_numbers', {}).items():
+        decimalSum[u] = decimalSum.get(u, 0) + value
+
+    # largest increase of the total mass flow over the unit (MassBalance_5)
+    outputFactor = {u: 1.0 for u in units}
+    for (u, i), value in data.get('xi', {}).items():
+        if u in yieldReactors:
+            outputFactor[u] += value
+
+    theta = {}
+    for (u, (r, m)), value in data.get('theta', {}).items():
+        theta.setdefault((u, r), {})[m] = value
+
+    massGain = {}
+    for (u, (i, r)), value in data.get('gamma', {}).items():
+        if u in stoichReactors:
+            for m, conversion in theta.get((u, r), {}).items():
+                massGain[u, m] = massGain.get((u, m), 0) + value * conversion
+
+    for (u, m), value in massGain.items():
+        outputFactor[u] = max(outputFactor[u], 1 + value)
+
+    # graph of the unit connections
+    upstream = {u: [] for u in units}
+    downstream = {u: [] for u in units}
+    for (u, uu) in connections:
+        downstream[u].append(uu)
+        upstream[uu].append(u)
+
+    inBound = {u: 0 for u in units}
+    for (u_s, u) in data['U_SU'][None]:
+        inBound[u] += sourceBound[u_s] * flh[u_s] / flh[u] * max(1, phiSum[u_s])
+
+    # Kahn's algorithm, units in (or behind) a recycle loop are never released
+    inDegree = {u: len(upstream[u]) for u in units}
+    queue = deque(u for u in units if inDegree[u] == 0)
+    outBound = {}
+    while queue:
+        u = queue.popleft()
+        if u in sources:
+            inBound[u] = max(inBound[u], sourceBound[u])
+
+        outBound[u] = inBound[u] * outputFactor[u]
+        for uu in downstream[u]:
+            inBound[uu] += outBound[u] * splitFactor.get((u, uu), 0) * flh[u] / flh[uu]
+            inDegree[uu] -= 1
+            if inDegree[uu] == 0:
+                queue.append(uu)
+
+    flowBounds = {}
+    alphaBounds = {}
+    for u, outFlow in outBound.items():
+        maxSplit = max([splitFactor.get((u, uu), 0) for uu in downstream[u]] + [1, decimalSum.get(u, 0)])
+        flowBounds[u] = margin * max(inBound[u], outFlow)
+        alphaBounds[u] = margin * max(inBound[u], outFlow * maxSplit)
+
+    return flowBounds, alphaBounds
+
+
+def calculate_parallel_units(DataFile, flowBounds, maxUnits=5):
+    """
+
+    Parameters
+    ----------
+    DataFile : Dictionary
+        The model ready data file of the superstructure (Superstructure.create_DataFile())
+
+    flowBounds : Dictionary
+        Upper bounds of the mass flow through the units (calculate_flow_bounds)
+
+    maxUnits : Integer, optional
+        Largest number of parallel units of the model (N_CAPEX). Default is 5.
+
+
+    Description
+    ------------
+
+    The reference flow of the CAPEX (REF_FLOW_CAPEX) of a unit sized by its mass flow (kappa_2_capex 0 or 1)
+    is at most the flow bound times the largest kappa_1_capex factor. The number of parallel units that can
+    be needed is this bound divided by the flow limit of a single unit (upperFlowLimitUnit), rounded up.
+    Units sized by an energy flow, or without a flow bound, are not listed and keep the default of the model.
+
+
+    Returns
+    -------
+    parallelUnits : Dictionary
+        Number of parallel units (1 to maxUnits) of each cost unit with a bounded reference flow
+
+        Example: parallelUnits = {ProcessUnit: Integer}
+
+    """
+
+    data = DataFile[None]
+
+    kappa1 = {}
+    for (u, i), value in data.get('kappa_1_capex', {}).items():
+        kappa1[u] = max(kappa1.get(u, 0), value)
+
+    parallelUnits = {}
+    for u in data['U_C'][None]:
+        if data.get('kappa_2_capex', {}).get(u) not in (0, 1) or u not in flowBounds:
+            continue
+
+        flowLimit = data.get('upperFlowLimitUnit', {}).get(u)
+        referenceBound = flowBounds[u] * kappa1.get(u, 0)
+        if not flowLimit or flowLimit <= 0:
+            continue
+
+        parallelUnits[u] = min(maxUnits, max(1, math.ceil(referenceBound / flowLimit)))
+
+    return parallelUnits
@@ -0,0 +1,116 @@
+import numpy as np
+
+
+def interval_fractions(Temperatures, TIN, TOUT, Heating=True):
+    """
+
+    Parameters
+    ----------
+    Temperatures : List
+        Temperature grid in ascending order, the grid temperature Temperatures[j] has the interval number
+        len(Temperatures) - 1 - j (Superstructure.HeatIntervals)
+
+    TIN : List
+        Inlet temperatures of the heat streams (all on the grid)
+
+    TOUT : List
+        Outlet temperatures of the heat streams (all on the grid)
+
+    Heating : Boolean
+        True for heating demands (TIN < TOUT), False for cooling demands (TIN > TOUT)
+
+    Returns
+    -------
+    fractions : List
+        {interval number: beta} for every stream, the share of the heat demand of the stream in every interval
+
+    Description
+    -------
+    Calculates the split of the heat demand of all streams over the heat intervals in one array operation.
+    The interval above the grid temperature s gets the share (next grid temperature - s) / DeltaT if the
+    stream covers the interval and 0 if not. Isothermal streams get the share 1 in the interval of their
+    temperature (the interval above it for heating, the one below it for cooling). The entries are the
+    ones of the former loop over all streams and intervals, including the entries of grid temperatures
+    below the streams.
+
+    """
+    s = np.asarray(Temperatures, dtype=float)
+    n = len(s)
+    tIn = np.asarray(TIN, dtype=float)[:, None]
+    tOut = np.asarray(TOUT, dtype=float)[:, None]
+
+    intervals = n - 1 - np.arange(n)
+    upper = np.append(s[1:], np.nan)
+
+    isothermal = (tOut == s) & (tOut == tIn)
+    if Heating:
+        below = tIn > s
+        covered = tOut >= upper
+        deltaT = tOut - tIn
+    else:
+        below = tOut > s
+        covered = tIn >= upper
+        deltaT = tIn - tOut
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = np.where(covered, (upper - s) / deltaT, 0.0)
+
+    # the highest grid temperature (interval 0) has no interval above it
+    inside = ~below & ~isothermal & (intervals != 0)
+    values = np.where(below, 0.0, shares)
+
+    written = below | inside
+    # isothermal heating uses the interval above the temperature, isothermal cooling the one below
+    isothermal &= ~below
+    isoIntervals = intervals + (0 if Heating else 1)
+
+    fractions = []
+    for row in range(len(tIn)):
+        columns = np.flatnonzero(written[row])
+        fraction = dict(zip(intervals[columns].tolist(), values[row, columns].tolist()))
+        fraction.update(dict.fromkeys(isoIntervals[isothermal[row]].tolist(), 1.0))
+        fractions.append(fraction)
+
+    return fractions
+
+
+def interval_utility_costs(Temperatures, UtilityTemperatures, UtilityCosts):
+    """
+
+    Parameters
+    ----------
+    Temperatures : List
+        Temperature grid in ascending order (see interval_fractions)
+
+    UtilityTemperatures : List
+        Temperatures of the heat utilities
+
+    UtilityCosts : List
+        Costs of the heat utilities (same order)
+
+    Returns
+    -------
+    delta_q : Dictionary
+        {interval number: cost}
+
+    Description
+    -------
+    Every interval below a grid temperature gets the costs of the utility which can supply the grid
+    temperature (utility temperature >= grid temperature). If several utilities can, the costs of the last
+    one in UtilityTemperatures are used, as in the former loop over all utilities and intervals.
+
+    """
+    s = np.asarray(Temperatures, dtype=float)
+    n = len(s)
+    if n < 2 or not len(UtilityTemperatures):
+        return {}
+
+    supplies = np.asarray(UtilityTemperatures, dtype=float)[:, None] >= s[1:]
+    # index of the last utility which supplies the grid temperature
+    last = supplies.shape[0] - 1 - np.argmax(supplies[::-1], axis=0)
+
+    delta_q = {}
+    for column in np.nonzero(supplies.any(axis=0))[0].tolist():
+        delta_q[n - 1 - column] = UtilityCosts[last[column]]
+
+    return delta_q
@@ -0,0 +1,102 @@
+import numpy as np
+from pyomo.environ import value
+
+# LCA constraints of SuperstructureModel.create_LCAEquations, the impact category is always the last index
+LCA_CONSTRAINTS = ('LCA_InFlow_Units', 'LCA_InFlow_Total_Per_Catagories', 'LCA_Utilities', 'LCA_Utilities_TOT',
+                   'LCA_Waste', 'LCA_Waste_TOT', 'LCA_Total_Impact')
+
+
+def activate_impact_category(ModelInstance, impCat):
+    """
+    Parameters
+    ----------
+    ModelInstance : PYOMO ConcreteModel
+        Populated model instance (SuperstructureModel.populateModel)
+
+    impCat : String
+        Impact category which is used as objective or bound of the model instance
+
+    Description
+    -------
+    Adds the LCA constraints of a lazy impact category to the model instance, so it can be used inside the
+    MILP. Nothing changes if the category is already part of IMPACT_CATEGORIES_MILP.
+
+    """
+    if ModelInstance.component('IMPACT_CATEGORIES_MILP') is None or impCat in ModelInstance.IMPACT_CATEGORIES_MILP:
+        return
+
+    ModelInstance.IMPACT_CATEGORIES_MILP.add(impCat)
+    for name in LCA_CONSTRAINTS:
+        constraint = ModelInstance.component(name)
+        for index in constraint.index_set():
+            category = index[-1] if isinstance(index, tuple) else index
+            if category == impCat:
+                constraint[index] = constraint.rule(ModelInstance, index)
+
+
+def calculate_lazy_impacts(ModelInstance):
+    """
+    Parameters
+    ----------
+    ModelInstance : PYOMO ConcreteModel
+        Solved model instance
+
+    Description
+    -------
+    Calculates the LCA variables of the impact categories which are not part of the MILP
+    (IMPACT_CATEGORIES without IMPACT_CATEGORIES_MILP) from the solved flows and energy demands. The impact
+    factors of the components, utilities and waste types are multiplied with the solved values as one matrix
+    product per impact source, the results are the same as the ones of the LCA constraints.
+
+    """
+    m = ModelInstance
+    lazyCategories = [impCat for impCat in m.IMPACT_CATEGORIES if impCat not in m.IMPACT_CATEGORIES_MILP]
+    if not lazyCategories:
+        return
+
+    units = list(m.U)
+    components = list(m.I)
+    utilities = list(m.UT)
+    wasteTypes = list(m.WASTE_MANAGEMENT_TYPES)
+    scale = value(m.sourceOrProductLoad) * 1000
+
+    flh = np.array([value(m.flh[u]) for u in units])
+    flowAdd = np.array([[value(m.FLOW_ADD_TOT[u, i]) for i in components] for u in units])
+    flowWaste = np.array([[value(m.FLOW_WASTE[u, i]) for i in components] for u in units])
+    wasteTypeIndex = [wasteTypes.index(m.waste_type_U[u].value) for u in units]
+
+    inflowFactors = np.array([[value(m.impact_inFlow_components[i, c]) for c in lazyCategories]
+                              for i in components])
+    utilityFactors = np.array([[value(m.util_impact_factors[ut, c]) for c in lazyCategories] for ut in utilities])
+    wasteFactors = np.array([[value(m.waste_impact_fac[w, c]) for c in lazyCategories] for w in wasteTypes])
+
+    # utility amounts as in the rule of LCA_Utilities
+    utilityAmounts = np.zeros(len(utilities))
+    for k, ut in enumerate(utilities):
+        if ut == "Electricity":
+            utilityAmounts[k] = value(m.ENERGY_DEMAND_TOT[ut] + m.ENERGY_DEMAND_HP_EL * m.H)
+        elif ut == "Chilling":
+            utilityAmounts[k] = value(m.ENERGY_DEMAND_TOT[ut])
+        elif ut == "Heat":
+            utilityAmounts[k] = value(m.H * (sum(m.ENERGY_DEMAND_HEAT_DEFI[hi] for hi in m.HI)
+                                             - m.ENERGY_DEMAND_HEAT_PROD_SELL))
+
+    inflowImpacts = (flowAdd * flh[:, None]) @ inflowFactors
+    wasteImpacts = (flowWaste.sum(axis=1) * flh)[:, None] * wasteFactors[wasteTypeIndex]
+    utilityImpacts = utilityAmounts[:, None] * utilityFactors
+
+    inflowTotal = inflowImpacts.sum(axis=0) / scale
+    utilityTotal = utilityImpacts.sum(axis=0) / scale
+    wasteTotal = wasteImpacts.sum(axis=0) / scale
+
+    for c, impCat in enumerate(lazyCategories):
+        for k, u in enumerate(units):
+            m.IMPACT_INPUTS_U_CAT[u, impCat].set_value(float(inflowImpacts[k, c]))
+            m.WASTE_U[u, impCat].set_value(float(wasteImpacts[k, c]))
+        for k, ut in enumerate(utilities):
+            m.IMPACT_UTILITIES[ut, impCat].set_value(float(utilityImpacts[k, c]))
+
+        m.IMPACT_INPUTS_PER_CAT[impCat].set_value(float(inflowTotal[c]))
+        m.IMPACT_UTILITIES_PER_CAT[impCat].set_value(float(utilityTotal[c]))
+        m.IMPACT_WASTE_PER_CAT[impCat].set_value(float(wasteTotal[c]))
+        m.IMPACT_TOT[impCat].set_value(float(inflowTotal[c] + utilityTotal[c] + wasteTotal[c]))
@@ -1,7 +1,7 @@
 import numpy as np
 
 
-def capex_calculator(UnitProcess, CECPI, Detail=None):
+def capex_calculator(UnitProcess, CECPI, Detail=None, maxError=0.01, intervals=None):
     """
 
     Parameters
@@ -13,11 +13,18 @@ def capex_calculator(UnitProcess, CECPI, Detail=None):
         The CECPI for the Process_Unit of the depicted year of the simulation
 
     Detail : String, optional
-        Can either be "average", "rough" or "fine", if nothing i selected "average"
+        Can either be "real", "average", "rough", "fine" or "adaptive", if nothing i selected "average"
         is the default.
         This String decides on how many linearization points for th piece-wise lin.
         of the Unit Capex are defined.
 
+    maxError : Float, optional
+        Largest relative linearization error of the "adaptive" mode
+
+    intervals : Integer, optional
+        Number of intervals of the "adaptive" mode, should be the number of intervals of the model (len(JI))
+        if the points of a single unit are recalculated.
+
 
     Description
     ------------
@@ -25,7 +32,8 @@ def capex_calculator(UnitProcess, CECPI, Detail=None):
     This function takes a Process Unit and the CECPI of the regarded year,
     and calculates a piece-wise linear function of the Equipment Costs of the Process
     based on the non-linear function saved in the process itself.
-    It returns the piece-wise lin. Function pieces.
+    It returns the piece-wise lin. Function pieces. See capex_calculator_vectorized,
+    which calculates all units in one call.
 
 
     Returns
@@ -43,133 +51,204 @@ def capex_calculator(UnitProcess, CECPI, Detail=None):
         Example:     Same as x_vals.
 
     """
-    # todo : add the possibility to use the "fine" lin. function of the process
-    # Detail = 'fine' # you need to get the sets right for this to work
-
-    ProcessNumber = UnitProcess.Number
-    M_REF = UnitProcess.CAPEX_factors['m_Ref'][ProcessNumber]
-    if M_REF == 0:
-        M_REF = 1 # to avoid division by zero for the variable m_dif
-
-    C_REF =  UnitProcess.CAPEX_factors['C_Ref'][ProcessNumber]
-    if C_REF == 0:
-        M_REF = 0.0000000000001 # make the cost really small if the reference cost is zero so it is legible
-
-    F_REF = UnitProcess.CAPEX_factors['f'][ProcessNumber]
-    CECPI_REF = UnitProcess.CAPEX_factors['CECPI_ref'][ProcessNumber]
-    CECPI = CECPI['CECPI']
-
-
-    x_vals = {'lin_CAPEX_x' : {}}
-    y_vals = {'lin_CAPEX_y': {}}
+    return capex_calculator_vectorized([UnitProcess], CECPI, Detail=Detail, maxError=maxError, intervals=intervals)
 
 
+def _fixed_flow_ratios(Detail):
+    """
+    Reference flows of the inner linearization points of the fixed modes, relative to m_Ref.
+    The first point (0) and the last point (100000) are added by capex_calculator_vectorized.
+    """
     if Detail == "real":
+        return np.array([1/5, 1/4, 1/3, 1/2, 3/4, 1, 1.5, 2, 3, 4, 5])
 
-        x_vals['lin_CAPEX_x'][ProcessNumber ,1] = 0
-
-        x_vals['lin_CAPEX_x'][ProcessNumber,2] = 1/5 * M_REF
-        x_vals['lin_CAPEX_x'][ProcessNumber,3] = 1/4 * M_REF
-        x_vals['lin_CAPEX_x'][ProcessNumber,4] = 1/3 * M_REF
-        x_vals['lin_CAPEX_x'][ProcessNumber,5] = 1/2 * M_REF
-        x_vals['lin_CAPEX_x'][ProcessNumber,6] = 3/4 * M_REF
-        x_vals['lin_CAPEX_x'][ProcessNumber,7] =  M_REF
-        x_vals['lin_CAPEX_x'][ProcessNumber,8] = 1.5 * M_REF
-        x_vals['lin_CAPEX_x'][ProcessNumber,9] = 2 * M_REF
-        x_vals['lin_CAPEX_x'][ProcessNumber,10] = 3 * M_REF
-        x_vals['lin_CAPEX_x'][ProcessNumber,11] = 4 * M_REF
-        x_vals['lin_CAPEX_x'][ProcessNumber,12] = 5 * M_REF
+    if Detail == "rough":
+        intervals = 9
+    elif Detail == "fine":
+        intervals = 300
+    else:
+        intervals = 19
 
-        x_vals['lin_CAPEX_x'][ProcessNumber,13] = 1e05
+    points = intervals + 1
+    real_points = (points - 3) / 2
+    j = np.arange(points - 2)
+    # fractions of m_Ref below the reference point, multiples of m_Ref from 2 upwards above it
+    with np.errstate(divide='ignore'):
+        ratios = np.where(j < real_points, 1 / (real_points + 1 - j), 2 + j - (np.floor(real_points) + 1))
+    ratios[j == real_points] = 1
+    return ratios
 
 
-        y_vals['lin_CAPEX_y'][ProcessNumber ,1] = 0
-        y_vals['lin_CAPEX_y'][ProcessNumber ,2] = C_REF * (1/5)**F_REF * (CECPI/CECPI_REF)
-        y_vals['lin_CAPEX_y'][ProcessNumber ,3] = C_REF * (1/4)**F_REF * (CECPI/CECPI_REF)
-        y_vals['lin_CAPEX_y'][ProcessNumber ,4] = C_REF * (1/3)**F_REF * (CECPI/CECPI_REF)
-        y_vals['lin_CAPEX_y'][ProcessNumber ,5] = C_REF * (1/2)**F_REF * (CECPI/CECPI_REF)
-        y_vals['lin_CAPEX_y'][ProcessNumber ,6] = C_REF * (3/4)**F_REF * (CECPI/CECPI_REF)
-        y_vals['lin_CAPEX_y'][ProcessNumber ,7] = C_REF
-        y_vals['lin_CAPEX_y'][ProcessNumber ,8] = C_REF * (1.5)**F_REF * (CECPI/CECPI_REF)
-        y_vals['lin_CAPEX_y'][ProcessNumber ,9] = C_REF * (2)**F_REF * (CECPI/CECPI_REF)
-        y_vals['lin_CAPEX_y'][ProcessNumber ,10] = C_REF * (3)**F_REF * (CECPI/CECPI_REF)
-        y_vals['lin_CAPEX_y'][ProcessNumber ,11] = C_REF * (4)**F_REF * (CECPI/CECPI_REF)
-        y_vals['lin_CAPEX_y'][ProcessNumber ,12] = C_REF * (5)**F_REF * (CECPI/CECPI_REF)
+def _secant_error(ratio, F, gridPoints=201):
+    """
+    Largest relative deviation of the secant of x**F between x = 1 and x = ratio. The deviation is scale invariant,
+    so it is the same for every interval [a, ratio * a].
+    """
+    t = np.linspace(0, 1, gridPoints)
+    x = 1 + (ratio[..., None] - 1) * t
+    secant = 1 + (ratio[..., None] ** F[..., None] - 1) * t
+    curve = x ** F[..., None]
+    return np.max(np.abs(curve - secant) / curve, axis=-1)
 
 
+def adaptive_interval_number(M_REF, F, maxError=0.01, minFlowRatio=0.2, maxFlow=100000, maxIntervals=300, C_REF=None):
+    """
 
-        f_dif  = C_REF * (5)**F_REF * (CECPI/CECPI_REF)
-        x_dif = 5 * M_REF
-        m_dif = C_REF * (CECPI/CECPI_REF) * F_REF * (x_dif)**(F_REF-1)*M_REF**(-F_REF)
-        y_dif = (1e05-x_dif) * m_dif + f_dif
-        y_vals['lin_CAPEX_y'][ProcessNumber ,13] = y_dif
+    Parameters
+    ----------
+    M_REF : Array
+        Reference flows (m_Ref) of the units
 
+    F : Array
+        Exponents (f) of the cost functions of the units
 
-        return (x_vals, y_vals)
+    maxError : Float, optional
+        Largest relative deviation of the piece-wise lin. costs from C_Ref * (x / m_Ref)**f
 
+    minFlowRatio : Float, optional
+        The error is met between minFlowRatio * m_Ref and maxFlow, below the first point the linearization
+        goes to zero costs at zero flow
 
-    else:
+    maxFlow : Float, optional
+        Last linearization point, the default big-M of the flows
 
+    maxIntervals : Integer, optional
+        Upper limit of the number of intervals
 
-        if Detail == "rough":
-            intervals = 9
-        elif Detail == "fine":
-            intervals = 300
-        else:
-            intervals = 19
+    C_REF : Array, optional
+        Reference costs (C_Ref) of the units
 
-        points = intervals +1
-        real_points = (points - 3) / 2
-        M= np.zeros([points,4])
-        j = 0
-        j2 = 2
 
-        M[0,0] = 1
-        M[0,1] = 0
-        M[0,2] = 0
-        M[0,3] = 0
+    Returns
+    -------
+    intervals : Integer
+        Number of intervals which are needed to meet maxError for all units with geometric spacing
+        between minFlowRatio * m_Ref and maxFlow, including the first interval from zero.
 
-        x_vals['lin_CAPEX_x'][ProcessNumber ,1] = 0
-        y_vals['lin_CAPEX_y'][ProcessNumber ,1] = 0
+    Units without costs (C_Ref = 0, their m_Ref is guarded to 1e-13) and units with costs proportional to the
+    flow (f = 1) are exact with any number of intervals, they are skipped.
 
+    """
+    M_REF = np.atleast_1d(np.asarray(M_REF, dtype=float))
+    F = np.atleast_1d(np.asarray(F, dtype=float))
+    needsIntervals = F != 1
+    if C_REF is not None:
+        needsIntervals &= np.atleast_1d(np.asarray(C_REF, dtype=float)) != 0
+    M_REF = M_REF[needsIntervals]
+    F = F[needsIntervals]
+    span = maxFlow / np.maximum(minFlowRatio * M_REF, 1e-12)
+
+    # bisection of the largest interval ratio which meets the error, all units at once
+    low = np.zeros_like(F)
+    high = np.log(np.maximum(span, 1 + 1e-9))
+    for _ in range(60):
+        mid = (low + high) / 2
+        tooCoarse = _secant_error(np.exp(mid), F) > maxError
+        high = np.where(tooCoarse, mid, high)
+        low = np.where(tooCoarse, low, mid)
+
+    with np.errstate(divide='ignore'):
+        geometricIntervals = np.ceil(np.log(np.maximum(span, 1)) / np.maximum(low, 1e-12) - 1e-9)
+
+    intervals = 1 + np.maximum(geometricIntervals, 1)
+    return int(min(maxIntervals, intervals.max(initial=2)))
+
+
+def capex_calculator_vectorized(UnitProcesses, CECPI, Detail=None, maxError=0.01, intervals=None):
+    """
 
+    Parameters
+    ----------
+    UnitProcesses : List
+        Objects of Type Process (the cost units U_C)
 
+    CECPI : Dictionary
+        The CECPI of the depicted year of the simulation ({'CECPI': Value})
 
-        M[points-1,0] = points
-        M[points-1,1] = 100000
-        M[points-1,2] = 100000
-        M[points-1,3] = C_REF * (M[intervals,2]/M_REF)**F_REF * (CECPI/CECPI_REF)
+    Detail : String, optional
+        "real", "rough", "average", "fine" or "adaptive", see capex_calculator. Everything else
+        is treated as "average".
 
+    maxError : Float, optional
+        Largest relative linearization error of the adaptive mode (default 1 %)
 
+    intervals : Integer, optional
+        Number of intervals of the adaptive mode. If None, it is computed with adaptive_interval_number,
+        pass the number of intervals of the model (len(JI)) to recompute the points of single units.
 
 
-        for i in range(1,points-1):
-            M[i,0] = i+1
-            if j < real_points:
-                M[i,1] = 1/(real_points + 1-j)
-                M[i,2] = 1/(real_points + 1-j) * M_REF
-            elif j == real_points:
-                M[i,1] = 1
-                M[i,2] = M_REF
-            else:
-                M[i,1] = 1 * j2
-                M[i,2] = 1 * j2 * M_REF
-                j2 += 1
-            j += 1
-            M[i,3] = C_REF * (M[i,2]/M_REF)**F_REF * (CECPI/CECPI_REF)
-            x_vals['lin_CAPEX_x'][ProcessNumber ,i+1] = M[i,2]
-            y_vals['lin_CAPEX_y'][ProcessNumber ,i+1] = M[i,3]
+    Description
+    ------------
 
+    Calculates the piece-wise linearization of the CAPEX of all units in one call. The reference
+    flows of the fixed modes are the same multiples of m_Ref for every unit, so the costs are
+    evaluated for all units and points as one array. The results are the same as calling
+    capex_calculator for every unit.
 
-        x_vals['lin_CAPEX_x'][ProcessNumber ,points] = 100000
-        y_vals['lin_CAPEX_y'][ProcessNumber ,points] = M[points-1,3]
+    The adaptive mode places the points geometrically between 0.2 * m_Ref and 100000. The relative
+    error of a secant of C_Ref * (x / m_Ref)**f only depends on the ratio of its end points, so equal
+    ratios give the same error on every interval and the smallest number of intervals. All units
+    share the same set of points in the model, so every unit uses the number of intervals of the unit
+    which needs the most (see adaptive_interval_number for the units which are skipped).
 
 
+    Returns
+    -------
+    x_vals : Dictionary
+        Reference flows of the linearization points of all units
 
-        return (x_vals, y_vals)
+        Example: x_vals = {'lin_CAPEX_x': {(ProcessUnit,points) : Value}}
 
+    y_vals : Dictionary
+        Equipment costs of the linearization points of all units
 
+        Example:     Same as x_vals.
 
+    """
+    numbers = [unit.Number for unit in UnitProcesses]
+    M_REF = np.array([unit.CAPEX_factors['m_Ref'][u] for unit, u in zip(UnitProcesses, numbers)], dtype=float)
+    C_REF = np.array([unit.CAPEX_factors['C_Ref'][u] for unit, u in zip(UnitProcesses, numbers)], dtype=float)
+    F_REF = np.array([unit.CAPEX_factors['f'][u] for unit, u in zip(UnitProcesses, numbers)], dtype=float)
+    CECPI_REF = np.array([unit.CAPEX_factors['CECPI_ref'][u] for unit, u in zip(UnitProcesses, numbers)],
+                         dtype=float)
+
+    # same guards as capex_calculator
+    M_REF = np.where(M_REF == 0, 1, M_REF)
+    M_REF = np.where(C_REF == 0, 0.0000000000001, M_REF)
+    indexRatio = CECPI['CECPI'] / CECPI_REF
+    maxFlow = 100000
+
+    if Detail == "adaptive":
+        if intervals is None:
+            intervals = adaptive_interval_number(M_REF, F_REF, maxError=maxError, C_REF=C_REF)
+        firstFlow = np.minimum(0.2 * M_REF, maxFlow)
+        steps = np.linspace(0, 1, intervals)
+        x = firstFlow[:, None] * (maxFlow / firstFlow[:, None]) ** steps[None, :]
+        y = C_REF[:, None] * (x / M_REF[:, None]) ** F_REF[:, None] * indexRatio[:, None]
 
+    else:
+        ratios = _fixed_flow_ratios(Detail)
+        x = np.concatenate([M_REF[:, None] * ratios[None, :], np.full((len(numbers), 1), maxFlow)], axis=1)
+        y = C_REF[:, None] * ratios[None, :] ** F_REF[:, None] * indexRatio[:, None]
+
+        if Detail == "real":
+            # the reference point is C_Ref itself, the last point extends the tangent at 5 * m_Ref
+            y[:, ratios == 1] = C_REF[:, None]
+            x_dif = 5 * M_REF
+            m_dif = C_REF * indexRatio * F_REF * x_dif ** (F_REF - 1) * M_REF ** (-F_REF)
+            lastCost = (maxFlow - x_dif) * m_dif + C_REF * 5 ** F_REF * indexRatio
+        else:
+            lastCost = C_REF * (maxFlow / M_REF) ** F_REF * indexRatio
 
+        y = np.concatenate([y, lastCost[:, None]], axis=1)
 
+    x_vals = {'lin_CAPEX_x': {}}
+    y_vals = {'lin_CAPEX_y': {}}
+    for k, u in enumerate(numbers):
+        x_vals['lin_CAPEX_x'][u, 1] = 0
+        y_vals['lin_CAPEX_y'][u, 1] = 0
+        for j in range(x.shape[1]):
+            x_vals['lin_CAPEX_x'][u, j + 2] = float(x[k, j])
+            y_vals['lin_CAPEX_y'][u, j + 2] = float(y[k, j])
+
+    return x_vals, y_vals
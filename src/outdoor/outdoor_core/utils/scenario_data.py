@@ -0,0 +1,402 @@
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+# fractions which can not be larger than 1, otherwise mass balance problems occur
+CONSTRAINED_PARAMETERS = ('myu', 'theta', 'gamma', 'phi', 'xi')
+
+
+class ScenarioDataFiles(Mapping):
+    """
+    Class Description
+    -----------------
+    Lazy dictionary of the data files of the scenarios {scenario: data file}, as used by the stochastic optimizers
+    (WaitAndSee, HereAndNow, mpi-sppy scenario_creator).
+
+    Only the base case data file and the parameter values which differ from it are stored for every scenario
+    (overrides: {scenario: {parameter name: {index: value}}}). The full data file of a scenario is only made when it
+    is accessed (ScenarioDataFiles[scenario]), so e.g. the process that solves the scenario makes it. Parameters
+    without overrides are shared with the base case data file, the data files must therefore be treated as read
+    only (adding keys to dataFile[None] is fine, every data file has its own dataFile[None] dictionary).
+
+    """
+
+    def __init__(self, BaseDataFile, Overrides=None):
+        self.baseDataFile = BaseDataFile
+        self.overrides = {}
+        self.probabilities = {}
+
+        if Overrides is not None:
+            for scenario, parameters in Overrides.items():
+                self.add_scenario(scenario, parameters)
+
+    def add_scenario(self, Scenario, Overrides, Probability=None):
+        """
+        Parameters
+        ----------
+        Scenario : String
+            Name of the scenario
+
+        Overrides : Dictionary
+            {parameter name: {index: value}} parameter values of the scenario which differ from the base case
+
+        Probability : Float, optional
+            Probability of the scenario
+
+        """
+        for name in Overrides:
+            if name not in self.baseDataFile[None]:
+                raise ValueError("The parameter {} of scenario {} is not in the base case data file".format(name,
+                                                                                                           Scenario))
+
+        self.overrides[Scenario] = {name: dict(values) for name, values in Overrides.items()}
+        if Probability is not None:
+            self.probabilities[Scenario] = Probability
+
+    def materialize(self, Scenario):
+        """
+        Parameters
+        ----------
+        Scenario : String
+            Name of the scenario
+
+        Returns
+        -------
+        dataFile : Dictionary
+            Full data file of the scenario, {None: {parameter name: values}}
+
+        """
+        baseData = self.baseDataFile[None]
+        data = dict(baseData)
+
+        for name, values in self.overrides[Scenario].items():
+            parameterValues = dict(baseData[name])
+            parameterValues.update(values)
+            data[name] = parameterValues
+
+        return {None: data}
+
+    def override_table(self):
+        """
+        Returns
+        -------
+        table : DataFrame
+            One row (Scenario, Parameter, Index, Value) for every value which differs from the base case
+
+        """
+        rows = [(scenario, name, index, value)
+                for scenario, parameters in self.overrides.items()
+                for name, values in parameters.items()
+                for index, value in values.items()]
+
+        return pd.DataFrame(rows, columns=['Scenario', 'Parameter', 'Index', 'Value'])
+
+    def __getitem__(self, Scenario):
+        return self.materialize(Scenario)
+
+    def __iter__(self):
+        return iter(self.overrides)
+
+    def __len__(self):
+        return len(self.overrides)
+
+
+class ScenarioStream:
+    """
+    Class Description
+    -----------------
+    Scenarios of a large sample which are generated chunk by chunk while they are used, instead of all at once
+    (Superstructure.set_uncertainty_stream_mpisspy). Only the scenarios of one chunk are kept in memory.
+
+    The stream can be used like the dictionary of the data files of the scenarios in the WaitAndSee and HereAndNow
+    optimizers (items, keys, len), but a data file can not be accessed by its scenario name. Every pass over the
+    stream generates the same scenarios again.
+
+    """
+
+    def __init__(self, BaseDataFile, UncertaintyObject, UncertaintyDict, PhiExcludeList, ChunkSize=1000, Seed=66):
+        """
+        Parameters
+        ----------
+        BaseDataFile : Dictionary
+            Base case data file {None: {parameter name: values}}
+
+        UncertaintyObject : StochasticObject
+            Sampling settings, the scenarios are generated with UncertaintyObject.iter_scenario_chunks
+
+        UncertaintyDict : Dictionary
+            {parameter name: {column name: index}} (see apply_uncertainty_matrix)
+
+        PhiExcludeList : List
+            (source, component) of the components which keep their base case fraction
+
+        ChunkSize : Integer
+            Number of scenarios which are generated at once
+
+        Seed : Integer
+            Seed of the random number generator
+
+        """
+        if ChunkSize < 1:
+            raise ValueError("The chunk size of the scenario stream must be at least 1")
+
+        self.baseDataFile = BaseDataFile
+        self.uncertaintyObject = UncertaintyObject
+        self.uncertaintyDict = UncertaintyDict
+        self.phiExcludeList = PhiExcludeList
+        self.chunkSize = ChunkSize
+        self.seed = Seed
+
+    def chunks(self):
+        """
+        Returns
+        -------
+        generator of (ScenarioDataFiles, uncertainty matrix) of every chunk of scenarios
+
+        """
+        for scenarioNames, scenarioProbabilities, uncertaintyMatrix in \
+                self.uncertaintyObject.iter_scenario_chunks(self.chunkSize, self.seed):
+            yield make_scenario_data_files(self.baseDataFile, scenarioNames, uncertaintyMatrix,
+                                           self.uncertaintyDict, self.phiExcludeList, scenarioProbabilities)
+
+    def scenarios(self):
+        """
+        Returns
+        -------
+        generator of (scenario name, probability, overrides) of all scenarios
+
+        """
+        for scenarioDataFiles, _ in self.chunks():
+            for scenario, overrides in scenarioDataFiles.overrides.items():
+                yield scenario, scenarioDataFiles.probabilities[scenario], overrides
+
+    def items(self):
+        for scenarioDataFiles, _ in self.chunks():
+            yield from scenarioDataFiles.items()
+
+    def keys(self):
+        for scenarioDataFiles, _ in self.chunks():
+            yield from scenarioDataFiles.keys()
+
+    def scenario_probabilities(self):
+        """
+        Returns
+        -------
+        probabilities : Dictionary
+            {scenario name: probability} of all scenarios (only the uncertainty matrices of the chunks are made)
+
+        """
+        probabilities = {}
+        for scenarioNames, scenarioProbabilities, _ in \
+                self.uncertaintyObject.iter_scenario_chunks(self.chunkSize, self.seed):
+            probabilities.update(zip(scenarioNames, scenarioProbabilities))
+        return probabilities
+
+    def uncertainty_matrix(self):
+        """
+        Returns
+        -------
+        uncertaintyMatrix : DataFrame
+            Values of the uncertain parameters of all scenarios (as Superstructure.uncertaintyMatrix)
+
+        """
+        return pd.concat([uncertaintyMatrix for _, uncertaintyMatrix in self.chunks()])
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self):
+        return self.uncertaintyObject.count_scenarios()
+
+
+def apply_uncertainty_matrix(BaseDataFile, UncertaintyMatrix, UncertaintyDict):
+    """
+    Parameters
+    ----------
+    BaseDataFile : Dictionary
+        Base case data file {None: {parameter name: values}}
+
+    UncertaintyMatrix : DataFrame
+        Relative change of the uncertain parameters, one row per scenario and one column per uncertain parameter
+        (column names 'parameterName_number')
+
+    UncertaintyDict : Dictionary
+        {parameter name: {column name: index}} index of every column in the parameter of the data file
+
+    Returns
+    -------
+    columns : List
+        (parameter name, index) of every column of UncertaintyMatrix
+
+    values : Array
+        Parameter values of all scenarios (scenarios x columns), base value * (1 + change), fractions are limited to 1
+
+    Description
+    -------
+    Calculates the values of the uncertain parameters of all scenarios in one array operation.
+
+    """
+    columns = []
+    for columnName in UncertaintyMatrix.columns:
+        # the column name is the parameter name followed by _number
+        parameterName = '_'.join(columnName.split('_')[:-1])
+        columns.append((parameterName, UncertaintyDict[parameterName][columnName]))
+
+    baseValues = np.array([BaseDataFile[None][name][index] for name, index in columns], dtype=float)
+    values = baseValues * (1 + UncertaintyMatrix.to_numpy(dtype=float))
+
+    constrained = np.array([name in CONSTRAINED_PARAMETERS for name, _ in columns], dtype=bool)
+    values[:, constrained] = np.where(values[:, constrained] > 1, 1.0, values[:, constrained])
+
+    return columns, values
+
+
+def renormalize_compositions(BasePhi, PhiColumns, PhiExcludeList):
+    """
+    Parameters
+    ----------
+    BasePhi : Dictionary
+        Base case composition of the sources {(source, component): fraction}
+
+    PhiColumns : Dictionary
+        {(source, component): Array} new fractions of the uncertain components in all scenarios
+
+    PhiExcludeList : List
+        (source, component) of the components which keep their base case fraction
+
+    Returns
+    -------
+    compositions : Dictionary
+        {(source, component): Array} fractions of all components of the changed sources in all scenarios
+
+    Description
+    -------
+    Scales the fractions of the other components of every changed source, so the composition sums up to 1 in every
+    scenario (same as Superstructure.adjust_phi_data for a single scenario), in one array operation per source.
+
+    """
+    compositions = {}
+
+    for source in dict.fromkeys(key[0] for key in PhiColumns):
+        original = {key: fraction for key, fraction in BasePhi.items() if key[0] == source}
+
+        # the changed components keep their new fractions, the excluded ones their base case fractions
+        adjusted = {key: column for key, column in PhiColumns.items() if key[0] == source}
+        for key in PhiExcludeList:
+            if key[0] == source and key not in adjusted:
+                adjusted[key] = BasePhi[key]
+
+        totalAdjusted = 0
+        for column in adjusted.values():
+            totalAdjusted = totalAdjusted + column
+        totalAdjusted = np.broadcast_to(totalAdjusted, next(iter(PhiColumns.values())).shape)
+
+        if np.any(totalAdjusted > 1):
+            raise ValueError("Total new percentages exceeds 100 %")
+
+        totalOtherComponents = sum(original.values()) - sum(original[key] for key in adjusted)
+        if totalOtherComponents != 0:
+            adjustmentFactor = (1 - totalAdjusted) / totalOtherComponents
+        else:
+            adjustmentFactor = np.zeros_like(totalAdjusted)
+
+        composition = {key: adjusted[key] if key in adjusted else fraction * adjustmentFactor
+                       for key, fraction in original.items()}
+        composition = {key: np.broadcast_to(column, totalAdjusted.shape) for key, column in composition.items()}
+
+        total = 0
+        for column in composition.values():
+            total = total + column
+        if np.any(total > 1.000000001):
+            raise ValueError("Total new percentages exceeds 100 %, please check for errors")
+
+        compositions.update(composition)
+
+    return compositions
+
+
+def make_scenario_data_files(BaseDataFile, ScenarioNames, UncertaintyMatrix, UncertaintyDict, PhiExcludeList,
+                             ScenarioProbabilities=None):
+    """
+    Parameters
+    ----------
+    BaseDataFile : Dictionary
+        Base case data file {None: {parameter name: values}}
+
+    ScenarioNames : List
+        Names of the scenarios (rows of UncertaintyMatrix)
+
+    UncertaintyMatrix : DataFrame
+        Relative change of the uncertain parameters (see apply_uncertainty_matrix)
+
+    UncertaintyDict : Dictionary
+        {parameter name: {column name: index}} (see apply_uncertainty_matrix)
+
+    PhiExcludeList : List
+        (source, component) of the components which keep their base case fraction
+
+    ScenarioProbabilities : List, optional
+        Probabilities of the scenarios
+
+    Returns
+    -------
+    scenarioDataFiles : ScenarioDataFiles
+        Data files of the scenarios
+
+    uncertaintyMatrix : DataFrame
+        Values of the uncertain parameters of the scenarios, the columns are named after the parameter, unit and
+        component
+
+    """
+    unitNames = BaseDataFile[None]['Names']
+
+    # values of the uncertain parameters of all scenarios (scenarios x columns), fractions are limited to 1
+    columns, values = apply_uncertainty_matrix(BaseDataFile, UncertaintyMatrix, UncertaintyDict)
+
+    # update the composition of the source units to keep the sum of the fractions equal to 1 in every scenario
+    phiColumns = {index: values[:, k] for k, (parameterName, index) in enumerate(columns) if parameterName == 'phi'}
+    compositions = renormalize_compositions(BaseDataFile[None]['phi'], phiColumns, PhiExcludeList)
+
+    # make a new column name, depending on the parameter name (the last column with the same name is kept)
+    matrixColumns = {}
+    for k, (parameterName, index) in enumerate(columns):
+        if parameterName == 'tau_h':
+            unitNumber = index[1]  # unit number is the second element of the index tuple
+            columnName = parameterName + ' ' + str(unitNames[unitNumber])
+
+        elif parameterName == 'delta_ut':
+            columnName = 'ElectricityPrice'
+
+        elif isinstance(index, tuple):
+            unitNumber = index[0]
+            compound = str(index[1])
+            columnName = parameterName + ' ' + str(unitNames[unitNumber]) + ' ' + compound
+
+        else:
+            # the index is not a tuple in the case of raw material costs and product prices
+            columnName = parameterName + '_' + str(unitNames[index])
+
+        matrixColumns[columnName] = k
+
+    uncertaintyMatrix = pd.DataFrame(values[:, list(matrixColumns.values())], columns=list(matrixColumns),
+                                     index=UncertaintyMatrix.index)
+
+    # the parameter values of every scenario which differ from the base case {parameterName: {index: value}}
+    parameterColumns = {}
+    for k, (parameterName, index) in enumerate(columns):
+        if parameterName != 'phi':
+            parameterColumns.setdefault(parameterName, {})[index] = k
+    parameterValues = {parameterName: (list(indexColumns), values[:, list(indexColumns.values())].tolist())
+                       for parameterName, indexColumns in parameterColumns.items()}
+    if compositions:
+        parameterValues['phi'] = (list(compositions), np.column_stack(list(compositions.values())).tolist())
+
+    scenarioDataFiles = ScenarioDataFiles(BaseDataFile)
+    for rowIndex, scenario in enumerate(ScenarioNames):
+        overrides = {parameterName: dict(zip(indices, rows[rowIndex]))
+                     for parameterName, (indices, rows) in parameterValues.items()}
+        probability = ScenarioProbabilities[rowIndex] if ScenarioProbabilities is not None else None
+        scenarioDataFiles.add_scenario(scenario, overrides, probability)
+
+    return scenarioDataFiles, uncertaintyMatrix
@@ -0,0 +1,196 @@
+import numpy as np
+from scipy.spatial.distance import cdist
+
+REDUCTION_METHODS = ('fast forward', 'k-medoids')
+
+# maximum number of distances which are held in memory at once (block of candidates x all scenarios)
+_BLOCK_ELEMENTS = 2 ** 22
+
+
+def reduce_scenarios(UncertaintyMatrix, Probabilities, NumberOfScenarios, Method='fast forward', Seed=66):
+    """
+
+    Parameters
+    ----------
+    UncertaintyMatrix : DataFrame or Array
+        Relative changes of the uncertain parameters, one row per scenario (StochasticObject.UncertaintyMatrix)
+
+    Probabilities : List
+        Probabilities of the scenarios (StochasticObject.ScenarioProbabilities)
+
+    NumberOfScenarios : Integer
+        Number of scenarios which are kept
+
+    Method : String
+        'fast forward' (fast forward selection) or 'k-medoids'
+
+    Seed : Integer
+        Seed of the initial medoids (only k-medoids)
+
+    Returns
+    -------
+    selected : Array
+        Row numbers of the kept scenarios
+
+    probabilities : Array
+        Probabilities of the kept scenarios, every removed scenario adds its probability to the closest kept one
+
+    distance : Float
+        Kantorovich (transport) distance between the original and the reduced distribution
+
+    relativeDistance : Float
+        distance divided by the one of the expected value scenario, i.e., 0 for the original distribution and
+        1 for a reduction as coarse as the expected value problem
+
+    Description
+    -------
+    Selects the scenarios which represent the distribution of the uncertain parameters best. The parameters are
+    scaled with their standard deviation so the distances do not depend on the size of the variation of a parameter.
+    Fast forward selection (Heitsch & Roemisch) adds the scenario which reduces the distance most, one by one,
+    and needs NumberOfScenarios passes over all pairs of scenarios. k-medoids improves the medoids of the clusters
+    of scenarios until they do not change anymore, it only needs the distances within the clusters. The distances
+    are calculated in blocks, so the memory does not grow with the square of the number of scenarios.
+
+    """
+    if Method not in REDUCTION_METHODS:
+        raise ValueError("The reduction method {} is not supported, choose from {}".format(Method, REDUCTION_METHODS))
+
+    points = np.asarray(UncertaintyMatrix, dtype=float)
+    weights = np.asarray(Probabilities, dtype=float)
+    if len(points) != len(weights):
+        raise ValueError('The uncertainty matrix has {} scenarios but {} probabilities are given'.format(
+            len(points), len(weights)))
+    if NumberOfScenarios < 1:
+        raise ValueError('At least one scenario needs to be kept, not {}'.format(NumberOfScenarios))
+
+    weights = weights / weights.sum()
+    points = _scale(points, weights)
+
+    if NumberOfScenarios >= len(points):
+        selected = np.arange(len(points))
+    elif Method == 'fast forward':
+        selected = _fast_forward_selection(points, weights, NumberOfScenarios)
+    else:
+        selected = _k_medoids(points, weights, NumberOfScenarios, Seed)
+
+    probabilities, distance = redistribute_probabilities(points, weights, selected)
+
+    # distance of the expected value scenario to the original distribution
+    expectedValue = weights @ points
+    spread = weights @ cdist(points, expectedValue[None, :])[:, 0]
+    relativeDistance = distance / spread if spread > 0 else 0.0
+
+    return selected, probabilities, distance, relativeDistance
+
+
+def redistribute_probabilities(Points, Probabilities, Selected):
+    """
+
+    Parameters
+    ----------
+    Points : Array
+        Scaled scenarios, one row per scenario
+
+    Probabilities : Array
+        Probabilities of the scenarios
+
+    Selected : Array
+        Row numbers of the kept scenarios
+
+    Returns
+    -------
+    probabilities : Array
+        Probabilities of the kept scenarios (the optimal redistribution, each scenario goes to its closest kept one)
+
+    distance : Float
+        Kantorovich distance between the original and the reduced distribution
+
+    """
+    Selected = np.asarray(Selected)
+    probabilities = np.zeros(len(Selected))
+    distance = 0.0
+
+    for rows in _blocks(len(Points), len(Selected)):
+        distances = cdist(Points[rows], Points[Selected])
+        closest = distances.argmin(axis=1)
+        np.add.at(probabilities, closest, Probabilities[rows])
+        distance += Probabilities[rows] @ distances[np.arange(len(closest)), closest]
+
+    return probabilities, distance
+
+
+def _scale(points, weights):
+    # parameters without variation keep their values
+    mean = weights @ points
+    std = np.sqrt(weights @ (points - mean) ** 2)
+    std[std == 0] = 1
+    return points / std
+
+
+def _blocks(n, columns):
+    # slices of rows, so a block of distances to all columns stays below _BLOCK_ELEMENTS
+    size = max(_BLOCK_ELEMENTS // max(columns, 1), 1)
+    return [slice(start, min(start + size, n)) for start in range(0, n, size)]
+
+
+def _fast_forward_selection(points, weights, numberOfScenarios):
+    n = len(points)
+    # distance of every scenario to the closest selected scenario
+    closestDistance = np.full(n, np.inf)
+    isSelected = np.zeros(n, dtype=bool)
+    selected = []
+
+    for _ in range(numberOfScenarios):
+        candidates = np.flatnonzero(~isSelected)
+        costs = np.empty(len(candidates))
+        for rows in _blocks(len(candidates), n):
+            distances = cdist(points[candidates[rows]], points)
+            costs[rows] = np.minimum(distances, closestDistance) @ weights
+
+        best = candidates[costs.argmin()]
+        selected.append(best)
+        isSelected[best] = True
+        closestDistance = np.minimum(closestDistance, cdist(points[best][None, :], points)[0])
+
+    return np.array(selected)
+
+
+def _k_medoids(points, weights, numberOfScenarios, seed, maxIterations=100):
+    n = len(points)
+    rng = np.random.default_rng(seed)
+
+    # k-medoids++ initialisation: scenarios far away from the medoids are more likely to become the next medoid
+    medoids = [rng.choice(n, p=weights)]
+    closestDistance = cdist(points[medoids], points)[0]
+    for _ in range(1, numberOfScenarios):
+        score = weights * closestDistance ** 2
+        if score.sum() == 0:
+            # all scenarios coincide with a medoid, take the remaining scenarios in order
+            score = np.where(np.isin(np.arange(n), medoids), 0.0, 1.0)
+        newMedoid = rng.choice(n, p=score / score.sum())
+        medoids.append(newMedoid)
+        closestDistance = np.minimum(closestDistance, cdist(points[newMedoid][None, :], points)[0])
+
+    medoids = np.array(medoids)
+    for _ in range(maxIterations):
+        # assign the scenarios to the closest medoid
+        clusters = np.empty(n, dtype=int)
+        for rows in _blocks(n, numberOfScenarios):
+            clusters[rows] = cdist(points[rows], points[medoids]).argmin(axis=1)
+
+        # the new medoid of a cluster is the member with the smallest weighted distance to the other members
+        newMedoids = medoids.copy()
+        for cluster in range(numberOfScenarios):
+            members = np.flatnonzero(clusters == cluster)
+            if len(members) == 0:
+                continue
+            costs = np.empty(len(members))
+            for rows in _blocks(len(members), len(members)):
+                costs[rows] = cdist(points[members[rows]], points[members]) @ weights[members]
+            newMedoids[cluster] = members[costs.argmin()]
+
+        if np.array_equal(newMedoids, medoids):
+            break
+        medoids = newMedoids
+
+    return medoids
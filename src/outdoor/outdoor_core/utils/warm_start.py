@@ -0,0 +1,155 @@
+from pyomo.environ import Var
+
+# binary variables of the flowsheet (chosen units and distributor decimals), the MIP start of a run
+FLOWSHEET_VARIABLES = ('Y', 'Y_DIST')
+
+
+def flowsheet_solution(ModelInstance):
+    """
+    Parameters
+    ----------
+    ModelInstance : PYOMO ConcreteModel
+        Solved model instance
+
+    Returns
+    -------
+    solution : Dictionary
+        {variable name: {index: value}} of the flowsheet variables (Y, Y_DIST), the same format as ModelOutput._data
+
+    Description
+    -------
+    Collects the flowsheet of a solved model instance, which is used as MIP start of the following runs of a
+    multi-run optimizer.
+
+    """
+    solution = {}
+    for name in FLOWSHEET_VARIABLES:
+        var = ModelInstance.component(name)
+        # the flowsheet is a parameter of models with a fixed design
+        if var is None or var.ctype is not Var:
+            continue
+        values = {index: round(varData.value) for index, varData in var.items() if varData.value is not None}
+        if values:
+            solution[name] = values
+    return solution
+
+
+def warm_start_values(ModelInstance, solution):
+    """
+    Parameters
+    ----------
+    ModelInstance : PYOMO ConcreteModel
+        Model instance which is started
+
+    solution : Dictionary
+        ModelOutput._data of a previous run or the output of flowsheet_solution
+
+    Returns
+    -------
+    startValues : List
+        (variable, value) of the flowsheet variables (Y, Y_DIST) of the model instance which have a value in the
+        solution
+
+    Description
+    -------
+    Only the flowsheet is started, the solver completes the other variables (values of a run with other parameters
+    are mostly infeasible and the start would be rejected). Indices which are missing in the solution are not started:
+    ModelOutput._tidy_data deletes zero values, and the sparse index sets can differ between the runs.
+
+    """
+    startValues = []
+    for name in FLOWSHEET_VARIABLES:
+        var = ModelInstance.component(name)
+        values = solution.get(name)
+        if var is None or var.ctype is not Var or not isinstance(values, dict):
+            continue
+        for index, varData in var.items():
+            val = values.get(index)
+            if val is not None and not varData.fixed:
+                startValues.append((varData, round(val)))
+    return startValues
+
+
+class SolutionPool:
+    """
+    Class Description
+    -----------------
+    Keeps the flowsheets of the runs of a multi-run optimizer together with the coordinates of the runs (e.g.,
+    the values of the sensitive parameters or the bound of a pareto point), so every new run can be started from
+    the nearest solved run.
+    """
+
+    def __init__(self):
+        self.points = []
+
+    def add(self, coordinates, solution):
+        """
+        :param coordinates: Dictionary {name: value} of the run
+        :param solution: Dictionary, flowsheet_solution of the run
+        """
+        self.points.append((coordinates, solution))
+
+    def nearest(self, coordinates):
+        """
+        Parameters
+        ----------
+        coordinates : Dictionary
+            {name: value} of the new run
+
+        Returns
+        -------
+        solution : Dictionary or None
+            solution of the nearest run, if two runs are equally near the one solved last. None if no run is solved
+
+        Description
+        -------
+        The distance is the sum of the relative differences of the coordinates, a coordinate which only one of the
+        runs has counts as 1.
+
+        """
+        best = None
+        bestDistance = None
+        for solvedCoordinates, solution in self.points:
+            distance = 0
+            for name in set(coordinates) | set(solvedCoordinates):
+                if name in coordinates and name in solvedCoordinates:
+                    a, b = coordinates[name], solvedCoordinates[name]
+                    distance += abs(a - b) / max(abs(a), abs(b), 1e-9)
+                else:
+                    distance += 1
+            if bestDistance is None or distance <= bestDistance:
+                best, bestDistance = solution, distance
+        return best
+
+
+def scenario_coordinates(dataFile, baseDataFile):
+    """
+    Parameters
+    ----------
+    dataFile : Dictionary
+        Data file of a scenario {None: {parameter name: values}}
+
+    baseDataFile : Dictionary or None
+        Base case data file the scenarios are made from (ScenarioDataFiles.baseDataFile)
+
+    Returns
+    -------
+    coordinates : Dictionary
+        {(parameter name, index): value} of the values of the scenario which differ from the base case, used to find
+        the nearest solved scenario. Empty if there is no base case, then the scenario solved last is used.
+
+    """
+    if baseDataFile is None:
+        return {}
+
+    baseData = baseDataFile[None]
+    coordinates = {}
+    for name, values in dataFile[None].items():
+        baseValues = baseData.get(name)
+        # parameters without overrides are shared with the base case data file
+        if values is baseValues or not isinstance(values, dict) or not isinstance(baseValues, dict):
+            continue
+        for index, val in values.items():
+            if isinstance(val, (int, float)) and val != baseValues.get(index):
+                coordinates[(name, index)] = val
+    return coordinates
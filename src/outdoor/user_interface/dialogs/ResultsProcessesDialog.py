@@ -162,7 +162,8 @@ class ResultsProcessesDialog(QDialog):
                 # print("flow found in n: ", n)
                 # print("mass passing through: ", self.modelOutput._data['REF_FLOW_CAPEX_UNIT'][iconID, n])
 
-            if self.modelOutput._data['Y_PARALLEL_UNIT'][iconID, n] > 0.5:
+            # only the parallel units which can be needed are part of the model
+            if self.modelOutput._data['Y_PARALLEL_UNIT'].get((iconID, n), 0) > 0.5:
                 num_parallel += 1
 
         return num_parallel
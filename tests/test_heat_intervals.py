@@ -0,0 +1,40 @@
+"""
+Pytest tests for the split of the heat demands over the heat intervals (utils/heat_intervals.py).
+
+The grid used here is [20, 50, 100, 150] with the interval numbers 3, 2, 1, 0 (as Superstructure.HeatIntervals).
+
+Run with:
+    pytest test_heat_intervals.py
+"""
+
+import pytest
+
+from outdoor.outdoor_core.utils.heat_intervals import interval_fractions, interval_utility_costs
+
+GRID = [20, 50, 100, 150]
+
+
+def test_heating_and_cooling_fractions():
+    heating = interval_fractions(GRID, [50], [150], Heating=True)
+    assert heating == [{3: 0.0, 2: pytest.approx(0.5), 1: pytest.approx(0.5)}]
+
+    cooling = interval_fractions(GRID, [150], [20], Heating=False)
+    assert cooling == [{3: pytest.approx(30 / 130), 2: pytest.approx(50 / 130), 1: pytest.approx(50 / 130)}]
+
+
+def test_isothermal_streams_use_one_interval():
+    assert interval_fractions(GRID, [100], [100], Heating=True) == [{3: 0.0, 2: 0.0, 1: 1.0}]
+    assert interval_fractions(GRID, [100], [100], Heating=False) == [{3: 0.0, 2: 1.0}]
+
+
+def test_all_streams_at_once_equal_single_streams():
+    tIn, tOut = [20, 50, 100, 20], [150, 100, 100, 50]
+    fractions = interval_fractions(GRID, tIn, tOut)
+
+    assert fractions == [interval_fractions(GRID, [i], [o])[0] for i, o in zip(tIn, tOut)]
+
+
+def test_utility_costs_of_the_intervals():
+    # the interval below a grid temperature gets the costs, both utilities supply 50 and 100 and the last one is used
+    assert interval_utility_costs(GRID, [200, 120], [5, 3]) == {3: 3, 2: 3, 1: 5}
+    assert interval_utility_costs(GRID, [], []) == {}
@@ -0,0 +1,75 @@
+"""
+Pytest tests for the lazy impact categories (utils/impact_categories.py).
+
+With lazy impact categories only the LCA constraints of the used categories are part of the MILP, the other
+categories are calculated after the solve and must give the same results as the full model.
+
+Run with:
+    pytest test_impact_categories.py
+"""
+
+import os
+
+import pytest
+from pyomo.environ import value
+
+from outdoor.outdoor_core.model.optimization_model import SuperstructureModel
+from outdoor.outdoor_core.optimizers.main_optimizer import SingleOptimizer
+from outdoor.outdoor_core.utils.impact_categories import LCA_CONSTRAINTS, activate_impact_category
+
+from test_model_construction import load_case
+
+CASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'Classroom', 'exercises', 'Potato', 'Case_study_PPW_2_superstructure.pkl')
+
+LCA_VARIABLES = ('IMPACT_INPUTS_U_CAT', 'IMPACT_INPUTS_PER_CAT', 'IMPACT_UTILITIES', 'IMPACT_UTILITIES_PER_CAT',
+                 'WASTE_U', 'IMPACT_WASTE_PER_CAT', 'IMPACT_TOT')
+
+
+def build_instance(lazy):
+    superstructure = load_case(CASE_PATH)
+    superstructure.set_lazyImpactCategories(lazy)
+    dataFile = superstructure.create_DataFile()
+    model = SuperstructureModel(superstructure)
+    model.create_ModelEquations()
+    return model.populateModel(dataFile)
+
+
+def count_lca_constraints(m):
+    return sum(len(m.component(name)) for name in LCA_CONSTRAINTS)
+
+
+def test_lazy_impact_categories_give_the_same_results():
+    full = build_instance(lazy=False)
+    lazy = build_instance(lazy=True)
+
+    # the objective of the case study is EBIT, no impact category is needed inside the MILP
+    assert list(full.IMPACT_CATEGORIES_MILP) == list(full.IMPACT_CATEGORIES)
+    assert len(lazy.IMPACT_CATEGORIES_MILP) == 0
+    assert count_lca_constraints(lazy) == 0
+
+    for m in (full, lazy):
+        SingleOptimizer('highs', 'local').run_optimization(m, tee=False, keepfiles=False, printTimer=False)
+
+    assert value(lazy.Objective) == pytest.approx(value(full.Objective))
+    for name in LCA_VARIABLES:
+        fullValues = full.component(name).extract_values()
+        lazyValues = lazy.component(name).extract_values()
+        assert lazyValues.keys() == fullValues.keys()
+        for index, fullValue in fullValues.items():
+            assert lazyValues[index] == pytest.approx(fullValue, rel=1e-6, abs=1e-6)
+
+
+def test_activated_impact_category_has_all_lca_constraints():
+    full = build_instance(lazy=False)
+    lazy = build_instance(lazy=True)
+    impCat = lazy.IMPACT_CATEGORIES.at(2)
+
+    activate_impact_category(lazy, impCat)
+    activate_impact_category(lazy, impCat)
+
+    assert list(lazy.IMPACT_CATEGORIES_MILP) == [impCat]
+    for name in LCA_CONSTRAINTS:
+        expected = {index for index in full.component(name).keys()
+                    if (index[-1] if isinstance(index, tuple) else index) == impCat}
+        assert set(lazy.component(name).keys()) == expected
@@ -0,0 +1,130 @@
+"""
+Pytest tests for the piece-wise linearization of the CAPEX curves (utils/linearizer.py).
+
+The vectorized calculation for all cost units must give the points of the former loop over the single units (copied
+below as reference_points), and the adaptive mode must meet the requested relative error with fewer points than the
+fine mode.
+
+Run with:
+    pytest test_linearizer.py
+"""
+
+import copy
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from outdoor.outdoor_core.utils.linearizer import capex_calculator, capex_calculator_vectorized
+
+CASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'Classroom', 'exercises', 'Potato', 'Case_study_PPW_1_superstructure.pkl')
+
+
+@pytest.fixture(scope="module")
+def case():
+    with open(CASE_PATH, 'rb') as file:
+        superstructure = pickle.load(file)
+
+    costUnits = [unit for unit in superstructure.UnitsList if unit.Number in superstructure.CostUnitsList['U_C']]
+    return superstructure, costUnits
+
+
+def reference_points(unit, CECPI, Detail):
+    """
+    The former per-unit calculation of capex_calculator, {(unit, point): x} and {(unit, point): y}.
+    """
+    u = unit.Number
+    M_REF = unit.CAPEX_factors['m_Ref'][u]
+    if M_REF == 0:
+        M_REF = 1
+    C_REF = unit.CAPEX_factors['C_Ref'][u]
+    if C_REF == 0:
+        M_REF = 0.0000000000001
+    F_REF = unit.CAPEX_factors['f'][u]
+    ratio = CECPI['CECPI'] / unit.CAPEX_factors['CECPI_ref'][u]
+
+    if Detail == "real":
+        factors = [1/5, 1/4, 1/3, 1/2, 3/4, 1, 1.5, 2, 3, 4, 5]
+        x = [0] + [factor * M_REF for factor in factors] + [1e05]
+        # the reference point itself was not scaled with the CECPI
+        y = [0] + [C_REF if factor == 1 else C_REF * factor ** F_REF * ratio for factor in factors]
+        m_dif = C_REF * ratio * F_REF * (5 * M_REF) ** (F_REF - 1) * M_REF ** (-F_REF)
+        y.append((1e05 - 5 * M_REF) * m_dif + C_REF * 5 ** F_REF * ratio)
+    else:
+        intervals = {"rough": 9, "fine": 300}.get(Detail, 19)
+        points = intervals + 1
+        real_points = (points - 3) / 2
+        x, y = [0], [0]
+        j2 = 2
+        for j in range(points - 2):
+            if j < real_points:
+                x.append(1 / (real_points + 1 - j) * M_REF)
+            elif j == real_points:
+                x.append(M_REF)
+            else:
+                x.append(j2 * M_REF)
+                j2 += 1
+            y.append(C_REF * (x[-1] / M_REF) ** F_REF * ratio)
+        x.append(100000)
+        y.append(C_REF * (100000 / M_REF) ** F_REF * ratio)
+
+    return ({(u, j): val for j, val in enumerate(x, start=1)}, {(u, j): val for j, val in enumerate(y, start=1)})
+
+
+@pytest.mark.parametrize("detail", ['real', 'rough', 'average', 'fine'])
+def test_vectorized_points_match_the_former_points(case, detail):
+    superstructure, costUnits = case
+    (x_vals, y_vals) = capex_calculator_vectorized(costUnits, superstructure.CECPI, Detail=detail)
+
+    nPoints = 0
+    for unit in costUnits:
+        (x_ref, y_ref) = reference_points(unit, superstructure.CECPI, detail)
+        (x_unit, y_unit) = capex_calculator(unit, superstructure.CECPI, Detail=detail)
+        assert set(x_unit['lin_CAPEX_x']) == set(x_ref)
+        for index, x in x_ref.items():
+            assert x_vals['lin_CAPEX_x'][index] == pytest.approx(x, rel=1e-12)
+            assert y_vals['lin_CAPEX_y'][index] == pytest.approx(y_ref[index], rel=1e-12)
+            assert x_unit['lin_CAPEX_x'][index] == pytest.approx(x, rel=1e-12)
+        nPoints += len(x_ref)
+
+    assert len(x_vals['lin_CAPEX_x']) == nPoints
+
+
+@pytest.mark.parametrize("maxError", [0.05, 0.01])
+def test_adaptive_points_meet_the_error(case, maxError):
+    superstructure, costUnits = case
+    (x_vals, y_vals) = capex_calculator_vectorized(costUnits, superstructure.CECPI, Detail='adaptive',
+                                                   maxError=maxError)
+    nPoints = len(x_vals['lin_CAPEX_x']) // len(costUnits)
+    assert nPoints < 301
+
+    for unit in costUnits:
+        u = unit.Number
+        factors = unit.CAPEX_factors
+        if factors['C_Ref'][u] == 0:
+            continue
+
+        x = np.array([x_vals['lin_CAPEX_x'][u, j] for j in range(1, nPoints + 1)])
+        y = np.array([y_vals['lin_CAPEX_y'][u, j] for j in range(1, nPoints + 1)])
+        flows = np.geomspace(0.2 * factors['m_Ref'][u], 100000, 5000)
+        costs = (factors['C_Ref'][u] * (flows / factors['m_Ref'][u]) ** factors['f'][u]
+                 * superstructure.CECPI['CECPI'] / factors['CECPI_ref'][u])
+
+        assert np.max(np.abs(np.interp(flows, x, y) - costs) / costs) <= maxError * 1.001
+
+
+def test_units_without_costs_do_not_add_intervals(case):
+    superstructure, costUnits = case
+    freeUnit = copy.deepcopy(costUnits[0])
+    u = freeUnit.Number
+    freeUnit.CAPEX_factors['C_Ref'][u] = 0
+
+    (x_vals, _) = capex_calculator_vectorized(costUnits[1:], superstructure.CECPI, Detail='adaptive')
+    (x_free, y_free) = capex_calculator_vectorized([freeUnit] + costUnits[1:], superstructure.CECPI,
+                                                   Detail='adaptive')
+
+    nPoints = len(x_vals['lin_CAPEX_x']) // len(costUnits[1:])
+    assert len(x_free['lin_CAPEX_x']) == nPoints * len(costUnits)
+    assert all(y_free['lin_CAPEX_y'][u, j] == 0 for j in range(1, nPoints + 1))
@@ -0,0 +1,324 @@
+"""
+Pytest tests for the construction of the SuperstructureModel from a Classroom case study.
+
+These tests check that the sparse index sets used by the mass balances and the process group logic describe exactly
+the connections and groups of the superstructure, and that the big-M tightening and the number of parallel units of
+the piecewise CAPEX use the propagated flow bounds.
+
+Run with:
+    pytest test_model_construction.py
+"""
+
+import copy
+import math
+import os
+import pickle
+
+import pytest
+from pyomo.environ import ConcreteModel, Constraint, SolverFactory, TerminationCondition
+
+from outdoor.outdoor_core.main.superstructure_problem import SuperstructureProblem
+from outdoor.outdoor_core.model.optimization_model import ConcreteSuperstructureModel, SuperstructureModel
+from outdoor.outdoor_core.optimizers.customs.change_params import update_mutable_parameters
+from outdoor.outdoor_core.utils.flow_bounds import calculate_flow_bounds, calculate_parallel_units
+
+CASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'Classroom', 'exercises', 'Potato', 'Case_study_PPW_1_superstructure.pkl')
+
+
+def load_case(path=CASE_PATH):
+    with open(path, 'rb') as file:
+        superstructure = pickle.load(file)
+
+    # pickles of older versions miss the upper flow limit of the cost units
+    for unit in superstructure.UnitsList:
+        if hasattr(unit, 'CAPEX_factors') and not hasattr(unit, 'upperFlowLimitUnit'):
+            unit.upperFlowLimitUnit = {'upperFlowLimitUnit': {unit.Number: 1e12}}
+
+    return superstructure
+
+
+@pytest.fixture(scope="module")
+def model_instance():
+    superstructure = load_case()
+    dataFile = superstructure.create_DataFile()
+    model = SuperstructureModel(superstructure)
+    model.create_ModelEquations()
+    return model.populateModel(dataFile)
+
+
+def test_connector_adjacency_matches_connectors(model_instance):
+    m = model_instance
+    downstream = {(u, uu) for u in m.U for uu in m.U_CONNECTORS_OUT[u]}
+    upstream = {(uu, u) for u in m.U for uu in m.U_CONNECTORS_IN[u]}
+
+    assert downstream == set(m.U_CONNECTORS)
+    assert upstream == set(m.U_CONNECTORS)
+
+
+def test_flow_split_constraints_only_exist_for_connections(model_instance):
+    m = model_instance
+    expected = {(u, uu, i) for (u, uu) in m.U_CONNECTORS for i in m.I}
+
+    for constraint in (m.MassBalance_6, m.MassBalance_7, m.MassBalance_8):
+        assert set(constraint.keys()) == expected
+
+
+def test_distributor_decimals_match_distributor_set(model_instance):
+    m = model_instance
+    decimals = {(u, uu, uk, k) for (u, uu) in m.U_DIST_SUB for (uk, k) in m.U_DIST_SUB_DC[u, uu]}
+
+    assert decimals == set(m.U_DIST_SUB2)
+    assert len(m.Distribution_Equations) == len(m.U_DIST_SUB)
+
+
+def test_process_groups_are_linked_to_a_representative():
+    superstructure = load_case()
+    dataFile = superstructure.create_DataFile()
+    members = dataFile[None]['UU'][None][:3]
+    superstructure.groups = {1: list(members)}
+
+    model = SuperstructureModel(superstructure)
+    model.create_ModelEquations()
+    m = model.populateModel(dataFile)
+
+    assert set(m.GROUP_LINKS) == {(members[1], members[0]), (members[2], members[0])}
+    assert len(m.ProcessGroup_logic_1) == len(members) - 1
+
+
+def test_forced_connections_are_indexed_by_unit_and_type(model_instance):
+    m = model_instance
+    expected = {(u, k) for u, targets in m.connections.items() for k in (1, 2, 3) if targets[k]}
+
+    assert set(m.CONNECTION_LINKS) == expected
+    assert set(m.ProcessGroup_logic_2.keys()) == expected
+
+
+def test_scenario_update_matches_repopulated_instance():
+    superstructure = load_case()
+    baseDataFile = superstructure.create_DataFile()
+    model = SuperstructureModel(superstructure)
+    model.create_ModelEquations()
+    m = model.populateModel(baseDataFile)
+
+    scenarioDataFile = copy.deepcopy(baseDataFile)
+    for name in ('myu', 'phi', 'ProductPrice', 'delta_ut'):
+        index = next(iter(scenarioDataFile[None][name]))
+        scenarioDataFile[None][name][index] *= 1.1
+
+    assert update_mutable_parameters(m, scenarioDataFile, baseDataFile)
+
+    repopulated = model.populateModel(scenarioDataFile)
+    for name in ('myu', 'phi', 'ProductPrice', 'delta_ut'):
+        assert getattr(m, name).extract_values() == getattr(repopulated, name).extract_values()
+
+    # changed sets can not be pushed into the existing instance
+    changedSetDataFile = copy.deepcopy(scenarioDataFile)
+    changedSetDataFile[None]['I'][None] = changedSetDataFile[None]['I'][None][:-1]
+    assert not update_mutable_parameters(m, changedSetDataFile, scenarioDataFile)
+
+    # the parallel units (U_C_PARALLEL) are built from the flow limits when the instance is populated
+    changedLimitDataFile = copy.deepcopy(scenarioDataFile)
+    u = next(iter(changedLimitDataFile[None]['upperFlowLimitUnit']))
+    changedLimitDataFile[None]['upperFlowLimitUnit'][u] = 20
+    assert not update_mutable_parameters(m, changedLimitDataFile, scenarioDataFile)
+
+    # the heat cascade (U_HI) is built from the nonzero beta values, a new heat interval of a unit needs a new instance
+    changedBetaDataFile = copy.deepcopy(scenarioDataFile)
+    index = next(index for index, val in changedBetaDataFile[None]['beta'].items() if val == 0)
+    changedBetaDataFile[None]['beta'][index] = 1
+    assert not update_mutable_parameters(m, changedBetaDataFile, scenarioDataFile)
+
+
+def test_flow_bounds_tighten_alpha_of_the_load_branch():
+    superstructure = load_case()
+    dataFile = superstructure.create_DataFile()
+    model = SuperstructureModel(superstructure)
+    model.create_ModelEquations()
+
+    flowBounds, alphaBounds = calculate_flow_bounds(dataFile, model.loadID, model.loadType)
+    loadFlow = dataFile[None]['sourceOrProductLoad'][None] / dataFile[None]['H'][None]
+
+    # the substrate load is the only bounded source, its first units can not carry more than the load
+    assert flowBounds[model.loadID] == pytest.approx(1.01 * loadFlow)
+    assert any(bound < 100000 for u, bound in alphaBounds.items() if u != model.loadID)
+    assert all(alphaBounds[u] >= flowBounds[u] for u in flowBounds)
+
+    tightenedDataFile = SuperstructureProblem().tighten_big_m_parameters(dataFile, model, setFlowBounds=True,
+                                                                       printReport=False)
+    m = model.populateModel(tightenedDataFile)
+
+    assert 'alpha' not in dataFile[None]
+    for u, bound in tightenedDataFile[None]['alpha'].items():
+        assert m.alpha[u].value == bound
+        assert all(m.FLOW_OUT[u, i].ub == flowBounds[u] for i in m.I)
+
+
+def test_dead_units_are_left_out_of_the_data_file():
+    superstructure = load_case()
+    nUnits = len(superstructure.UnitsList)
+    numbers = {unit.Name: unit.Number for unit in superstructure.UnitsList}
+    composting, compost = numbers['Composting'], numbers['Compost']
+
+    # cut the only connection to the compost pool, composting then has no product left to deliver to
+    for unit in superstructure.UnitsList:
+        for key in [key for key in unit.myu['myu'] if key[1][0] == compost]:
+            del unit.myu['myu'][key]
+
+    # composting is still the target of a forced connection, its binary is linked to a live unit
+    assert not superstructure.find_deadUnits()
+    for connectionTypes in superstructure.connections.values():
+        for k, targets in connectionTypes.items():
+            if targets and composting in targets:
+                connectionTypes[k] = [uu for uu in targets if uu != composting]
+
+    deadUnits = superstructure.find_deadUnits()
+    assert deadUnits[compost] == 'not reachable from a source'
+    assert deadUnits[composting] == 'can not reach a product pool, turbine or furnace'
+
+    splitFactors = {unit.Number: dict(unit.myu['myu']) for unit in superstructure.UnitsList}
+    groups = copy.deepcopy(superstructure.groups)
+    dataFile = copy.deepcopy(superstructure.create_DataFile())
+    assert not set(deadUnits) & set(dataFile[None]['U'][None])
+    assert not set(deadUnits) & set(dataFile[None]['Names'])
+    assert not any(u in deadUnits or uu in deadUnits for (u, uu) in dataFile[None]['U_CONNECTORS'][None])
+
+    # the superstructure itself is not changed, the next data file is the same
+    assert len(superstructure.UnitsList) == nUnits
+    assert set(deadUnits) <= set(superstructure.UnitsNumberList['U'])
+    assert {unit.Number: unit.myu['myu'] for unit in superstructure.UnitsList} == splitFactors
+    assert superstructure.groups == groups
+    assert superstructure.find_deadUnits() == deadUnits
+    assert superstructure.create_DataFile() == dataFile
+
+    model = SuperstructureModel(superstructure)
+    model.create_ModelEquations()
+    m = model.populateModel(dataFile)
+    assert len(m.U) == nUnits - len(deadUnits)
+    if SolverFactory("appsi_highs").available(exception_flag=False):
+        results = SolverFactory("appsi_highs").solve(m)
+        assert results.solver.termination_condition == TerminationCondition.optimal
+
+    # opt-out: all units are kept
+    assert len(superstructure.create_DataFile(removeDeadUnits=False)[None]['U'][None]) == nUnits
+
+
+def test_parallel_units_are_limited_by_the_flow_bounds(model_instance):
+    m = model_instance
+
+    # the flow limit of the case study is left at its default (1e12), a single unit always suffices
+    assert set(m.U_C_PARALLEL) == {(u, 1) for u in m.U_C}
+    assert len(m.lin_CAPEX_z) == len(m.U_C) * len(m.JI)
+    assert not m.CapexEquation_filling
+
+    superstructure = load_case()
+    dataFile = superstructure.create_DataFile()
+    dataFile[None]['upperFlowLimitUnit'] = {u: 20 for u in dataFile[None]['U_C'][None]}
+    model = SuperstructureModel(superstructure)
+    model.create_ModelEquations()
+
+    flowBounds, alphaBounds = calculate_flow_bounds(dataFile, model.loadID, model.loadType)
+    parallelUnits = calculate_parallel_units(dataFile, flowBounds)
+    # the units behind the substrate load carry at most 1.01 * 70 t/h, four units of 20 t/h are enough
+    assert any(n == 4 for n in parallelUnits.values())
+    assert all(1 <= n <= 5 for n in parallelUnits.values())
+
+    tightenedDataFile = SuperstructureProblem().tighten_big_m_parameters(dataFile, model, printReport=False)
+    m = model.populateModel(tightenedDataFile)
+    for u in m.U_C:
+        nMax = parallelUnits.get(u, len(m.N_CAPEX))
+        assert {n for (uu, n) in m.U_C_PARALLEL if uu == u} == set(range(1, nMax + 1))
+        assert (u, nMax) not in m.CapexEquation_filling
+
+
+@pytest.mark.parametrize("formulation", ['sos2', 'log'])
+def test_piecewise_capex_formulations(formulation):
+    superstructure = load_case()
+    superstructure.set_piecewiseFormulation(formulation)
+    dataFile = superstructure.create_DataFile()
+    model = SuperstructureModel(superstructure)
+    model.create_ModelEquations()
+    m = model.populateModel(dataFile)
+
+    assert not hasattr(m, 'lin_CAPEX_z')
+    assert len(m.CapexEquation_lambda) == len(m.U_C_PARALLEL)
+
+    if formulation == 'sos2':
+        assert len(m.CapexEquation_SOS2) == len(m.U_C_PARALLEL)
+        return
+
+    nIntervals = len(m.JI)
+    assert len(m.JB) == max(1, math.ceil(math.log2(nIntervals)))
+    assert len(m.lin_CAPEX_w) == len(m.U_C_PARALLEL) * len(m.JB)
+
+    # the Gray code of every interval only leaves the two points of the interval switched on
+    for ji in m.JI:
+        code = (ji - 1) ^ ((ji - 1) >> 1)
+        allowed = set(m.J)
+        for b in m.JB:
+            switchedOff = m.J_GRAY_R[b] if (code >> (b - 1)) & 1 else m.J_GRAY_L[b]
+            allowed -= set(switchedOff)
+        assert allowed == {ji, ji + 1}
+
+
+def test_heat_cascade_only_covers_intervals_with_a_heat_demand(model_instance):
+    m = model_instance
+    expected = {(u, hi) for u in m.U for hi in m.HI if any(m.beta[u, ut, hi].value != 0 for ut in m.H_UT)}
+
+    assert set(m.U_HI) == expected
+    assert len(m.U_HI) < len(m.U) * len(m.HI)
+    for component in (m.ENERGY_DEMAND_HEAT, m.ENERGY_DEMAND_COOL, m.HeatBalance_1, m.HeatBalance_2):
+        assert set(component.keys()) == expected
+
+    assert set(m.HeatBalance_3.keys()) == set(m.HI)
+    assert set(m.HeatBalance_4.keys()) == set(m.HI)
+
+
+def test_merged_heat_temperatures_keep_the_heat_demand():
+    superstructure = load_case()
+    superstructure.create_DataFile()
+    temperatures = list(superstructure.Heat_Temperatures)
+
+    merged = load_case()
+    merged.set_temperatureMergeTolerance(5)
+    dataFile = merged.create_DataFile()
+    mergeMap = merged.HeatTemperatureMergeMap
+
+    assert mergeMap and len(merged.Heat_Temperatures) < len(temperatures)
+    assert all(abs(t - gridTemperature) <= 5 for t, gridTemperature in mergeMap.items())
+    assert set(merged.Heat_Temperatures) == {mergeMap.get(t, t) for t in temperatures}
+    assert len(dataFile[None]['HI'][None]) == len(merged.Heat_Temperatures) - 1
+
+    # every heat demand is still split completely over the merged intervals
+    model = SuperstructureModel(merged)
+    model.create_ModelEquations()
+    m = model.populateModel(dataFile)
+    for u in m.U:
+        for ut in m.H_UT:
+            shares = sum(m.beta[u, ut, hi].value for hi in m.HI)
+            assert shares == pytest.approx(0) or shares == pytest.approx(1)
+
+
+def test_repeated_data_files_are_equal():
+    superstructure = load_case()
+    dataFile = copy.deepcopy(superstructure.create_DataFile())
+    parameterLists = {unit.Number: len(unit.ParameterList) for unit in superstructure.UnitsList}
+
+    assert superstructure.create_DataFile() == dataFile
+    assert {unit.Number: len(unit.ParameterList) for unit in superstructure.UnitsList} == parameterLists
+    assert len(dataFile[None]['U_CONNECTORS'][None]) == len(set(dataFile[None]['U_CONNECTORS'][None]))
+
+
+def test_direct_builder_matches_abstract_instance(model_instance):
+    superstructure = load_case()
+    m = ConcreteSuperstructureModel(superstructure, superstructure.create_DataFile())
+
+    assert isinstance(m, ConcreteModel)
+    assert m.is_constructed()
+    abstractComponents = {c.local_name: len(c) for c in model_instance.component_objects(descend_into=False)}
+    directComponents = {c.local_name: len(c) for c in m.component_objects(descend_into=False)}
+    assert directComponents == abstractComponents
+    for constraint in model_instance.component_objects(Constraint, descend_into=False):
+        directConstraint = m.component(constraint.local_name)
+        for index in constraint:
+            assert str(directConstraint[index].expr) == str(constraint[index].expr)
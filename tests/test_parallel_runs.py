@@ -0,0 +1,149 @@
+"""
+Pytest tests for the parallel execution of the multi-run optimizers (optimizers/customs/parallel_runs.py).
+
+A small MILP with the parameter names of OUTDOOR (ProductPrice, delta_ut) is solved for a set of sensitivity points,
+one after another and by two worker processes. Both need to give the results of fresh solves in the same order.
+
+Requirements:
+    pip install pyomo highspy pytest
+
+Run with:
+    pytest test_parallel_runs.py
+"""
+
+import pandas as pd
+import pytest
+from pyomo.environ import (
+    Any,
+    Binary,
+    ConcreteModel,
+    Constraint,
+    NonNegativeReals,
+    Objective,
+    Param,
+    SolverFactory,
+    Var,
+    maximize,
+    value,
+)
+
+from outdoor.outdoor_core.optimizers.customs.custom_optimizer import SensitivityOptimizer, TwoWaySensitivityOptimizer
+from outdoor.outdoor_core.optimizers.customs.parallel_runs import ParameterPointSolver, run_points
+from outdoor.outdoor_core.optimizers.main_optimizer import SingleOptimizer
+
+pytestmark = pytest.mark.skipif(not SolverFactory("appsi_highs").available(exception_flag=False),
+                                reason="The persistent HiGHS interface (highspy) is not installed.")
+
+PRICE = 'Price (ProductPrice)'
+ELECTRICITY = 'Electricity price (delta_ut)'
+
+
+def build_model(prices=None, electricity=1.0):
+    """
+    Two products, each made in a unit which has to be built (Y) before it can produce, with electricity costs.
+    """
+    m = ConcreteModel()
+    # read by the ModelOutput of each run
+    m.ObjectiveFunctionName = Param(initialize="EBIT", within=Any)
+    m.MainProductFlow = Param(initialize=1.0, mutable=True)
+    m.U = ['A', 'B']
+    m.ProductPrice = Param(m.U, initialize=prices or {'A': 10.0, 'B': 8.0}, mutable=True)
+    m.delta_ut = Param(['Electricity'], initialize={'Electricity': electricity}, mutable=True)
+    m.flow = Var(m.U, within=NonNegativeReals, bounds=(0, 10))
+    m.Y = Var(m.U, within=Binary)
+    m.unit_capacity = Constraint(m.U, rule=lambda m, u: m.flow[u] <= 10 * m.Y[u])
+    m.EBIT = Var()
+    m.EBIT_definition = Constraint(expr=m.EBIT == sum(m.ProductPrice[u] * m.flow[u] for u in m.U)
+                                   - 40 * m.Y['A'] - 30 * m.Y['B']
+                                   - 2 * m.delta_ut['Electricity'] * (m.flow['A'] + m.flow['B']))
+    m.Objective = Objective(expr=m.EBIT, sense=maximize)
+    return m
+
+
+def toy_point_solver():
+    # factory of the point solver of the workers, has to be a module level function
+    return ParameterPointSolver(build_model(), SingleOptimizer('highs', 'local', persistent=True), None)
+
+
+def reference_ebit(parameterName, val, unit):
+    if parameterName == PRICE:
+        prices = {'A': 10.0, 'B': 8.0}
+        prices[unit] = val
+        model = build_model(prices=prices)
+    else:
+        model = build_model(electricity=val)
+    SolverFactory("appsi_highs").solve(model)
+    return value(model.EBIT)
+
+
+def reference_grid_ebit(price, electricity):
+    model = build_model(prices={'A': price, 'B': 8.0}, electricity=electricity)
+    SolverFactory("appsi_highs").solve(model)
+    return value(model.EBIT)
+
+
+def make_points():
+    price = pd.Series({'Unit_Number': 'A'})
+    electricity = pd.Series({'Unit_Number': None})
+    return ([((PRICE, val), [(PRICE, val, price)]) for val in (2.0, 6.0, 12.0)] +
+            [((ELECTRICITY, val), [(ELECTRICITY, val, electricity)]) for val in (0.5, 2.0, 4.0)])
+
+
+def test_every_point_starts_from_the_base_case():
+    pointSolver = toy_point_solver()
+
+    # the points are solved in reversed order, the earlier points must not change the later ones
+    for (parameterName, val), changes in reversed(make_points()):
+        result = pointSolver.solve_point(changes)
+        assert result._data['EBIT'] == pytest.approx(reference_ebit(parameterName, val, 'A'))
+
+    pointSolver.reset()
+    assert pointSolver.model_instance.ProductPrice['A'].value == 10.0
+    assert pointSolver.model_instance.delta_ut['Electricity'].value == 1.0
+
+
+def test_parallel_points_equal_serial_points():
+    points = make_points()
+    results = run_points(points, toy_point_solver, (), workers=2, chunkSize=2)
+
+    assert list(results) == [key for key, _ in points]
+    for (parameterName, val), result in results.items():
+        assert result._data['EBIT'] == pytest.approx(reference_ebit(parameterName, val, 'A'))
+
+
+def make_sensitive_parameters():
+    return [
+        pd.Series({'Parameter_Type': PRICE, 'Unit_Number': 'A', 'Component': None, 'Reaction_Number': None,
+                   'Target_Unit': None, 'Lower_Bound': 2.0, 'Upper_Bound': 12.0, 'Number_of_steps': 3}),
+        pd.Series({'Parameter_Type': ELECTRICITY, 'Unit_Number': None, 'Component': None, 'Reaction_Number': None,
+                   'Target_Unit': None, 'Lower_Bound': 0.5, 'Upper_Bound': 4.0, 'Number_of_steps': 3})]
+
+
+def test_sensitivity_optimizer_results_in_order():
+    sensitiveParameters = make_sensitive_parameters()
+
+    optimizer = SensitivityOptimizer('highs', 'local', sensi_data=sensitiveParameters, workers=1)
+    output = optimizer.run_optimization(build_model())
+
+    assert list(output._results_data) == [(PRICE, 2.0), (PRICE, 7.0), (PRICE, 12.0),
+                                          (ELECTRICITY, 0.5), (ELECTRICITY, 2.25), (ELECTRICITY, 4.0)]
+    for (parameterName, val), result in output._results_data.items():
+        assert result._data['EBIT'] == pytest.approx(reference_ebit(parameterName, val, 'A'))
+
+
+def test_two_way_grid_parallel_equals_serial():
+    # the 3 x 3 grid of the price of A and the electricity price
+    optimizer = TwoWaySensitivityOptimizer('highs', 'local', two_way_data=make_sensitive_parameters(), workers=1)
+    output = optimizer.run_optimization(build_model())
+
+    keys = [(PRICE, price, ELECTRICITY, electricity) for price in (2.0, 7.0, 12.0) for electricity in (0.5, 2.25, 4.0)]
+    assert list(output._results_data) == keys
+    for (_, price, _, electricity), result in output._results_data.items():
+        assert result._data['EBIT'] == pytest.approx(reference_grid_ebit(price, electricity))
+
+    price, electricity = pd.Series({'Unit_Number': 'A'}), pd.Series({'Unit_Number': None})
+    points = [(key, [(PRICE, key[1], price), (ELECTRICITY, key[3], electricity)]) for key in keys]
+    results = run_points(points, toy_point_solver, (), workers=2)
+    assert list(results) == keys
+    for key, result in results.items():
+        assert result._data['EBIT'] == pytest.approx(output._results_data[key]._data['EBIT'])
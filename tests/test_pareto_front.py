@@ -0,0 +1,145 @@
+"""
+Pytest tests for the pareto points of the MultiObjectiveOptimizer (epsilon-constraint method).
+
+A small MILP with the objective names of OUTDOOR (EBIT, NPE) is solved for the pareto points one after another and by
+two worker processes (each with its own model instance). Both need to give the results of a fresh solve of every
+epsilon-constraint problem, merged by pareto index. The adaptive refinement has to find every flowsheet of the front
+within its solve budget.
+
+Requirements:
+    pip install pyomo highspy pytest
+
+Run with:
+    pytest test_pareto_front.py
+"""
+
+import numpy as np
+import pytest
+from pyomo.environ import (
+    Any,
+    Binary,
+    ConcreteModel,
+    Constraint,
+    NonNegativeReals,
+    Objective,
+    Param,
+    Set,
+    SolverFactory,
+    Var,
+    maximize,
+    value,
+)
+
+from outdoor.outdoor_core.optimizers.customs.custom_optimizer import MultiObjectiveOptimizer, ParetoPointSolver
+from outdoor.outdoor_core.optimizers.customs.parallel_runs import run_points
+
+pytestmark = pytest.mark.skipif(not SolverFactory("appsi_highs").available(exception_flag=False),
+                                reason="The persistent HiGHS interface (highspy) is not installed.")
+
+MULTI_DATA = {'objective1': 'NPE', 'objective2': 'EBIT', 'paretoPoints': 5, 'bounds_objective1': [None, None]}
+
+# price, fixed costs and emissions per flow of the three products
+UNITS = {'A': (10.0, 40.0, 3.0), 'B': (8.0, 30.0, 1.0), 'C': (6.0, 10.0, 0.2)}
+
+
+def build_model():
+    """
+    Three products, each made in a unit which has to be built (Y) before it can produce. The products with the
+    higher margin cause more emissions (NPE).
+    """
+    m = ConcreteModel()
+    # read by the ModelOutput of each run
+    m.ObjectiveFunctionName = Param(initialize="EBIT", within=Any)
+    m.MainProductFlow = Param(initialize=1.0, mutable=True)
+    m.IMPACT_CATEGORIES = Set(initialize=[])
+    m.U = Set(initialize=list(UNITS))
+    m.Names = Param(m.U, initialize={u: "Product " + u for u in UNITS}, within=Any)
+    # read by return_chosen, the toy has no sources
+    m.U_S = Set(initialize=[])
+    m.FLOW_SOURCE = Param(m.U_S)
+    m.FLOW_SUM = Var(m.U, within=NonNegativeReals, bounds=(0, 10))
+    m.Y = Var(m.U, within=Binary)
+    m.unit_capacity = Constraint(m.U, rule=lambda m, u: m.FLOW_SUM[u] <= 10 * m.Y[u])
+    m.EBIT = Var()
+    m.EBIT_definition = Constraint(expr=m.EBIT == sum(UNITS[u][0] * m.FLOW_SUM[u] - UNITS[u][1] * m.Y[u]
+                                                      for u in m.U))
+    m.NPE = Var()
+    m.NPE_definition = Constraint(expr=m.NPE == sum(UNITS[u][2] * m.FLOW_SUM[u] for u in m.U))
+    m.Objective = Objective(expr=m.EBIT, sense=maximize)
+    return m
+
+
+def toy_pareto_solver():
+    # factory of the point solver of the workers, has to be a module level function
+    model = build_model()
+    optimizer = MultiObjectiveOptimizer('highs', 'local', multi_data=MULTI_DATA)
+    optimizer.change_model_objective(model, 'EBIT')
+    return ParetoPointSolver(model, optimizer)
+
+
+def reference_ebit(bound):
+    model = build_model()
+    model.bound = Constraint(expr=model.NPE <= bound)
+    SolverFactory("appsi_highs").solve(model)
+    return value(model.EBIT)
+
+
+def test_pareto_points_in_order():
+    output = MultiObjectiveOptimizer('highs', 'local', multi_data=MULTI_DATA).run_optimization(build_model())
+
+    # anchors: no product (NPE 0) and all products (NPE 42)
+    bounds = np.linspace(0, 42, 5)
+    assert list(output._results_data) == ["pareto_bound_{}".format(count) for count in range(1, 6)]
+    for bound, result in zip(bounds, output._results_data.values()):
+        assert result._data['NPE'] <= bound + 1e-6
+        assert result._data['EBIT'] == pytest.approx(reference_ebit(bound))
+
+
+def test_parallel_pareto_points_equal_serial_points():
+    points = [(count, bound) for count, bound in enumerate(np.linspace(0, 42, 5), start=1)]
+    pointSolver = toy_pareto_solver()
+    serial = {count: pointSolver.solve_point(bound) for count, bound in points}
+
+    results = run_points(points, toy_pareto_solver, (), workers=2, chunkSize=2)
+    assert list(results) == [count for count, _ in points]
+    for count, result in results.items():
+        assert result._data['EBIT'] == pytest.approx(serial[count]._data['EBIT'])
+
+
+def test_infeasible_pareto_point():
+    pointSolver = toy_pareto_solver()
+    assert pointSolver.solve_point(-1.0) is None
+    # the model instance can still be used for the next points
+    assert pointSolver.solve_point(42.0)._data['EBIT'] == pytest.approx(reference_ebit(42.0))
+
+
+def test_errors_of_a_pareto_point_are_raised():
+    # only infeasible bounds are skipped, a broken run must not leave an empty pareto front
+    pointSolver = toy_pareto_solver()
+    pointSolver.model_instance.del_component('ObjectiveFunctionName')
+    with pytest.raises(KeyError, match="ObjectiveFunctionName"):
+        pointSolver.solve_point(42.0)
+
+
+def test_parallel_pareto_points_need_the_superstructure():
+    optimizer = MultiObjectiveOptimizer('highs', 'local', multi_data=MULTI_DATA, workers=2)
+    with pytest.raises(ValueError, match="superstructure"):
+        optimizer.run_optimization(build_model())
+
+
+def test_adaptive_refinement_finds_every_flowsheet():
+    multiData = dict(MULTI_DATA, adaptive_refinement=True, max_solves=15)
+    optimizer = MultiObjectiveOptimizer('highs', 'local', multi_data=multiData)
+    output = optimizer.run_optimization(build_model())
+
+    results = list(output._results_data.values())
+    assert 3 <= len(results) <= 15
+    assert list(output._results_data) == ["pareto_bound_{}".format(count) for count in range(1, len(results) + 1)]
+
+    # no product, then C, B and A are added along the front
+    flowsheets = [optimizer.chosen_units(result) for result in results]
+    assert set(flowsheets) == {frozenset(), frozenset('C'), frozenset('BC'), frozenset('ABC')}
+    npe = [result._data.get('NPE', 0.0) for result in results]
+    assert npe == sorted(npe)
+    for result in results:
+        assert result._data['EBIT'] == pytest.approx(reference_ebit(result._data.get('NPE', 0.0)), abs=1e-6)
@@ -0,0 +1,103 @@
+"""
+Pytest tests for the persistent solver mode of the SingleOptimizer.
+
+A small MILP is solved repeatedly with the persistent HiGHS interface (appsi_highs). Between the runs only a mutable
+parameter, a bound constraint or the objective is changed, the results must match a fresh solve.
+
+Requirements:
+    pip install pyomo highspy pytest
+
+Run with:
+    pytest test_persistent_solver.py
+"""
+
+import pytest
+from pyomo.environ import (
+    Any,
+    Binary,
+    ConcreteModel,
+    Constraint,
+    NonNegativeReals,
+    Objective,
+    Param,
+    SolverFactory,
+    Var,
+    maximize,
+    value,
+)
+
+from outdoor.outdoor_core.optimizers.main_optimizer import SingleOptimizer
+from outdoor.outdoor_core.optimizers.customs.custom_optimizer import MultiObjectiveOptimizer
+
+pytestmark = pytest.mark.skipif(not SolverFactory("appsi_highs").available(exception_flag=False),
+                                reason="The persistent HiGHS interface (highspy) is not installed.")
+
+
+def build_model(price=10.0):
+    """
+    Produce a product in up to two units, each unit has to be built (Y) before it can produce.
+    """
+    m = ConcreteModel()
+    # read by the ModelOutput of each run
+    m.ObjectiveFunctionName = Param(initialize="EBIT", within=Any)
+    m.MainProductFlow = Param(initialize=1.0)
+    m.price = Param(initialize=price, mutable=True)
+    m.flow = Var([1, 2], within=NonNegativeReals, bounds=(0, 10))
+    m.Y = Var([1, 2], within=Binary)
+    m.unit_capacity = Constraint([1, 2], rule=lambda m, u: m.flow[u] <= 10 * m.Y[u])
+    m.EBIT = Var()
+    m.EBIT_definition = Constraint(expr=m.EBIT == m.price * (m.flow[1] + m.flow[2])
+                                   - 40 * m.Y[1] - 60 * m.Y[2] - 2 * m.flow[2])
+    m.Objective = Objective(expr=m.EBIT, sense=maximize)
+    return m
+
+
+def test_highs_is_always_persistent():
+    optimizer = SingleOptimizer("highs", "local")
+
+    assert optimizer.persistent
+    assert optimizer.solver.options["mip_feasibility_tolerance"] == 1e-8
+
+
+def test_parameter_changes_are_resolved_incrementally():
+    optimizer = SingleOptimizer("highs", "local", persistent=True)
+    m = build_model()
+
+    for price in (10.0, 5.0, 3.0, 12.0):
+        m.price = price
+        optimizer.run_optimization(m, tee=False, printTimer=False)
+
+        reference = build_model(price)
+        SolverFactory("appsi_highs").solve(reference)
+        assert value(m.EBIT) == pytest.approx(value(reference.EBIT))
+
+
+def test_bound_and_objective_changes_are_resolved_incrementally():
+    multiOptimizer = MultiObjectiveOptimizer("highs", "local")
+    m = build_model()
+
+    optimizer = multiOptimizer.single_optimizer
+    optimizer.run_optimization(m, tee=False, printTimer=False)
+    assert value(m.EBIT) == pytest.approx(80.0)
+
+    # an existing bound constraint is updated in place
+    multiOptimizer.bound_objective(m, "EBIT", 200.0, flipped=True)
+    multiOptimizer.bound_objective(m, "EBIT", 50.0, flipped=True)
+    optimizer.run_optimization(m, tee=False, printTimer=False)
+    assert value(m.EBIT) == pytest.approx(50.0)
+
+    m.del_component(m.Objective)
+    m.Objective = Objective(expr=m.flow[1] + m.flow[2], sense=maximize)
+    optimizer.run_optimization(m, tee=False, printTimer=False)
+    assert value(m.flow[1] + m.flow[2]) == pytest.approx(17.0)
+    assert value(m.EBIT) <= 50.0 + 1e-6
+
+
+def test_infeasible_runs_are_reported():
+    optimizer = SingleOptimizer("highs", "local", persistent=True)
+    m = build_model()
+    m.minimum_flow = Constraint(expr=m.flow[1] + m.flow[2] >= 25)
+
+    assert optimizer.run_optimization(m, tee=False, printTimer=False, VSS_EVPI_mode=True) == 'infeasible'
+    with pytest.raises(Exception):
+        optimizer.run_optimization(m, tee=False, printTimer=False)
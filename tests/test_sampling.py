@@ -0,0 +1,106 @@
+"""
+Pytest tests for the sampling of the uncertain parameters (input_classes/stochastic.py) and the convergence report of
+the wait and see analysis (MultiModelOutput.convergence_report).
+
+Run with:
+    pytest test_sampling.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from outdoor.outdoor_core.input_classes.stochastic import StochasticObject
+from outdoor.outdoor_core.output_classes.multi_model_output import MultiModelOutput
+
+
+def make_stochastic_object(method, sampleSize=256):
+    uncertaintyObject = StochasticObject()
+    uncertaintyObject.SampleSize = sampleSize
+    uncertaintyObject.set_sampling_method(method)
+    uncertaintyObject.GeneralDict = {
+        'phi_1': {'Distribution_Function': 'Uniform', '(%)': 0.2},
+        'ProductPrice_2': {'Distribution_Function': 'Normal', '(%)': 0.1},
+        'delta_ut_3': {'Distribution_Function': 'Uniform', '(%)': 0.05}}
+    return uncertaintyObject
+
+
+@pytest.mark.parametrize('method', ['Sobol', 'Halton'])
+def test_quasi_monte_carlo_samples(method):
+    uncertaintyObject = make_stochastic_object(method)
+    uncertaintyObject.make_scenario_dataframe_QMC(seed=1)
+    matrix = uncertaintyObject.UncertaintyMatrix
+
+    assert matrix.shape == (256, 3)
+    assert uncertaintyObject.ScenarioProbabilities == [1 / 256] * 256
+    assert matrix['phi_1'].between(-0.2, 0.2).all()
+    assert matrix['delta_ut_3'].between(-0.05, 0.05).all()
+
+    # the sequences cover the unit hypercube evenly, the sample moments are close to the exact ones
+    assert abs(matrix['phi_1'].mean()) < 0.002
+    assert matrix['ProductPrice_2'].std() == pytest.approx(0.1, rel=0.05)
+
+    # same seed, same scenarios, also when they are generated in chunks
+    chunks = [chunk for _, _, chunk in make_stochastic_object(method).iter_scenario_chunks(100, seed=1)]
+    pd.testing.assert_frame_equal(pd.concat(chunks), matrix)
+
+
+def test_unknown_sampling_method():
+    with pytest.raises(ValueError):
+        make_stochastic_object('Random')
+
+
+def test_convergence_report():
+    matrix = make_stochastic_object('Sobol', sampleSize=64)
+    matrix.make_scenario_dataframe_QMC(seed=2)
+    matrix = matrix.UncertaintyMatrix
+
+    output = MultiModelOutput(optimization_mode='wait and see')
+    output.uncertaintyMatrix = matrix
+    for i, (phi, price, delta) in enumerate(matrix.to_numpy()):
+        if i == 5:
+            continue  # infeasible scenario
+        output.add_process('sc{}'.format(i + 1), {'ObjectiveFunctionName': 'EBIT', 'EBIT': 10 + 3 * phi - price})
+
+    report = output.convergence_report(printReport=False)
+
+    assert list(report.index) == [8, 16, 32, 63]
+    assert report['R squared'].to_numpy() == pytest.approx(1)
+    assert report['SRC delta_ut_3'].abs().max() < 1e-6
+    # the objective is linear in the parameters, the SRCs converge to 3 * std(phi) / std(EBIT) and
+    # -std(price) / std(EBIT)
+    stdPhi, stdPrice = 0.2 / np.sqrt(3), 0.1
+    stdObjective = np.sqrt((3 * stdPhi) ** 2 + stdPrice ** 2)
+    assert report['SRC phi_1'].iloc[-1] == pytest.approx(3 * stdPhi / stdObjective, rel=0.02)
+    assert report['SRC ProductPrice_2'].iloc[-1] == pytest.approx(-stdPrice / stdObjective, rel=0.05)
+    assert report['Max SRC change'].iloc[-1] < report['Max SRC change'].iloc[1]
+
+
+def test_src_of_reduced_scenarios_is_weighted_by_the_probabilities():
+    # a reduced set with the probabilities 4:3:2:1 gives the same SRCs as the sample with repeated scenarios
+    matrix = make_stochastic_object('LHS', sampleSize=4)
+    matrix.make_scenario_dataframe_LHS(seed=1)
+    matrix = matrix.UncertaintyMatrix
+    repeats = [4, 3, 2, 1]
+
+    def objective(phi, price, delta):
+        return {'ObjectiveFunctionName': 'EBIT', 'EBIT': 10 + 3 * phi - price + 50 * phi * delta}
+
+    reduced = MultiModelOutput(optimization_mode='wait and see')
+    reduced.uncertaintyMatrix = matrix
+    reduced.scenarioProbabilities = {'sc{}'.format(i + 1): n / 10 for i, n in enumerate(repeats)}
+    repeated = MultiModelOutput(optimization_mode='wait and see')
+    repeated.uncertaintyMatrix = matrix.loc[matrix.index.repeat(repeats)].reset_index(drop=True)
+    for i, row in enumerate(matrix.to_numpy()):
+        reduced.add_process('sc{}'.format(i + 1), objective(*row))
+    for i, row in enumerate(repeated.uncertaintyMatrix.to_numpy()):
+        repeated.add_process('sc{}'.format(i + 1), objective(*row))
+
+    reduced.calculate_SRC()
+    repeated.calculate_SRC()
+
+    for parameterName, src in repeated.SRC.items():
+        assert reduced.SRC[parameterName] == pytest.approx(src)
+
+    with pytest.raises(ValueError):
+        reduced.convergence_report(printReport=False)
@@ -0,0 +1,156 @@
+"""
+Pytest tests for the lazy scenario data files (utils/scenario_data.py) made by set_uncertainty_data_mpisspy.
+
+Run with:
+    pytest test_scenario_data.py
+"""
+
+import copy
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from outdoor.outdoor_core.input_classes.stochastic import StochasticObject
+from outdoor.outdoor_core.utils.scenario_data import ScenarioDataFiles, ScenarioStream, renormalize_compositions
+
+from test_model_construction import load_case
+
+CASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'Classroom', 'exercises', 'Potato', 'Case_study_PPW_2_superstructure.pkl')
+
+
+@pytest.fixture(scope="module")
+def scenarios():
+    superstructure = load_case(CASE_PATH)
+    baseData = superstructure.create_DataFile()[None]
+
+    phiKeys = list(baseData['phi'])[:2]
+    labels = {'phi': {phiKeys[0]: 'phi_1', phiKeys[1]: 'phi_2'},
+              'ProductPrice': {list(baseData['ProductPrice'])[0]: 'ProductPrice_3'},
+              'delta_ut': {'Electricity': 'delta_ut_4'}}
+    columns = [label for parameter in labels.values() for label in parameter.values()]
+    names = ['sc{}'.format(i) for i in range(5)]
+
+    uncertaintyObject = SimpleNamespace(
+        ScenarioNames=names, ScenarioProbabilities=[0.2] * 5, LableDict=labels, PhiExclusionList=[],
+        UncertaintyMatrix=pd.DataFrame(np.random.default_rng(0).uniform(-0.2, 0.2, (5, len(columns))),
+                                       columns=columns))
+
+    dataFiles = superstructure.set_uncertainty_data_mpisspy(uncertaintyObject)
+    baseData = copy.deepcopy(dataFiles.baseDataFile[None])
+    return dataFiles, baseData, uncertaintyObject
+
+
+def test_scenario_data_files_hold_the_changed_values(scenarios):
+    dataFiles, baseData, uncertaintyObject = scenarios
+    assert isinstance(dataFiles, ScenarioDataFiles)
+    assert list(dataFiles) == uncertaintyObject.ScenarioNames
+
+    for rowIndex, (scenario, dataFile) in enumerate(dataFiles.items()):
+        data = dataFile[None]
+        assert data.keys() == baseData.keys()
+
+        row = uncertaintyObject.UncertaintyMatrix.iloc[rowIndex]
+        price = list(baseData['ProductPrice'])[0]
+        assert data['ProductPrice'][price] == pytest.approx(baseData['ProductPrice'][price] * (1 + row['ProductPrice_3']))
+        assert data['delta_ut']['Electricity'] == pytest.approx(baseData['delta_ut']['Electricity']
+                                                                * (1 + row['delta_ut_4']))
+
+        # the composition of the changed source still sums up to 1
+        source = list(baseData['phi'])[0][0]
+        composition = [value for (unit, _), value in data['phi'].items() if unit == source]
+        assert sum(composition) == pytest.approx(1)
+
+        # parameters without uncertainty are not copied
+        assert data['myu'] is dataFiles.baseDataFile[None]['myu']
+
+
+def test_materialized_data_files_do_not_change_the_base_case(scenarios):
+    dataFiles, baseData, _ = scenarios
+
+    dataFile = dataFiles['sc0']
+    dataFile[None]['Y'] = {}
+
+    assert 'Y' not in dataFiles['sc0'][None]
+    assert dataFiles.baseDataFile[None] == baseData
+
+    table = dataFiles.override_table()
+    assert set(table['Scenario']) == set(dataFiles)
+    assert set(table['Parameter']) == {'phi', 'ProductPrice', 'delta_ut'}
+
+
+def test_unknown_override_parameter():
+    with pytest.raises(ValueError):
+        ScenarioDataFiles({None: {'phi': {}}}, {'sc0': {'unknown': {1: 1.0}}})
+
+
+def test_renormalized_compositions():
+    basePhi = {('S', 'a'): 0.5, ('S', 'b'): 0.3, ('S', 'c'): 0.2, ('T', 'a'): 1.0}
+
+    # c is excluded and keeps its fraction, only b is scaled
+    compositions = renormalize_compositions(basePhi, {('S', 'a'): np.array([0.6, 0.4])}, [('S', 'c')])
+
+    assert set(compositions) == {('S', 'a'), ('S', 'b'), ('S', 'c')}
+    np.testing.assert_allclose(compositions[('S', 'b')], [0.2, 0.4])
+    np.testing.assert_allclose(compositions[('S', 'c')], [0.2, 0.2])
+
+    with pytest.raises(ValueError):
+        renormalize_compositions(basePhi, {('S', 'a'): np.array([0.6, 0.9])}, [('S', 'c')])
+
+
+def make_stochastic_object(samplingMode, labels):
+    uncertaintyObject = StochasticObject()
+    uncertaintyObject.SamplingMode = samplingMode
+    uncertaintyObject.LableDict = labels
+    uncertaintyObject.PhiExclusionList = []
+    uncertaintyObject.DiscretizationList = [1, -1]
+    uncertaintyObject.CombinatorialProbabilitySetting = 'custom'
+    uncertaintyObject.SampleSize = 11
+
+    keyNames = [keyName for parameter in labels.values() for keyName in parameter.values()]
+    for nr, keyName in enumerate(keyNames):
+        uncertaintyObject.GeneralDict[keyName] = {'Distribution_Function': 'Uniform', '(%)': 0.1,
+                                                  'Correlation': 'reference', 'Group_Number': nr + 1,
+                                                  'ProbabilityDict': {1: 0.3, -1: 0.7}}
+    uncertaintyObject.set_group_dict()
+    return uncertaintyObject
+
+
+@pytest.mark.parametrize('samplingMode', ['Combinatorial', 'LHS'])
+def test_scenario_stream_gives_the_same_scenarios(scenarios, samplingMode):
+    _, _, fixtureObject = scenarios
+    labels = fixtureObject.LableDict
+
+    uncertaintyObject = make_stochastic_object(samplingMode, labels)
+    if samplingMode == 'Combinatorial':
+        uncertaintyObject.make_scenario_dataframe_combinatorial()
+    else:
+        uncertaintyObject.make_scenario_dataframe_LHS(seed=3)
+    superstructure = load_case(CASE_PATH)
+    dataFiles = superstructure.set_uncertainty_data_mpisspy(uncertaintyObject)
+
+    streamSuperstructure = load_case(CASE_PATH)
+    stream = streamSuperstructure.set_uncertainty_stream_mpisspy(make_stochastic_object(samplingMode, labels),
+                                                                 chunkSize=3, seed=3)
+    assert isinstance(stream, ScenarioStream)
+    assert len(stream) == len(dataFiles)
+    assert max(len(chunk) for chunk, _ in stream.chunks()) == 3
+
+    names, probabilities = [], []
+    for scenario, probability, overrides in stream.scenarios():
+        names.append(scenario)
+        probabilities.append(probability)
+        assert overrides == dataFiles.overrides[scenario]
+    assert names == list(dataFiles)
+    assert probabilities == pytest.approx(uncertaintyObject.ScenarioProbabilities)
+
+    # the base case data file of the stream has no list of all scenarios
+    for (scenario, dataFile), expected in zip(stream.items(), dataFiles.values()):
+        for name in ('SC', 'odds'):
+            del dataFile[None][name], expected[None][name]
+        assert dataFile == expected
+
+    pd.testing.assert_frame_equal(stream.uncertainty_matrix(), superstructure.uncertaintyMatrix)
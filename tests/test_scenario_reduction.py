@@ -0,0 +1,82 @@
+"""
+Pytest tests for the scenario reduction (utils/scenario_reduction.py, StochasticObject.reduce_scenarios).
+
+Run with:
+    pytest test_scenario_reduction.py
+"""
+
+import numpy as np
+import pytest
+
+from outdoor.outdoor_core.input_classes.stochastic import StochasticObject
+from outdoor.outdoor_core.utils.scenario_reduction import reduce_scenarios
+
+
+def make_stochastic_object(sampleSize=200):
+    uncertaintyObject = StochasticObject()
+    uncertaintyObject.SampleSize = sampleSize
+    uncertaintyObject.set_sampling_method('LHS')
+    uncertaintyObject.GeneralDict = {
+        'phi_1': {'Distribution_Function': 'Uniform', '(%)': 0.2},
+        'ProductPrice_2': {'Distribution_Function': 'Normal', '(%)': 0.1},
+        'delta_ut_3': {'Distribution_Function': 'Uniform', '(%)': 0.05}}
+    uncertaintyObject.make_scenario_dataframe_LHS(seed=4)
+    return uncertaintyObject
+
+
+def test_fast_forward_selection_of_two_clusters():
+    # two clusters on a line, the scenarios in the middle of the clusters are kept
+    points = np.array([[0.0], [1.0], [2.0], [10.0], [11.0], [12.0]])
+    probabilities = [0.1, 0.2, 0.1, 0.05, 0.5, 0.05]
+
+    selected, reduced, distance, relativeDistance = reduce_scenarios(points, probabilities, 2)
+
+    assert sorted(selected) == [1, 4]
+    assert reduced[list(selected).index(1)] == pytest.approx(0.4)
+    assert reduced[list(selected).index(4)] == pytest.approx(0.6)
+    # the distance is the probability weighted distance of the removed scenarios to the kept ones (scaled)
+    std = np.sqrt(np.average((points[:, 0] - np.average(points[:, 0], weights=probabilities)) ** 2,
+                             weights=probabilities))
+    assert distance == pytest.approx(0.3 / std)
+    assert 0 < relativeDistance < 1
+
+
+@pytest.mark.parametrize('method', ['fast forward', 'k-medoids'])
+def test_reduced_scenarios_of_a_sample(method):
+    uncertaintyObject = make_stochastic_object()
+    original = uncertaintyObject.UncertaintyMatrix.copy()
+
+    distances = []
+    for numberOfScenarios in (5, 20, 50):
+        _, probabilities, distance, relativeDistance = reduce_scenarios(
+            original, [1 / 200] * 200, numberOfScenarios, method)
+        assert len(probabilities) == numberOfScenarios
+        assert probabilities.sum() == pytest.approx(1)
+        distances.append(relativeDistance)
+    # more scenarios, closer to the original distribution
+    assert distances == sorted(distances, reverse=True)
+    assert distances[0] < 1
+
+    uncertaintyObject.reduce_scenarios(20, method=method)
+    matrix = uncertaintyObject.UncertaintyMatrix
+    assert uncertaintyObject.ScenarioNames == ['sc{}'.format(i) for i in range(1, 21)]
+    assert list(matrix.index) == list(range(20))
+    assert sum(uncertaintyObject.ScenarioProbabilities) == pytest.approx(1)
+
+    # the kept scenarios are scenarios of the original sample
+    report = uncertaintyObject.ReductionReport
+    for name, row in zip(report['Original scenario'], matrix.to_numpy()):
+        np.testing.assert_array_equal(original.iloc[int(name[2:]) - 1].to_numpy(), row)
+    assert uncertaintyObject.ReductionDistance['Relative distance'] == pytest.approx(distances[1])
+
+
+def test_no_reduction_of_small_scenario_sets():
+    selected, probabilities, distance, _ = reduce_scenarios(np.eye(3), [0.2, 0.3, 0.5], 5)
+    assert list(selected) == [0, 1, 2]
+    np.testing.assert_allclose(probabilities, [0.2, 0.3, 0.5])
+    assert distance == 0
+
+
+def test_unknown_reduction_method():
+    with pytest.raises(ValueError):
+        reduce_scenarios(np.eye(3), [1 / 3] * 3, 2, Method='random')
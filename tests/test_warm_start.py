@@ -0,0 +1,103 @@
+"""
+Pytest tests for the MIP starts of the multi-run optimizers (utils/warm_start.py and SingleOptimizer.set_warm_start).
+
+The toy model of test_parallel_runs.py is solved cold and then started from the flowsheet (the binary variables) of
+a previous ModelOutput, of a saved ModelOutput and of the nearest solved point. The results must not change.
+
+Requirements:
+    pip install pyomo highspy pytest
+
+Run with:
+    pytest test_warm_start.py
+"""
+
+import glob
+import os
+
+import pytest
+from pyomo.environ import Binary, SolverFactory, Var
+
+from outdoor.outdoor_core.optimizers.main_optimizer import SingleOptimizer
+from outdoor.outdoor_core.utils.warm_start import SolutionPool, flowsheet_solution, warm_start_values
+from test_parallel_runs import build_model, make_points, reference_ebit, toy_point_solver
+
+requires_highs = pytest.mark.skipif(not SolverFactory("appsi_highs").available(exception_flag=False),
+                                    reason="The persistent HiGHS interface (highspy) is not installed.")
+
+
+def test_nearest_solution():
+    pool = SolutionPool()
+    assert pool.nearest({'price': 1.0}) is None
+
+    pool.add({'price': 1.0}, 'a')
+    pool.add({'price': 4.0}, 'b')
+    pool.add({'electricity': 1.0}, 'c')
+    assert pool.nearest({'price': 1.5}) == 'a'
+    assert pool.nearest({'price': 3.0}) == 'b'
+    assert pool.nearest({'electricity': 2.0}) == 'c'
+    # equally near points, the point solved last is used
+    assert pool.nearest({}) == 'c'
+
+
+def test_start_values_of_tidied_data():
+    model = build_model()
+    model.lin_CAPEX_z = Var(model.U, within=Binary)
+
+    # tidied data: zero values of indexed variables are deleted (except Y), only the flowsheet is started and the
+    # missing indices are left as they are
+    solution = {'Y': {'A': 1.0}, 'lin_CAPEX_z': {'A': 1.0}, 'flow': {'A': 10.0}, 'EBIT': 20.0}
+    startValues = warm_start_values(model, solution)
+    assert [(var.name, val) for var, val in startValues] == [('Y[A]', 1)]
+
+    model.Y['A'].fix(0)
+    assert warm_start_values(model, solution) == []
+    assert warm_start_values(model, {'EBIT': 20.0}) == []
+
+
+@requires_highs
+def test_warm_start_from_model_output(tmp_path):
+    optimizer = SingleOptimizer('highs', 'local', persistent=True)
+    solved = optimizer.run_optimization(build_model(prices={'A': 2.0, 'B': 8.0}), tee=False, printTimer=False)
+    solved.save_file(str(tmp_path), option="tidy")
+    savedFile = glob.glob(os.path.join(str(tmp_path), '*.pkl'))[0]
+
+    for warmstart in (solved, solved._data, savedFile):
+        model = build_model()
+        assert optimizer.set_warm_start(model, warmstart)
+        result = optimizer.run_optimization(model, tee=False, printTimer=False, warmstart=warmstart)
+        assert result._data['EBIT'] == pytest.approx(reference_ebit('Price (ProductPrice)', 10.0, 'A'))
+
+
+@requires_highs
+def test_points_start_from_the_nearest_point():
+    pointSolver = toy_point_solver()
+
+    for (parameterName, val), changes in make_points():
+        result = pointSolver.solve_point(changes)
+        assert result._data['EBIT'] == pytest.approx(reference_ebit(parameterName, val, 'A'))
+
+    coordinates, flowsheet = pointSolver.solutionPool.points[-1]
+    assert coordinates == {'Electricity price (delta_ut)': 4.0}
+    assert flowsheet == flowsheet_solution(pointSolver.model_instance)
+
+
+@requires_highs
+def test_highs_uses_the_start_after_parameter_changes(capfd):
+    optimizer = SingleOptimizer('highs', 'local', persistent=True)
+    model = build_model()
+    solved = optimizer.run_optimization(model, tee=False, printTimer=False)
+
+    # the changed parameters must not discard the start when they are passed on to the solver
+    model.ProductPrice['A'] = 3.0
+    assert optimizer.set_warm_start(model, {'Y': {'A': 1.0}})
+    # the values of the last run are no start, only the flowsheet of the solution
+    assert [var.name for var in model.component_data_objects(Var) if var.value is not None] == ['Y[A]']
+    capfd.readouterr()
+    result = optimizer.run_optimization(model, tee=True, printTimer=False, warmstart=solved)
+    assert 'user-supplied values' in capfd.readouterr().out
+    assert result._data['EBIT'] == pytest.approx(reference_ebit('Price (ProductPrice)', 3.0, 'A'))
+
+    # the following runs update the solver again
+    model.ProductPrice['A'] = 10.0
+    result = optimizer.run_optimization(model, tee=False, printTimer=False)
+    assert result._data['EBIT'] == pytest.approx(reference_ebit('Price (ProductPrice)', 10.0, 'A'))